@@ -1,20 +1,91 @@
-from datetime import datetime
 from datetime import timedelta
 import logging
 from copy import copy
+from shapely.geometry import Point
 
 import pam.utils
 import pam.variables
+from pam.vocabulary import VOCABULARY
+from pam.tracking import tracked, TrackedList, add_owner, remove_owner, notify, get_state, set_state
 from pam import PAMSequenceValidationError, PAMTimesValidationError, PAMValidationLocationsError
-from pam.variables import END_OF_DAY
+
+
+logger = logging.getLogger(__name__)
+
+# population count deltas (see pam.tracking)
+ACTIVITY_ADDED = (0, 1, 0, 0, 0)
+LEG_ADDED = (0, 0, 1, 0, 0)
 
 
 class Plan:
-  
+    TRACKED = ('day',)
+    TRANSIENT = ('_owner', 'num_activities', 'num_legs')
+    _day = ()
+
     def __init__(self, home_area=None):
+        self._owner = None
+        self.num_activities = 0
+        self.num_legs = 0
         self.day = []
         self.home_area = Location(area=home_area)
-        self.logger = logging.getLogger(__name__)
+
+    @tracked
+    def day(self, day):
+        old = self._day
+        day = TrackedList(self, day)
+        self._items_changed(day, old)
+        return day
+
+    def _items_changed(self, added, removed):
+        """
+        Keep activity and leg counts (and component owners) up to date as day changes.
+        """
+        activities = legs = 0
+        for component in removed:
+            if isinstance(component, PlanComponent):
+                remove_owner(component, self)
+                if isinstance(component, Leg):
+                    legs -= 1
+                else:
+                    activities -= 1
+        for component in added:
+            if isinstance(component, PlanComponent):
+                add_owner(component, self)
+                if isinstance(component, Leg):
+                    legs += 1
+                else:
+                    activities += 1
+        self.num_activities += activities
+        self.num_legs += legs
+        notify(self, (0, activities, legs, 0, 0) if activities or legs else None)
+
+    def _item_added(self, component):
+        if isinstance(component, Leg):
+            self.num_legs += 1
+            delta = LEG_ADDED
+        elif isinstance(component, PlanComponent):
+            self.num_activities += 1
+            delta = ACTIVITY_ADDED
+        else:
+            return
+        if component._owner is None:
+            component._owner = self
+        else:
+            add_owner(component, self)
+        if self._owner is not None:
+            notify(self, delta)
+
+    def _changed(self, delta=None):
+        notify(self, delta)
+
+    def __getstate__(self):
+        return get_state(self, self.TRACKED, self.TRANSIENT)
+
+    def __setstate__(self, state):
+        self._owner = None
+        self.num_activities = 0
+        self.num_legs = 0
+        set_state(self, state, self.TRANSIENT)
 
     @property
     def home(self):
@@ -22,9 +93,9 @@ class Plan:
         #     return self.home_location
         if self.day:
             for act in self.activities:
-                if act.act is not None and act.act.lower()[:4] == 'home':
+                if act.act_code and VOCABULARY.lower_value(act.act_code)[:4] == 'home':
                     return act.location
-        self.logger.warning( "failed to find home, return area at start of day")
+        logger.warning( "failed to find home, return area at start of day")
         return self.day[0].location
 
     @property
@@ -168,14 +239,14 @@ class Plan:
         Check that start and end time of Activities and Legs are consistent.
         :return: bool
         """
-        if not self.day[0].start_time == pam.utils.minutes_to_datetime(0):
+        if not self.day[0].start_s == 0:
             return False
 
         for i in range(self.length - 1):
-            if not self.day[i].end_time == self.day[i+1].start_time:
+            if not self.day[i].end_s == self.day[i+1].start_s:
                 return False
 
-        if not self.day[-1].end_time == pam.variables.END_OF_DAY:
+        if not self.day[-1].end_s == pam.variables.END_OF_DAY_SECONDS:
             return False
 
         return True
@@ -241,16 +312,19 @@ class Plan:
         :return: {int, None}
         """
 
+        target = VOCABULARY.encode(target)
+        lowered = VOCABULARY.lowered
+
         if search == 'last':
             last = None
             for seq, act in enumerate(self.day):
-                if act.act.lower() == target:
+                if lowered[act.act_code] == target:
                     last = seq
             return last
 
         if search == 'first':
             for seq, act in enumerate(self.day):
-                if act.act.lower() == target:
+                if lowered[act.act_code] == target:
                     return seq
 
         raise UserWarning("Method only supports search types 'first' or 'last'.")
@@ -265,55 +339,87 @@ class Plan:
         if locations:
             self.fix_location_consistency()
 
-    def crop(self):
+    CROP_MESSAGES = {
+        'end_of_day': "Cropping plan components",
+        'sequence': "Cropping plan components",
+        'final_leg': "Cropping plan ending in Leg",
+    }
+
+    def crop(self, log=True):
         """
         Crop a plan to end of day (END_OF_DAY). Plan components that start after this
         time are removed. Activities that end after this time are trimmed. If the last component
         is a Leg, this leg is removed and the previous activity extended.
+        :param log: bool, log a warning for each crop
+        :return: list of crops made, of 'end_of_day', 'sequence' and 'final_leg'
         """
+        crops = []
+        day = self.day
+        end_of_day = pam.variables.END_OF_DAY_SECONDS
+
         # crop plan beyond end of day
-        for idx, component in list(self.reversed()):
-            if component.start_time > pam.variables.END_OF_DAY:
-                self.logger.warning(f"Cropping plan components")
-                self.day = self.day[:idx]
+        for idx in range(len(day) - 1, -1, -1):
+            if day[idx].start_s > end_of_day:
+                crops.append('end_of_day')
+                del day[idx:]
                 break
-        
+
         # crop plan that is out of sequence
-        for idx in range(1, self.length):
-            if self[idx].start_time < self[idx-1].end_time:
-                self.logger.warning(f"Cropping plan components")
-                self.day = self.day[:idx]
+        for idx in range(1, len(day)):
+            if day[idx].start_s < day[idx-1].end_s:
+                crops.append('sequence')
+                del day[idx:]
                 break
-            if self[idx].start_time > self[idx].end_time:
-                self.logger.warning(f"Cropping plan components")
-                self.day = self.day[:idx+1]
+            if day[idx].start_s > day[idx].end_s:
+                crops.append('sequence')
+                del day[idx+1:]
                 break
 
         # deal with last component
-        if isinstance(self.day[-1], Activity):
-            self.day[-1].end_time = pam.variables.END_OF_DAY
+        if isinstance(day[-1], Activity):
+            day[-1].end_s = end_of_day
         else:
-            self.logger.warning(f"Cropping plan ending in Leg")
-            self.day.pop(-1)
-            self.day[-1].end_time = pam.variables.END_OF_DAY
+            crops.append('final_leg')
+            day.pop(-1)
+            day[-1].end_s = end_of_day
+
+        if log:
+            for crop in crops:
+                logger.warning(self.CROP_MESSAGES[crop])
+        return crops
 
     def fix_time_consistency(self):
         """
         Force plan component time consistency.
+        :return: bool, True if any times were changed
         """
-        for i in range(self.length - 1):
-            self.day[i+1].start_time = self.day[i].end_time
+        changed = False
+        day = self.day
+        for i in range(len(day) - 1):
+            if day[i+1].start_s != day[i].end_s:
+                day[i+1].start_s = day[i].end_s
+                changed = True
+        return changed
 
     def fix_location_consistency(self):
         """
-        Force plan locations consistency by adjusting leg locations.
+        Force plan locations consistency by adjusting leg locations. Leg locations that differ
+        from the adjoining activity locations are replaced by copies of them.
+        :return: bool, True if any locations were changed
         """
-        for i in range(1, self.length-1):
-            component = self.day[i]
+        changed = False
+        day = self.day
+        for i in range(1, len(day) - 1):
+            component = day[i]
             
             if isinstance(component, Leg):
-                component.start_location = copy(self.day[i-1].location)
-                component.end_location = copy(self.day[i+1].location)
+                if not same_location(component.start_location, day[i-1].location):
+                    component.start_location = copy(day[i-1].location)
+                    changed = True
+                if not same_location(component.end_location, day[i+1].location):
+                    component.end_location = copy(day[i+1].location)
+                    changed = True
+        return changed
 
     def closed_duration(self, idx):
         """
@@ -366,7 +472,8 @@ class Plan:
         for idx in home_idxs:
             self.day[idx].act = 'home'
 
-        area_map = {}
+        area_map = {}  # location key to activity type
+        locations = {}  # location key to location
         remaining = set(range(0, self.length, 2)) - set(home_idxs)
         
         # forward traverse
@@ -377,23 +484,27 @@ class Plan:
             idx = queue.pop()
 
             if self.day[idx].act is None:
-                act = self.day[idx-1].purp.lower()
-                location = str(self.day[idx].location.min)
+                act = VOCABULARY.lower_value(self.day[idx-1].purp_code)
+                location = self.day[idx].location
+                key = location.key
 
-                if act == last_act and location in area_map:
-                    act = area_map[location]
+                if act == last_act and key in area_map:
+                    act = area_map[key]
 
                 self.day[idx].act = act
                 remaining -= {idx}
                 last_act = act
-                area_map[location] = act
+                area_map[key] = act
+                locations.setdefault(key, location)
 
                 if idx+2 in remaining:
                     queue.append(idx+2)
 
         queue = []
-        for location, activity in area_map.items():
-            candidates = self.infer_activity_idxs(target=Location(area=location), default=False)
+        for key, activity in area_map.items():
+            if key is None:  # location does not exist, so cannot be matched
+                continue
+            candidates = self.infer_activity_idxs(target=locations[key], default=False)
             for idx in candidates:
                 if idx in remaining:
                     self.day[idx].act = activity
@@ -405,16 +516,16 @@ class Plan:
             idx = queue.pop()
 
             if self.day[idx].act is None:
-                act = self.day[idx-1].purp.lower()
-                location = self.day[idx].location.min
+                act = VOCABULARY.lower_value(self.day[idx-1].purp_code)
+                key = self.day[idx].location.key
 
-                if act == last_act and location in area_map:
-                    act = area_map[location]
+                if act == last_act and key in area_map:
+                    act = area_map[key]
 
                 self.day[idx].act = act
                 remaining -= {idx}
                 last_act = act
-                area_map[location] = act
+                area_map[key] = act
 
                 if idx+2 < self.length:
                     queue.append(idx+2)
@@ -426,16 +537,16 @@ class Plan:
             idx = queue.pop()
 
             if self.day[idx].act is None:
-                act = self.day[idx+1].purp.lower()
-                location = self.day[idx].location.min
+                act = VOCABULARY.lower_value(self.day[idx+1].purp_code)
+                key = self.day[idx].location.key
 
-                if act == last_act and location in area_map:
-                    act = area_map[location]
+                if act == last_act and key in area_map:
+                    act = area_map[key]
 
                 self.day[idx].act = act
                 remaining -= {idx}
                 last_act = act
-                area_map[location] = act
+                area_map[key] = act
 
                 if idx-2 >= 0:
                     queue.append(idx-2)
@@ -446,8 +557,8 @@ class Plan:
         """
         if len(self.day) > 1:
             for seq in range(0, len(self.day)-1, 2):  # activities excluding last one
-                self.day[seq].end_time = self.day[seq+1].start_time
-        self.day[-1].end_time = pam.variables.END_OF_DAY
+                self.day[seq].end_s = self.day[seq+1].start_s
+        self.day[-1].end_s = pam.variables.END_OF_DAY_SECONDS
         
     def autocomplete_matsim(self):
         """
@@ -478,31 +589,31 @@ class Plan:
         assert isinstance(self.day[seq], Activity)
 
         if seq == 0 and seq == self.length - 1:  # remove activity that is entire plan
-            self.logger.debug(f" remove_activity, idx:{seq} type:{self.day[seq].act}, plan now empty")
+            logger.debug(f" remove_activity, idx:{seq} type:{self.day[seq].act}, plan now empty")
             self.day.pop(0)
             return None, None
 
         if (seq == 0 or seq == self.length - 1) and self.closed:  # remove activity that wraps
-            self.logger.debug(f" remove_activity, idx:{seq} type:{self.day[seq].act}, wraps")
+            logger.debug(f" remove_activity, idx:{seq} type:{self.day[seq].act}, wraps")
             self.day.pop(0)
             self.day.pop(self.length - 1)
             if self.length == 1:  # all activities have been removed
-                self.logger.debug(f" remove_activity, idx:{seq} type:{self.day[seq].act}, now empty")
+                logger.debug(f" remove_activity, idx:{seq} type:{self.day[seq].act}, now empty")
                 return None, None
             return self.length-2, 1
 
         if seq == 0:  # remove first activity
-            self.logger.debug(f" remove_activity, idx:{seq} type:{self.day[seq].act}, first activity")
+            logger.debug(f" remove_activity, idx:{seq} type:{self.day[seq].act}, first activity")
             self.day.pop(seq)
             return None, 1
 
         if seq == self.length - 1:  # remove last activity
-            self.logger.debug(f" remove_activity, idx:{seq} type:{self.day[seq].act}, last activity")
+            logger.debug(f" remove_activity, idx:{seq} type:{self.day[seq].act}, last activity")
             self.day.pop(seq)
             return self.length-2, None
 
         else:  # remove activity somewhere in middle of plan
-            self.logger.debug(f" remove_activity, idx:{seq} type:{self.day[seq].act}")
+            logger.debug(f" remove_activity, idx:{seq} type:{self.day[seq].act}")
             self.day.pop(seq)
             return seq-2, seq+1
 
@@ -545,7 +656,7 @@ class Plan:
         :param default: Not Used
         :return: True
         """
-        self.logger.debug(f" fill_plan, {idx_start}->{idx_end}")
+        logger.debug(f" fill_plan, {idx_start}->{idx_end}")
 
         if idx_start is None and idx_end is None:  # Assume stay at home
             self.stay_at_home()
@@ -600,7 +711,7 @@ class Plan:
 
             pivot_idx = self.position_of(target='home')
             if pivot_idx is None:
-                self.logger.warning(f"Unable to find home activity, changing plan to stay at home")
+                logger.warning(f"Unable to find home activity, changing plan to stay at home")
                 self.stay_at_home()
                 return True
 
@@ -619,15 +730,15 @@ class Plan:
         """
         # todo this isn't great - just pushes other activities to edges of day
 
-        new_time = pam.utils.minutes_to_datetime(0)
+        new_time = 0
         for seq in range(pivot_idx+1):  # push forward pivot and all proceeding components
-            new_time = self.day[seq].shift_start_time(new_time)
+            new_time = self.day[seq].shift_start_s(new_time)
 
-        new_time = pam.variables.END_OF_DAY
+        new_time = pam.variables.END_OF_DAY_SECONDS
         for seq in range(self.length-1, pivot_idx, -1):  # push back all subsequent components
-            new_time = self.day[seq].shift_end_time(new_time)
+            new_time = self.day[seq].shift_end_s(new_time)
 
-        self.day[pivot_idx].end_time = new_time  # expand pivot
+        self.day[pivot_idx].end_s = new_time  # expand pivot
 
     def join_activities(self, idx_start, idx_end):
         """
@@ -645,7 +756,7 @@ class Plan:
         # press plans away from pivoting activity
         pivot_idx = self.position_of(target='home')
         if pivot_idx is None:
-            self.logger.warning(f"Unable to find home activity, changing plan to stay at home")
+            logger.warning(f"Unable to find home activity, changing plan to stay at home")
             self.stay_at_home()
             return None
 
@@ -658,7 +769,7 @@ class Plan:
         :param idx_end:
         :return:
         """
-        self.day[idx_start].end_time = self.day[idx_end].end_time  # extend proceeding act
+        self.day[idx_start].end_s = self.day[idx_end].end_s  # extend proceeding act
         self.day.pop(idx_end)  # remove subsequent activity
         self.day.pop(idx_end - 1)  # remove subsequent leg
         self.day.pop(idx_start + 1)  # remove proceeding leg
@@ -671,23 +782,23 @@ class Plan:
         :return:
         """
         # extend proceeding act to end of day
-        self.day[idx_start].end_time = pam.variables.END_OF_DAY
+        self.day[idx_start].end_s = pam.variables.END_OF_DAY_SECONDS
         # extend subsequent act to start of day
-        self.day[idx_end].start_time = pam.utils.minutes_to_datetime(0)
+        self.day[idx_end].start_s = 0
         self.day.pop(idx_start + 1)  # remove proceeding leg
         self.day.pop(idx_end - 1)  # remove subsequent leg
 
     def stay_at_home(self):
-        self.logger.debug(f" stay_at_home, location:{self.home}")
-        self.day = [
-            Activity(
-                seq=1,
-                act='home',
-                area=self.home,
-                start_time=pam.utils.minutes_to_datetime(0),
-                end_time=pam.variables.END_OF_DAY,
-            )
-        ]
+        home = self.home
+        logger.debug(f" stay_at_home, location:{home}")
+        act = Activity(
+            seq=1,
+            act='home',
+            start_time=0,
+            end_time=pam.variables.END_OF_DAY_SECONDS,
+        )
+        act.location = copy(home)
+        self.day = [act]
 
     def simplify_pt_trips(self):
         """
@@ -698,7 +809,7 @@ class Plan:
         for idx, component in list(self.reversed()):
             if component.act == "pt interaction":  # this is a pt trip
                 if not pt_trip:  # this is a new pt leg
-                    trip_end_time = self[idx+1].end_time
+                    trip_end_time = self[idx+1].end_s
                     trip_end_location = self[idx+1].end_location
 
                 pt_trip = True
@@ -707,7 +818,7 @@ class Plan:
             else:
                 if pt_trip:  # this is the start of the pt trip - modify the first leg
                     self[idx].mode = 'pt'
-                    self[idx].end_time = trip_end_time
+                    self[idx].end_s = trip_end_time
                     self[idx].end_location = trip_end_location
                 pt_trip = False
 
@@ -716,12 +827,12 @@ class Plan:
         Get the total duration of home activities.
         """
         #total time spent at home
-        home_duration = timedelta(0)
+        home_duration = 0
         for plan in self.day:
             if plan.act=='home':
-                home_duration+=plan.duration
+                home_duration+=plan.duration_s
         
-        return home_duration
+        return timedelta(seconds=home_duration)
 
     def mode_shift(self, seq, target_mode='walk', mode_speed = {'car':37, 'bus':10, 'walk':4, 'cycle': 14, 'pt':23, 'rail':37}, update_duration = False):
         """
@@ -747,25 +858,26 @@ class Plan:
                     #if any of the trip ends belongs in the tour change the mode
                     if act_from.is_exact(other_act) or act_to.is_exact(other_act):
                         if update_duration:
-                            shift_duration = ((mode_speed[plan.mode]/mode_speed[target_mode]) * plan.duration) - plan.duration #calculate any trip duration changes due to mode shift
+                            shift_duration = ((mode_speed[plan.mode]/mode_speed[target_mode]) * plan.duration_s) - plan.duration_s #calculate any trip duration changes due to mode shift
+                            shift_duration = timedelta(seconds=round(shift_duration)) #round to second
                         plan.mode = target_mode #change mode
                         if update_duration:
                             self.change_duration(seq=seq, shift_duration=shift_duration) #change the duration of the trip
         
         if update_duration:
             #adjust home activities time in order fit revised legs/activities within a 24hr day
-            home_duration = self.get_home_duration()
-            home_duration_factor = (self.day[-1].end_time - END_OF_DAY)/home_duration #factor to adjust home activity time by
+            home_duration = self.get_home_duration().total_seconds()
+            home_duration_factor = (self.day[-1].end_s - pam.variables.END_OF_DAY_SECONDS)/home_duration #factor to adjust home activity time by
 
             for seq, plan in enumerate(self.day):
                 if plan.act=='home':
-                    shift_duration = -home_duration_factor*plan.duration
-                    shift_duration = timedelta(seconds=round(shift_duration/timedelta(seconds=1))) #round to second
+                    shift_duration = -home_duration_factor*plan.duration_s
+                    shift_duration = timedelta(seconds=round(shift_duration)) #round to second
                     self.change_duration(seq=seq,shift_duration=shift_duration)
 
             #make sure the last activity ends in the end of day (ie remove potential rounding errors)
-            if self.day[-1].end_time != END_OF_DAY:
-                self.day[-1].end_time = END_OF_DAY
+            if self.day[-1].end_s != pam.variables.END_OF_DAY_SECONDS:
+                self.day[-1].end_s = pam.variables.END_OF_DAY_SECONDS
         
 
     def change_duration(self, seq, shift_duration):
@@ -777,13 +889,14 @@ class Plan:
         :return: None
         """
         
+        shift_s = shift_duration.days * 86400 + shift_duration.seconds
+
         #change leg duration
-        self.day[seq].end_time = self.day[seq].end_time + shift_duration
+        self.day[seq].end_s += shift_s
         
         #shift all subsequent legs and activities
         for idx in range(seq+1, len(self.day)):
-            start_time = self.day[idx].start_time
-            self.day[idx].shift_start_time(start_time + shift_duration)
+            self.day[idx].shift_start_s(self.day[idx].start_s + shift_s)
           
 
     def get_leg_tour(self, seq):
@@ -804,11 +917,98 @@ class Plan:
                     return tour
 
 
+def same_location(a, b):
+    """
+    Check that locations have the same loc, link and area (unlike Location equality, which
+    compares the most precise location type that both have).
+    :return: bool
+    """
+    return a.x == b.x and a.y == b.y and a.link == b.link and a.area_code == b.area_code
+
+
+def _set_slots_state(obj, state):
+    """
+    Restore pickled state of a slotted object. Also accepts the plain dict state of objects
+    pickled before __slots__ were introduced.
+    """
+    if isinstance(state, tuple):  # (dict state, slots state)
+        dict_state, slots_state = state
+        state = {**(dict_state or {}), **(slots_state or {})}
+    obj._owner = None
+    if isinstance(obj, Activity):
+        obj._location = None
+    for name, value in state.items():
+        setattr(obj, name, value)
+
+
 class PlanComponent:
+    """
+    Base for plan components. Times are held as integer seconds since the start of the plan
+    day (start_s, end_s), start_time and end_time provide a datetime view of these and can be
+    set with either datetimes or integer seconds. Components report changes to their activity
+    types, modes and locations to the plans that hold them (see pam.tracking).
+    """
+    __slots__ = ('start_s', 'end_s', '_owner')
+    STATE = ()
+
+    def _changed(self, delta=None):
+        notify(self, delta)
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.STATE}
+
+    def __setstate__(self, state):
+        _set_slots_state(self, state)
+
+    @property
+    def start_time(self):
+        if self.start_s is None:
+            return None
+        return pam.utils.seconds_to_datetime(self.start_s)
+
+    @start_time.setter
+    def start_time(self, value):
+        self.start_s = pam.utils.plan_seconds(value)
+
+    @property
+    def end_time(self):
+        if self.end_s is None:
+            return None
+        return pam.utils.seconds_to_datetime(self.end_s)
+
+    @end_time.setter
+    def end_time(self, value):
+        self.end_s = pam.utils.plan_seconds(value)
+
+    @property
+    def duration_s(self):
+        return self.end_s - self.start_s
 
     @property
     def duration(self):
-        return self.end_time - self.start_time
+        return timedelta(seconds=self.end_s - self.start_s)
+
+    def shift_start_s(self, new_start_s):
+        """
+        Given a new start time in seconds, set start time, set end time based on previous duration
+        and return new end time in seconds.
+        :param new_start_s: int
+        :return: int
+        """
+        self.end_s = new_start_s + self.end_s - self.start_s
+        self.start_s = new_start_s
+        return self.end_s
+
+    def shift_end_s(self, new_end_s):
+        """
+        Given a new end time in seconds, set end time, set start time based on previous duration
+        and return new start time in seconds.
+        :param new_end_s: int
+        :return: int
+        """
+        self.start_s = new_end_s - self.end_s + self.start_s
+        self.end_s = new_end_s
+        return self.start_s
 
     def shift_start_time(self, new_start_time):
         """
@@ -817,9 +1017,7 @@ class PlanComponent:
         :param new_start_time: datetime
         :return: datetime
         """
-        duration = self.duration
-        self.start_time = new_start_time
-        self.end_time = new_start_time + duration
+        self.shift_start_s(pam.utils.datetime_to_seconds(new_start_time))
         return self.end_time
 
     def shift_end_time(self, new_end_time):
@@ -829,13 +1027,16 @@ class PlanComponent:
         :param new_end_time: datetime
         :return: datetime
         """
-        duration = self.duration
-        self.end_time = new_end_time
-        self.start_time = new_end_time - duration
+        self.shift_end_s(pam.utils.datetime_to_seconds(new_end_time))
         return self.start_time
 
 
 class Activity(PlanComponent):
+    """
+    Activity plan component. The activity type (act) is held as an interned code (act_code).
+    """
+    __slots__ = ('seq', 'act_code', '_location')
+    STATE = ('seq', 'act', 'location', 'start_s', 'end_s')
 
     def __init__(
             self,
@@ -847,23 +1048,60 @@ class Activity(PlanComponent):
             start_time=None,
             end_time=None
     ):
+        self._owner = None
+        self._location = None
         self.seq = seq
         self.act = act
         self.location = Location(loc=loc, link=link, area=area)
         self.start_time = start_time
         self.end_time = end_time
 
+    @property
+    def act(self):
+        return VOCABULARY.values[self.act_code]
+
+    @act.setter
+    def act(self, value):
+        self.act_code = VOCABULARY.encode(value)
+        if self._owner is not None:
+            notify(self)
+
+    @property
+    def location(self):
+        return self._location
+
+    @location.setter
+    def location(self, value):
+        old = self._location
+        if isinstance(old, Location):
+            remove_owner(old, self)
+        if isinstance(value, Location):
+            add_owner(value, self)
+        self._location = value
+        if self._owner is not None:
+            notify(self)
+
     def __str__(self):
         return f"Activity({self.seq} act:{self.act}, location:{self.location}, " \
                f"time:{self.start_time.time()} --> {self.end_time.time()}, " \
                f"duration:{self.duration})"
 
     def __eq__(self, other):
-        return (self.location == other.location) and (self.act == other.act)
+        return (self.location == other.location) and (self.act_code == other.act_code)
 
     def is_exact(self, other):
-        return (self.location == other.location) and (self.act == other.act) \
-               and (self.start_time == other.start_time) and (self.end_time == other.end_time)
+        return (self.location == other.location) and (self.act_code == other.act_code) \
+               and (self.start_s == other.start_s) and (self.end_s == other.end_s)
+
+    @property
+    def exact_key(self):
+        """
+        Hashable key shared by exactly matching activities (see is_exact). Locations must still be
+        compared, eg amongst activities grouped by key (see index_exact), as equal locations do
+        not always have equal location keys (see Location.key).
+        :return: tuple
+        """
+        return self.act_code, self.start_s, self.end_s
 
     def isin_exact(self, activities: list):
         for other in activities:
@@ -872,8 +1110,27 @@ class Activity(PlanComponent):
         return False
 
 
+def index_exact(activities):
+    """
+    Group activities by exact_key, so that exact matches can be found without comparing against
+    every activity, eg activity.isin_exact(index.get(activity.exact_key, ())).
+    :param activities: iterable of Activity
+    :return: dict
+    """
+    index = {}
+    for activity in activities:
+        index.setdefault(activity.exact_key, []).append(activity)
+    return index
+
+
 class Leg(PlanComponent):
+    """
+    Leg plan component. Mode and purpose (purp) are held as interned codes (mode_code, purp_code).
+    """
+    __slots__ = ('seq', 'purp_code', 'mode_code', 'start_location', 'end_location')
+    STATE = ('seq', 'purp', 'mode', 'start_location', 'end_location', 'start_s', 'end_s')
     act = 'travel'
+    act_code = VOCABULARY.encode(act)
 
     def __init__(
             self,
@@ -889,6 +1146,7 @@ class Leg(PlanComponent):
             end_time=None,
             purp=None,
     ):
+        self._owner = None
         self.seq = seq
         self.purp = purp
         self.mode = mode
@@ -897,6 +1155,24 @@ class Leg(PlanComponent):
         self.start_time = start_time
         self.end_time = end_time
 
+    @property
+    def mode(self):
+        return VOCABULARY.values[self.mode_code]
+
+    @mode.setter
+    def mode(self, value):
+        self.mode_code = VOCABULARY.encode(value)
+        if self._owner is not None:
+            notify(self)
+
+    @property
+    def purp(self):
+        return VOCABULARY.values[self.purp_code]
+
+    @purp.setter
+    def purp(self, value):
+        self.purp_code = VOCABULARY.encode(value)
+
     def __str__(self):
         return f"Leg({self.seq} mode:{self.mode}, area:{self.start_location} --> " \
                f"{self.end_location}, time:{self.start_time.time()} --> {self.end_time.time()}, " \
@@ -905,19 +1181,71 @@ class Leg(PlanComponent):
     def __eq__(self, other):
         return self.start_location == other.start_location and \
                self.end_location == other.end_location and \
-               self.mode == other.mode and \
-               self.duration == other.duration
+               self.mode_code == other.mode_code and \
+               self.duration_s == other.duration_s
 
 
 class Location:
+    """
+    Plan component location, as any of a loc (shapely.geometry.Point), link or area. The area is
+    held as an interned code (area_code). The loc is held as x and y coordinates, its Point is
+    only built when loc is accessed. A loc can be given as a Point or as an (x, y) tuple. Area
+    changes are reported to the activities at the location (see pam.tracking).
+    """
+    __slots__ = ('x', 'y', 'link', 'area_code', '_owner')
+    STATE = ('x', 'y', 'link', 'area')
+
     def __init__(self, loc=None, link=None, area=None):
+        self._owner = None
         self.loc = loc
         self.link = link
         self.area = area
 
+    @property
+    def loc(self):
+        if self.x is None:
+            return None
+        return Point(self.x, self.y)
+
+    @loc.setter
+    def loc(self, value):
+        if value is None:
+            self.x = self.y = None
+        elif isinstance(value, tuple):
+            self.x, self.y = float(value[0]), float(value[1])
+        else:
+            self.x, self.y = float(value.x), float(value.y)
+
+    @property
+    def xy(self):
+        """
+        Return loc as an (x, y) tuple, or None.
+        :return: tuple
+        """
+        if self.x is None:
+            return None
+        return self.x, self.y
+
+    @xy.setter
+    def xy(self, value):
+        self.loc = value
+
+    @property
+    def area(self):
+        return VOCABULARY.values[self.area_code]
+
+    @area.setter
+    def area(self, value):
+        self.area_code = VOCABULARY.encode(value)
+        if self._owner is not None:
+            notify(self)
+
+    def _changed(self, delta=None):
+        notify(self, delta)
+
     @property
     def min(self):
-        if self.loc is not None:
+        if self.x is not None:
             return self.loc
         if self.link is not None:
             return self.link
@@ -930,26 +1258,58 @@ class Location:
             return self.area
         if self.link is not None:
             return self.link
-        if self.loc is not None:
+        if self.x is not None:
             return self.loc
 
     @property
     def exists(self):
-        if self.area or self.link or self.loc:
+        if self.area or self.link or self.x is not None:
             return True
 
+    @property
+    def key(self):
+        """
+        Canonical hashable key of the most precise location type held: ('loc', x, y), ('link', link)
+        or ('area', area_code), or None if the location does not exist. Area codes are process wide
+        (see pam.vocabulary), so keys should not be persisted.
+
+        Locations with equal keys are equal, but equal locations do not always have equal keys:
+        equality compares the most precise location type that both locations hold, so that eg
+        Location(area='a') == Location(area='a', loc=(0, 0)) although their keys differ. Grouping by
+        key therefore only matches locations with the same most precise type. Locations themselves
+        are not hashable (no hash is consistent with their equality), use keys in dicts and sets.
+        :return: tuple
+        """
+        if self.x is not None:
+            return 'loc', self.x, self.y
+        if self.link is not None:
+            return 'link', self.link
+        if self.area_code:
+            return 'area', self.area_code
+        return None
+
     def __str__(self):
         return str(self.min)
 
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.STATE}
+
+    def __setstate__(self, state):
+        _set_slots_state(self, state)
+
+    __hash__ = None  # equality is not transitive, so locations cannot be hashed, see key
+
     def __eq__(self, other):
+        if self is other:
+            return True
         if isinstance(other, str):
             return self.area == other
-        if self.loc is not None and other.loc is not None:
-            return self.loc == other.loc
+        if self.x is not None and other.x is not None:
+            return self.x == other.x and self.y == other.y
         if self.link is not None and other.link is not None:
             return self.link == other.link
-        if self.area is not None and other.area is not None:
-            return self.area == other.area
+        if self.area_code and other.area_code:  # ie neither area is None
+            return self.area_code == other.area_code
         raise UserWarning(
             "Cannot check for location equality without same loc types (areas/locs/links)."
         )
@@ -0,0 +1,287 @@
+"""
+Versioned binary population format.
+
+A file holds a population as the typed arrays of a columnar.ColumnarPopulation:
+
+    magic (8 bytes) | version (uint32) | header length (uint64) | JSON header | arrays
+
+The JSON header holds the population name, counts, the activity, mode, purpose, area and link
+vocabularies and, for each array, its dtype, shape, byte offset (from the start of the array
+section) and byte length. Arrays are little endian and aligned to ALIGNMENT bytes, so that
+uncompressed files can be memory mapped. Household and person ids and attributes are held as
+string tables (utf-8 bytes plus offsets), attributes as one JSON record per household or person.
+Person freqs are held as float64 values plus a code per person for the type of the freq (see
+FREQ_TYPES), so that freqs are read back as the types they were written as.
+
+Households can be read by (start, stop) range, without reading the rest of the file.
+"""
+import json
+import struct
+import zlib
+import numpy as np
+
+import pam.columnar as columnar
+
+
+MAGIC = b'PAMPOP\x00\x00'
+VERSION = 1
+PREAMBLE = struct.Struct('<8sIQ')
+ALIGNMENT = 64
+
+HOUSEHOLD_ARRAYS = ['household_offsets']
+PERSON_ARRAYS = ['person_offsets', 'freqs', 'freq_types', 'home_area']
+FREQ_TYPES = [type(None), int, float, np.int64, np.float64, np.int32, np.float32]
+STRING_TABLES = ['hids', 'pids', 'household_attributes', 'person_attributes']
+
+
+def write_binary(population, path, compress=False):
+    """
+    Write population to path in the binary population format.
+    :param population: core.Population or columnar.ColumnarPopulation
+    :param path: str
+    :param compress: bool, zlib compress arrays, compressed files cannot be memory mapped
+    """
+    if not isinstance(population, columnar.ColumnarPopulation):
+        check_attributes(population)
+        population = columnar.ColumnarPopulation.from_population(population)
+
+    arrays = {name: getattr(population, name) for name in columnar.ColumnarPopulation.COMPONENT_ARRAYS}
+    arrays['household_offsets'] = population.household_offsets
+    arrays['person_offsets'] = population.person_offsets
+    freqs = list(population.freqs)
+    arrays['freqs'] = np.array([np.nan if freq is None else freq for freq in freqs], dtype=np.float64)
+    arrays['freq_types'] = np.array([freq_type(freq) for freq in freqs], dtype=np.uint8)
+    arrays['home_area'] = population.home_area
+    for name, values in (
+            ('hids', population.hids.tolist()),
+            ('pids', population.pids.tolist()),
+            ('household_attributes', attribute_strings(population.household_attributes)),
+            ('person_attributes', attribute_strings(population.person_attributes)),
+    ):
+        arrays[f'{name}.data'], arrays[f'{name}.offsets'] = string_table(values)
+
+    blocks, entries, offset = [], {}, 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array, dtype=np.asarray(array).dtype.newbyteorder('<'))
+        block = array.tobytes()
+        if compress:
+            block = zlib.compress(block)
+        entries[name] = {
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'offset': offset,
+            'nbytes': len(block),
+            'compressed': compress,
+        }
+        blocks.append(block)
+        offset = align(offset + len(block))
+
+    header = json.dumps({
+        'name': population.name,
+        'num_households': population.num_households,
+        'num_people': population.population,
+        'num_components': population.num_components,
+        'acts': population.acts,
+        'modes': population.modes,
+        'purps': population.purps,
+        'areas': population.areas,
+        'links': population.links,
+        'arrays': entries,
+    }, default=json_default).encode('utf-8')
+
+    with open(path, 'wb') as file:
+        file.write(PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        file.write(header)
+        file.write(bytes(align(file.tell()) - file.tell()))
+        start = file.tell()
+        for name, block in zip(entries, blocks):
+            file.write(bytes(start + entries[name]['offset'] - file.tell()))
+            file.write(block)
+
+
+def read_header(path):
+    """
+    Read the header of a binary population file.
+    :param path: str
+    :return: dict
+    """
+    with open(path, 'rb') as file:
+        preamble = file.read(PREAMBLE.size)
+        if len(preamble) < PREAMBLE.size:
+            raise UserWarning(f"Not a pam binary population file: {path}")
+        magic, version, length = PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise UserWarning(f"Not a pam binary population file: {path}")
+        if version > VERSION:
+            raise UserWarning(
+                f"Cannot read pam binary population file version {version} (supports up to {VERSION}): {path}"
+            )
+        header = json.loads(file.read(length).decode('utf-8'))
+    header['version'] = version
+    header['data_offset'] = align(PREAMBLE.size + length)
+    return header
+
+
+def load_columnar(path, households=None, mmap=True):
+    """
+    Load a binary population file as a columnar population, optionally for a range of households
+    only. Uncompressed arrays are memory mapped (unless mmap is False), so that only the parts of
+    the file used are read from disk.
+    :param path: str
+    :param households: optional (start, stop) tuple, range or slice of household positions
+    :param mmap: bool
+    :return: columnar.ColumnarPopulation
+    """
+    header = read_header(path)
+    arrays = ArrayReader(path, header, mmap)
+    h0, h1 = household_range(households, header['num_households'])
+
+    household_offsets = np.asarray(arrays.get('household_offsets', h0, h1 + 1))
+    p0, p1 = int(household_offsets[0]), int(household_offsets[-1])
+    person_offsets = np.asarray(arrays.get('person_offsets', p0, p1 + 1))
+    c0, c1 = int(person_offsets[0]), int(person_offsets[-1])
+
+    hids = arrays.strings('hids', h0, h1)
+    pids = arrays.strings('pids', p0, p1)
+    freqs = [
+        None if code == 0 else FREQ_TYPES[code](freq) for freq, code in zip(
+            arrays.get('freqs', p0, p1).tolist(), arrays.get('freq_types', p0, p1).tolist()
+        )
+    ]
+
+    return columnar.ColumnarPopulation(
+        name=header['name'],
+        hids=np.array(hids, dtype=object),
+        household_offsets=household_offsets - p0,
+        pids=np.array(pids, dtype=object),
+        person_offsets=person_offsets - c0,
+        freqs=columnar.object_array(freqs),
+        home_area=arrays.get('home_area', p0, p1),
+        components={
+            name: arrays.get(name, c0, c1) for name in columnar.ColumnarPopulation.COMPONENT_ARRAYS
+        },
+        acts=header['acts'],
+        modes=header['modes'],
+        purps=header['purps'],
+        areas=header['areas'],
+        links=header['links'],
+        person_attributes=columnar.attribute_table(
+            [json.loads(record) or {} for record in arrays.strings('person_attributes', p0, p1)],
+            pids, 'pid'
+        ),
+        household_attributes=columnar.attribute_table(
+            [json.loads(record) or {} for record in arrays.strings('household_attributes', h0, h1)],
+            hids, 'hid'
+        ),
+    )
+
+
+def read_binary(path, households=None):
+    """
+    Read a binary population file as a core.Population, optionally for a range of households
+    only. Note that households and people with empty attributes are given None attributes.
+    :param path: str
+    :param households: optional (start, stop) tuple, range or slice of household positions
+    :return: core.Population
+    """
+    return load_columnar(path, households=households).to_population()
+
+
+class ArrayReader:
+    """
+    Read (ranges of) arrays from a binary population file.
+    """
+
+    def __init__(self, path, header, mmap=True):
+        self.path = path
+        self.entries = header['arrays']
+        self.data_offset = header['data_offset']
+        self.mmap = mmap
+        self.loaded = {}
+
+    def get(self, name, start, stop):
+        entry = self.entries[name]
+        dtype = np.dtype(entry['dtype'])
+        if entry['compressed']:
+            if name not in self.loaded:
+                with open(self.path, 'rb') as file:
+                    file.seek(self.data_offset + entry['offset'])
+                    block = zlib.decompress(file.read(entry['nbytes']))
+                self.loaded[name] = np.frombuffer(block, dtype=dtype)
+            return self.loaded[name][start:stop]
+        offset = self.data_offset + entry['offset'] + start * dtype.itemsize
+        count = stop - start
+        if self.mmap:
+            if not count:
+                return np.empty(0, dtype=dtype)
+            return np.memmap(self.path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+        with open(self.path, 'rb') as file:
+            file.seek(offset)
+            return np.fromfile(file, dtype=dtype, count=count)
+
+    def strings(self, name, start, stop):
+        offsets = np.asarray(self.get(f'{name}.offsets', start, stop + 1)).tolist()
+        data = bytes(self.get(f'{name}.data', offsets[0], offsets[-1]))
+        base = offsets[0]
+        return [data[a - base:b - base].decode('utf-8') for a, b in zip(offsets[:-1], offsets[1:])]
+
+
+def household_range(households, num_households):
+    if households is None:
+        return 0, num_households
+    if isinstance(households, tuple):
+        households = slice(*households)
+    elif isinstance(households, range):
+        households = slice(households.start, households.stop, households.step)
+    start, stop, step = households.indices(num_households)
+    if step != 1:
+        raise UserWarning("Households must be read as a contiguous range.")
+    return start, max(start, stop)
+
+
+def string_table(values):
+    """
+    Encode strings as utf-8 bytes (uint8 array) and offsets (int64 array, len(values) + 1).
+    """
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def attribute_strings(table):
+    return [json.dumps(record, default=json_default) for record in columnar.attribute_records(table)]
+
+
+def json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise UserWarning(f"Cannot write value of type {type(value)} to binary population file: {value!r}")
+
+
+def freq_type(freq):
+    kind = type(freq)
+    if kind not in FREQ_TYPES:
+        raise UserWarning(f"Cannot write freq of type {kind} to binary population file: {freq!r}")
+    return FREQ_TYPES.index(kind)
+
+
+def check_attributes(population):
+    """
+    Raise UserWarning for nan attribute values, which cannot be told apart from missing attributes
+    once written.
+    """
+    for hid, household in population.households.items():
+        records = [(hid, household.attributes)]
+        records.extend((pid, person.attributes) for pid, person in household.people.items())
+        for key, record in records:
+            for name, value in (record or {}).items():
+                if isinstance(value, (float, np.floating)) and value != value:
+                    raise UserWarning(
+                        f"Cannot write nan attribute value ({name}) of {key} to binary population "
+                        "file, nan marks missing attributes."
+                    )
+
+
+def align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
@@ -0,0 +1,618 @@
+"""
+Columnar (struct of arrays) representation of a population.
+
+Plan components of all people are held end to end in flat numpy arrays, people index into these
+arrays by offset and households index into people by offset. This is intended for whole
+population analytics and bulk transforms, use core.Population for plan manipulation.
+"""
+import numpy as np
+import pandas as pd
+
+import pam.core as core
+import pam.activity as activity
+import pam.utils as utils
+import pam.validation as validation
+import pam.fixing as fixing
+from pam.variables import END_OF_DAY_SECONDS
+
+
+# component kinds
+ACTIVITY = 0
+LEG = 1
+
+# code used for missing (None) values in coded arrays
+MISSING = -1
+
+# value used for missing (None) start and end times
+NO_TIME = np.iinfo(np.int64).min
+
+
+class Encoder:
+    """
+    Accumulate a vocabulary of values, returning integer codes. None is coded as MISSING.
+    """
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def __call__(self, value):
+        if value is None:
+            return MISSING
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+
+class ColumnarPopulation:
+    """
+    Population held as arrays of plan components.
+
+    Component arrays (one value per plan component, in plan order, person by person):
+        kind: ACTIVITY or LEG
+        seq: component seq (MISSING if None)
+        code: activity code (into acts) for activities, mode code (into modes) for legs
+        purp: leg purpose code (into purps), MISSING for activities
+        start_s, end_s: integer seconds since start of plan day (NO_TIME if None)
+        start_area, end_area: area codes (into areas), equal for activities
+        start_link, end_link: link codes (into links), equal for activities
+        start_x, start_y, end_x, end_y: coordinates (nan if no loc), equal for activities
+
+    Person arrays (one value per person): pids, freqs, home_area (area code) and person_offsets
+    (n_people + 1) giving the slice of components belonging to each person.
+
+    Household arrays (one value per household): hids and household_offsets (n_households + 1)
+    giving the slice of people belonging to each household.
+
+    Person and household attributes are held as tables (pandas.DataFrame) indexed by pid and hid.
+    """
+
+    def __init__(
+            self,
+            name,
+            hids,
+            household_offsets,
+            pids,
+            person_offsets,
+            freqs,
+            home_area,
+            components,
+            acts,
+            modes,
+            purps,
+            areas,
+            links,
+            person_attributes,
+            household_attributes,
+    ):
+        self.name = name
+        self.hids = hids
+        self.household_offsets = household_offsets
+        self.pids = pids
+        self.person_offsets = person_offsets
+        self.freqs = freqs
+        self.home_area = home_area
+        self.kind = components['kind']
+        self.seq = components['seq']
+        self.code = components['code']
+        self.purp = components['purp']
+        self.start_s = components['start_s']
+        self.end_s = components['end_s']
+        self.start_area = components['start_area']
+        self.end_area = components['end_area']
+        self.start_link = components['start_link']
+        self.end_link = components['end_link']
+        self.start_x = components['start_x']
+        self.start_y = components['start_y']
+        self.end_x = components['end_x']
+        self.end_y = components['end_y']
+        self.acts = acts
+        self.modes = modes
+        self.purps = purps
+        self.areas = areas
+        self.links = links
+        self.person_attributes = person_attributes
+        self.household_attributes = household_attributes
+
+    COMPONENT_ARRAYS = [
+        'kind', 'seq', 'code', 'purp', 'start_s', 'end_s', 'start_area', 'end_area',
+        'start_link', 'end_link', 'start_x', 'start_y', 'end_x', 'end_y'
+    ]
+
+    @classmethod
+    def from_population(cls, population):
+        """
+        Build from a core.Population.
+        :param population: core.Population
+        :return: ColumnarPopulation
+        """
+        acts, modes, purps, areas, links = Encoder(), Encoder(), Encoder(), Encoder(), Encoder()
+        columns = {name: [] for name in cls.COMPONENT_ARRAYS}
+
+        hids, household_offsets, household_records = [], [0], []
+        pids, person_offsets, freqs, home_area, person_records = [], [0], [], [], []
+
+        for hid, household in population.households.items():
+            hids.append(hid)
+            household_records.append(household.attributes or {})
+
+            for pid, person in household.people.items():
+                pids.append(pid)
+                freqs.append(person.freq)
+                home_area.append(areas(person.home_area))
+                person_records.append(person.attributes or {})
+
+                for component in person.plan.day:
+                    if isinstance(component, activity.Leg):
+                        start, end = component.start_location, component.end_location
+                        columns['kind'].append(LEG)
+                        columns['code'].append(modes(component.mode))
+                        columns['purp'].append(purps(component.purp))
+                    else:
+                        start = end = component.location
+                        columns['kind'].append(ACTIVITY)
+                        columns['code'].append(acts(component.act))
+                        columns['purp'].append(MISSING)
+                    columns['seq'].append(MISSING if component.seq is None else component.seq)
+                    columns['start_s'].append(NO_TIME if component.start_s is None else component.start_s)
+                    columns['end_s'].append(NO_TIME if component.end_s is None else component.end_s)
+                    columns['start_area'].append(areas(start.area))
+                    columns['end_area'].append(areas(end.area))
+                    columns['start_link'].append(links(start.link))
+                    columns['end_link'].append(links(end.link))
+                    for location, x, y in ((start, 'start_x', 'start_y'), (end, 'end_x', 'end_y')):
+                        if location.x is None:
+                            columns[x].append(np.nan)
+                            columns[y].append(np.nan)
+                        else:
+                            columns[x].append(location.x)
+                            columns[y].append(location.y)
+
+                person_offsets.append(len(columns['kind']))
+            household_offsets.append(len(pids))
+
+        components = {
+            'kind': np.array(columns['kind'], dtype=np.int8),
+            'seq': np.array(columns['seq'], dtype=np.int64),
+            'code': np.array(columns['code'], dtype=np.int32),
+            'purp': np.array(columns['purp'], dtype=np.int32),
+            'start_s': np.array(columns['start_s'], dtype=np.int64),
+            'end_s': np.array(columns['end_s'], dtype=np.int64),
+            'start_area': np.array(columns['start_area'], dtype=np.int32),
+            'end_area': np.array(columns['end_area'], dtype=np.int32),
+            'start_link': np.array(columns['start_link'], dtype=np.int32),
+            'end_link': np.array(columns['end_link'], dtype=np.int32),
+            'start_x': np.array(columns['start_x'], dtype=np.float64),
+            'start_y': np.array(columns['start_y'], dtype=np.float64),
+            'end_x': np.array(columns['end_x'], dtype=np.float64),
+            'end_y': np.array(columns['end_y'], dtype=np.float64),
+        }
+
+        return cls(
+            name=population.name,
+            hids=np.array(hids, dtype=object),
+            household_offsets=np.array(household_offsets, dtype=np.int64),
+            pids=np.array(pids, dtype=object),
+            person_offsets=np.array(person_offsets, dtype=np.int64),
+            freqs=object_array(freqs),
+            home_area=np.array(home_area, dtype=np.int32),
+            components=components,
+            acts=acts.values,
+            modes=modes.values,
+            purps=purps.values,
+            areas=areas.values,
+            links=links.values,
+            person_attributes=attribute_table(person_records, pids, 'pid'),
+            household_attributes=attribute_table(household_records, hids, 'hid'),
+        )
+
+    def to_population(self):
+        """
+        Build a core.Population. Note that households and people with empty attributes are
+        given None attributes.
+        :return: core.Population
+        """
+        population = core.Population(name=self.name)
+        household_attributes = attribute_records(self.household_attributes)
+        person_attributes = attribute_records(self.person_attributes)
+        areas, links = self.areas, self.links
+
+        kind, seq, code, purp = self.kind.tolist(), self.seq.tolist(), self.code.tolist(), self.purp.tolist()
+        start_s, end_s = self.start_s.tolist(), self.end_s.tolist()
+        start_area, end_area = self.start_area.tolist(), self.end_area.tolist()
+        start_link, end_link = self.start_link.tolist(), self.end_link.tolist()
+        start_x, start_y = self.start_x.tolist(), self.start_y.tolist()
+        end_x, end_y = self.end_x.tolist(), self.end_y.tolist()
+        freqs = self.freqs.tolist()
+        home_area = self.home_area.tolist()
+        person_offsets = self.person_offsets.tolist()
+        household_offsets = self.household_offsets.tolist()
+
+        for h, hid in enumerate(self.hids):
+            household = core.Household(hid, attributes=household_attributes[h])
+
+            for p in range(household_offsets[h], household_offsets[h + 1]):
+                person = core.Person(
+                    self.pids[p],
+                    freq=freqs[p],
+                    attributes=person_attributes[p],
+                    home_area=decode(areas, home_area[p])
+                )
+
+                for i in range(person_offsets[p], person_offsets[p + 1]):
+                    if kind[i] == LEG:
+                        component = activity.Leg(
+                            seq=None if seq[i] == MISSING else seq[i],
+                            mode=decode(self.modes, code[i]),
+                            purp=decode(self.purps, purp[i]),
+                        )
+                        component.start_location = activity.Location(
+                            loc=point(start_x[i], start_y[i]),
+                            link=decode(links, start_link[i]),
+                            area=decode(areas, start_area[i])
+                        )
+                        component.end_location = activity.Location(
+                            loc=point(end_x[i], end_y[i]),
+                            link=decode(links, end_link[i]),
+                            area=decode(areas, end_area[i])
+                        )
+                    else:
+                        component = activity.Activity(
+                            seq=None if seq[i] == MISSING else seq[i],
+                            act=decode(self.acts, code[i]),
+                            area=decode(areas, start_area[i]),
+                            link=decode(links, start_link[i]),
+                            loc=point(start_x[i], start_y[i]),
+                        )
+                    component.start_s = None if start_s[i] == NO_TIME else start_s[i]
+                    component.end_s = None if end_s[i] == NO_TIME else end_s[i]
+                    person.plan.day.append(component)
+
+                household.add(person)
+            population.add(household)
+
+        return population
+
+    @property
+    def num_households(self):
+        return len(self.hids)
+
+    @property
+    def population(self):
+        return len(self.pids)
+
+    @property
+    def num_components(self):
+        return len(self.kind)
+
+    @property
+    def stats(self):
+        num_legs = int(np.count_nonzero(self.kind == LEG))
+        return {
+            'num_households': self.num_households,
+            'num_people': self.population,
+            'num_activities': self.num_components - num_legs,
+            'num_legs': num_legs,
+        }
+
+    def component_person(self):
+        """
+        Return index of person (into pids) for each component.
+        :return: np.array
+        """
+        return np.repeat(np.arange(self.population), np.diff(self.person_offsets))
+
+    def person_household(self):
+        """
+        Return index of household (into hids) for each person.
+        :return: np.array
+        """
+        return np.repeat(np.arange(self.num_households), np.diff(self.household_offsets))
+
+    def leg_table(self):
+        """
+        Return legs as a table, one row per leg, with hid, pid, freq, seq, purp, mode, ozone,
+        dzone, start_link, end_link, start_x, start_y, end_x, end_y, start_s, end_s and
+        duration_s columns. Missing times (and durations) are NO_TIME.
+        :return: pandas.DataFrame
+        """
+        return self.component_table(LEG)
+
+    def activity_table(self):
+        """
+        Return activities as a table, one row per activity, with hid, pid, freq, seq, act, area,
+        link, x, y, start_s, end_s and duration_s columns. Missing times (and durations) are
+        NO_TIME.
+        :return: pandas.DataFrame
+        """
+        return self.component_table(ACTIVITY)
+
+    def component_table(self, kind):
+        mask = self.kind == kind
+        person = self.component_person()[mask]
+        household = self.person_household()[person]
+        table = {
+            'hid': self.hids[household],
+            'pid': self.pids[person],
+            'freq': self.freqs[person],
+            'seq': decode_array(self.seq[mask], None),
+        }
+        if kind == LEG:
+            table['purp'] = decode_array(self.purp[mask], self.purps)
+            table['mode'] = decode_array(self.code[mask], self.modes)
+            table['ozone'] = decode_array(self.start_area[mask], self.areas)
+            table['dzone'] = decode_array(self.end_area[mask], self.areas)
+            table['start_link'] = decode_array(self.start_link[mask], self.links)
+            table['end_link'] = decode_array(self.end_link[mask], self.links)
+            table['start_x'], table['start_y'] = self.start_x[mask], self.start_y[mask]
+            table['end_x'], table['end_y'] = self.end_x[mask], self.end_y[mask]
+        else:
+            table['act'] = decode_array(self.code[mask], self.acts)
+            table['area'] = decode_array(self.start_area[mask], self.areas)
+            table['link'] = decode_array(self.start_link[mask], self.links)
+            table['x'], table['y'] = self.start_x[mask], self.start_y[mask]
+        table['start_s'] = self.start_s[mask]
+        table['end_s'] = self.end_s[mask]
+        table['duration_s'] = np.where(
+            (table['start_s'] == NO_TIME) | (table['end_s'] == NO_TIME),
+            NO_TIME,
+            table['end_s'] - table['start_s']
+        )
+        return pd.DataFrame(table)
+
+    def validate(self):
+        """
+        Validate plan sequences, times and locations of all people, with array operations. Returns
+        a validation report as per core.Population.validate (see pam.validation).
+        :return: dict
+        """
+        n = self.population
+        counts = np.diff(self.person_offsets)
+        person = self.component_person()
+        starts = self.person_offsets[:-1]
+        first = np.zeros(self.num_components, dtype=bool)
+        first[starts[counts > 0]] = True
+        last = np.zeros(self.num_components, dtype=bool)
+        last[self.person_offsets[1:][counts > 0] - 1] = True
+        position = np.arange(self.num_components) - starts[person]
+
+        bad = (self.kind != position % 2) | (last & (self.kind != ACTIVITY))
+        sequence = (counts > 0) & ~np.bincount(person[bad], minlength=n).astype(bool)
+
+        bad = (first & (self.start_s != 0)) | (last & (self.end_s != END_OF_DAY_SECONDS))
+        follows = ~first
+        bad[1:] |= follows[1:] & (self.start_s[1:] != self.end_s[:-1])
+        times = (counts > 0) & ~np.bincount(person[bad], minlength=n).astype(bool)
+
+        bad = np.zeros(self.num_components, dtype=bool)
+        bad[1:] = follows[1:] & ~self.locations_equal()
+        locations = ~np.bincount(person[bad], minlength=n).astype(bool)
+
+        person_household = self.person_household()
+        valid = dict(zip(validation.CATEGORIES, (sequence, times, locations)))
+        report = validation.empty_report()
+        report['num_people'] = n
+        report['num_invalid'] = int(np.count_nonzero(~(sequence & times & locations)))
+        for category in validation.CATEGORIES:
+            invalid = np.flatnonzero(~valid[category])
+            report['counts'][category] = len(invalid)
+            report['failures'][category] = list(zip(
+                self.hids[person_household[invalid]].tolist(), self.pids[invalid].tolist()
+            ))
+        return report
+
+    def fix_plans(self, crop=True, times=True, locations=True):
+        """
+        Crop plans and fix their time and location consistency with array operations, as per
+        core.Population.fix_plans. Component arrays are replaced. Note that, unlike
+        activity.Plan.crop, people without plan components are left unchanged.
+        :param crop: bool
+        :param times: bool
+        :param locations: bool
+        :return: dict, fix summary (see pam.fixing)
+        """
+        n = self.population
+        summary = fixing.empty_summary()
+        summary['num_people'] = n
+        if crop and self.num_components:
+            self.crop(summary)
+        person = self.component_person()
+        position = np.arange(self.num_components) - self.person_offsets[:-1][person]
+        follows = position > 0
+
+        if times:
+            previous_end = np.roll(self.end_s, 1)
+            changed = follows & (self.start_s != previous_end)
+            self.start_s = np.where(follows, previous_end, self.start_s)
+            summary['times_fixed'] = int(np.count_nonzero(np.bincount(person[changed], minlength=n)))
+
+        if locations:
+            counts = np.diff(self.person_offsets)
+            legs = (self.kind == LEG) & follows & (position < counts[person] - 1)
+            changed = np.zeros(self.num_components, dtype=bool)
+            for start, end in (
+                    ('start_x', 'end_x'), ('start_y', 'end_y'), ('start_link', 'end_link'),
+                    ('start_area', 'end_area')
+            ):
+                start_values, end_values = getattr(self, start), getattr(self, end)
+                fixed_start = np.where(legs, np.roll(end_values, 1), start_values)
+                fixed_end = np.where(legs, np.roll(start_values, -1), end_values)
+                changed |= ~same_values(start_values, fixed_start) | ~same_values(end_values, fixed_end)
+                setattr(self, start, fixed_start)
+                setattr(self, end, fixed_end)
+            summary['locations_fixed'] = int(np.count_nonzero(np.bincount(person[changed], minlength=n)))
+
+        return summary
+
+    def crop(self, summary):
+        """
+        Crop plans as per activity.Plan.crop, adding crops to fix summary.
+        """
+        n = self.population
+        counts = np.diff(self.person_offsets)
+        person = self.component_person()
+        position = np.arange(self.num_components) - self.person_offsets[:-1][person]
+
+        # crop plan beyond end of day, from the last component starting after end of day
+        late = np.full(n, -1)
+        beyond = np.flatnonzero(self.start_s > END_OF_DAY_SECONDS)
+        np.maximum.at(late, person[beyond], position[beyond])
+        lengths = np.where(late >= 0, late, counts)
+        summary['cropped']['end_of_day'] = int(np.count_nonzero(late >= 0))
+
+        # crop plan that is out of sequence, from the first component out of sequence
+        kept = position < lengths[person]
+        follows = kept & (position > 0)
+        before_previous = follows & (self.start_s < np.roll(self.end_s, 1))
+        after_end = follows & (self.start_s > self.end_s)
+        first = np.full(n, np.iinfo(np.int64).max)
+        disorder = np.flatnonzero(before_previous | after_end)
+        np.minimum.at(first, person[disorder], position[disorder])
+        disordered = first < np.iinfo(np.int64).max
+        cut = np.where(disordered, first, 0) + self.person_offsets[:-1]
+        cut_after = ~before_previous[np.minimum(cut, self.num_components - 1)]
+        lengths = np.where(disordered, first + cut_after, lengths)
+        summary['cropped']['sequence'] = int(np.count_nonzero(disordered))
+
+        # deal with last component
+        nonempty = lengths > 0
+        last = self.person_offsets[:-1] + lengths - 1
+        final_leg = nonempty & (self.kind[np.maximum(last, 0)] == LEG)
+        lengths = lengths - final_leg
+        summary['cropped']['final_leg'] = int(np.count_nonzero(final_leg))
+
+        keep = position < lengths[person]
+        end_s = self.end_s.copy()
+        ends = (self.person_offsets[:-1] + lengths - 1)[lengths > 0]
+        end_s[ends] = END_OF_DAY_SECONDS
+        self.end_s = end_s
+        for name in self.COMPONENT_ARRAYS:
+            setattr(self, name, getattr(self, name)[keep])
+        self.person_offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+
+    def locations_equal(self):
+        """
+        Return, for each component after the first, whether its start location equals the end
+        location of the previous component, as per activity.Location equality (by loc, else link,
+        else area). Locations without a common type, and consecutive components of the same kind,
+        are not equal.
+        :return: np.array of bool
+        """
+        x_a, y_a, x_b, y_b = self.end_x[:-1], self.end_y[:-1], self.start_x[1:], self.start_y[1:]
+        link_a, link_b = self.end_link[:-1], self.start_link[1:]
+        area_a, area_b = self.end_area[:-1], self.start_area[1:]
+        locs = ~np.isnan(x_a) & ~np.isnan(x_b)
+        links = (link_a != MISSING) & (link_b != MISSING)
+        areas = (area_a != MISSING) & (area_b != MISSING)
+        equal = np.where(
+            locs,
+            (x_a == x_b) & (y_a == y_b),
+            np.where(links, link_a == link_b, areas & (area_a == area_b))
+        )
+        return equal & (self.kind[1:] != self.kind[:-1])
+
+    def home_locations(self):
+        """
+        Return home location of each person, as per activity.Plan.home, ie the location of the
+        first activity of type 'home...', else the location of the first component.
+        :return: list of activity.Location
+        """
+        is_home = np.zeros(self.num_components, dtype=bool)
+        home_codes = [i for i, act in enumerate(self.acts) if act.lower()[:4] == 'home']
+        is_home[(self.kind == ACTIVITY) & np.isin(self.code, home_codes)] = True
+
+        starts = self.person_offsets[:-1]
+        homes = []
+        for p, start in enumerate(starts.tolist()):
+            stop = self.person_offsets[p + 1]
+            found = np.flatnonzero(is_home[start:stop])
+            i = start + found[0] if len(found) else start
+            homes.append(activity.Location(
+                loc=point(self.start_x[i], self.start_y[i]),
+                link=decode(self.links, self.start_link[i]),
+                area=decode(self.areas, self.start_area[i])
+            ))
+        return homes
+
+    def __str__(self):
+        return f"ColumnarPopulation: {self.population} people in {self.num_households} households."
+
+
+def object_array(values):
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def decode(values, code):
+    if code == MISSING:
+        return None
+    return values[code]
+
+
+def decode_array(codes, values):
+    """
+    Decode an array of codes into an object array of values, MISSING codes are decoded as None.
+    If values is None the codes themselves are returned (with MISSING as None).
+    """
+    if values is None:
+        decoded = object_array(codes.tolist())
+        decoded[codes == MISSING] = None
+        return decoded
+    return object_array(list(values) + [None])[codes]  # MISSING (-1) indexes the trailing None
+
+
+def to_datetimes(seconds):
+    """
+    Convert an array of integer seconds to an object array of datetimes, NO_TIME as None.
+    """
+    return object_array([None if s == NO_TIME else utils.seconds_to_datetime(s) for s in seconds.tolist()])
+
+
+def same_values(a, b):
+    """
+    Elementwise equality, with nan equal to nan.
+    """
+    equal = a == b
+    if a.dtype.kind == 'f':
+        equal |= np.isnan(a) & np.isnan(b)
+    return equal
+
+
+def point(x, y):
+    """
+    Return (x, y) location coordinates, None if nan.
+    """
+    if x != x:  # nan
+        return None
+    return x, y
+
+
+def attribute_table(records, index, name):
+    return pd.DataFrame(records, index=pd.Index(index, dtype=object, name=name), dtype=object)
+
+
+def attribute_records(table):
+    """
+    Return attribute dictionaries from an attribute table, dropping missing (nan) entries. Rows
+    without any attributes are returned as None.
+    """
+    if not len(table.columns):
+        return [None] * len(table)
+    records = []
+    for record in table.to_dict('records'):
+        record = {k: v for k, v in record.items() if not (isinstance(v, float) and v != v)}
+        records.append(record or None)
+    return records
+
+
+def as_population(population):
+    """
+    Return a core.Population, converting from ColumnarPopulation if required.
+    """
+    if isinstance(population, ColumnarPopulation):
+        return population.to_population()
+    return population
@@ -1,20 +1,74 @@
 import logging
 import random
 import pickle
+import weakref
+import zlib
+from numbers import Number
+from copy import copy, deepcopy
+import numpy as np
 
 import pam.activity as activity
 import pam.plot as plot
+from pam.tracking import tracked, TrackedDict, cached, add_owner, remove_owner, notify, get_state, set_state
+from pam.index import PopulationIndex
+from pam import validation
+from pam import fixing
 from pam import write
 from pam import PAMSequenceValidationError, PAMTimesValidationError, PAMValidationLocationsError
 
 
 class Population:
+    TRACKED = ('households',)
+    TRANSIENT = ('_ref', '_version', '_cache', '_counts')
+    _households = {}
 
     def __init__(self, name=None):
+        self._init_tracking()
         self.name = name
         self.logger = logging.getLogger(__name__)
         self.households = {}
 
+    def _init_tracking(self):
+        """
+        Population counts are kept up to date as the population changes, other summaries are cached
+        until the population next changes (see pam.tracking).
+        """
+        self._ref = weakref.ref(self)  # households hold populations by weak reference
+        self._version = 0
+        self._cache = {}
+        self._counts = [0, 0, 0, 0, 0]  # people, activities, legs, size, unsized
+
+    @tracked
+    def households(self, households):
+        old = self._households
+        households = TrackedDict(self, households)
+        self._items_changed(households.values(), old.values())
+        return households
+
+    def _items_changed(self, added, removed):
+        delta = [0, 0, 0, 0, 0]
+        for household in removed:
+            remove_owner(household, self._ref)
+            count_people(delta, household.people.values(), -1)
+        for household in added:
+            add_owner(household, self._ref)
+            count_people(delta, household.people.values(), 1)
+        self._changed(delta)
+
+    def _changed(self, delta=None):
+        if delta is not None:
+            counts = self._counts
+            for i, value in enumerate(delta):
+                counts[i] += value
+        self._version += 1
+
+    def __getstate__(self):
+        return get_state(self, self.TRACKED, self.TRANSIENT)
+
+    def __setstate__(self, state):
+        self._init_tracking()
+        set_state(self, state, self.TRANSIENT)
+
     def add(self, household):
         if not isinstance(household, Household):
             raise UserWarning(f"Expected instance of Household, not: {type(household)}")
@@ -40,18 +94,24 @@ class Population:
 
     @property
     def population(self):
-        return len([1 for hid, pid, person in self.people()])
+        return self._counts[0]
 
     @property
     def num_households(self):
-        return len([1 for hid, hh in self.households.items()])
+        return len(self.households)
 
     @property
     def size(self):
-        return sum([person.freq for _, _, person in self.people()])
+        if self._counts[4]:  # some frequencies cannot be summed, eg None
+            return sum([person.freq for _, _, person in self.people()])
+        return self._counts[3]
 
     @property
     def activity_classes(self):
+        return set(self._activity_classes())
+
+    @cached
+    def _activity_classes(self):
         acts = set()
         for _, _, p in self.people():
             acts.update(p.activity_classes)
@@ -59,51 +119,177 @@ class Population:
 
     @property
     def mode_classes(self):
+        return set(self._mode_classes())
+
+    @cached
+    def _mode_classes(self):
         modes = set()
         for _, _, p in self.people():
             modes.update(p.mode_classes)
         return modes
 
     def random_household(self):
-        return self.households[random.choice(list(self.households))]
+        return self.households[random.choice(self.households.key_list())]
 
     def random_person(self):
         hh = self.random_household()
         return hh.random_person()
 
+    def sample_households(self, k, weights=None, replace=True, rng=None):
+        """
+        Sample k households at once.
+        :param k: int, number of households
+        :param weights: None for uniform sampling, 'freq' to weight by household freq, or array of
+        weights (one per household, in population order)
+        :param replace: bool, sample with replacement
+        :param rng: optional numpy.random.Generator, defaults to the numpy global random state
+        :return: list of Household
+        """
+        hids = self.households.key_list()
+        p = sampling_probabilities(weights, len(hids), self._household_freqs)
+        choice = np.random.choice if rng is None else rng.choice
+        return [self.households[hids[i]] for i in choice(len(hids), size=k, replace=replace, p=p).tolist()]
+
+    def sample_people(self, k, weights=None, replace=True, rng=None):
+        """
+        Sample k people at once (from the whole population, rather than by household).
+        :param k: int, number of people
+        :param weights: None for uniform sampling, 'freq' to weight by person freq, or array of
+        weights (one per person, in population order)
+        :param replace: bool, sample with replacement
+        :param rng: optional numpy.random.Generator, defaults to the numpy global random state
+        :return: list of Person
+        """
+        keys = self._person_keys()
+        p = sampling_probabilities(weights, len(keys), self._person_freqs)
+        choice = np.random.choice if rng is None else rng.choice
+        people = []
+        for i in choice(len(keys), size=k, replace=replace, p=p).tolist():
+            hid, pid = keys[i]
+            people.append(self.households[hid].people[pid])
+        return people
+
+    @cached
+    def _household_freqs(self):
+        return frequencies([household.freq for household in self.households.values()])
+
+    @cached
+    def _person_keys(self):
+        return [(hid, pid) for hid, pid, _ in self.people()]
+
+    @cached
+    def _person_freqs(self):
+        return frequencies([person.freq for _, _, person in self.people()])
+
+    @cached
+    def index(self):
+        """
+        Return secondary indexes of the population (index.PopulationIndex), mapping activity types,
+        modes and activity areas to households and persons. The index is built on first use and
+        rebuilt on first use after this population or its plans change (changes to other
+        populations do not cause a rebuild).
+        :return: index.PopulationIndex
+        """
+        return PopulationIndex(self)
+
     @property
     def stats(self):
-        num_households = 0
-        num_people = 0
-        num_activities = 0
-        num_legs = 0
-        for hid, household in self:
-            num_households += 1
-            for pid, person in household:
-                num_people += 1
-                num_activities += person.num_activities
-                num_legs += person.num_legs
+        num_people, num_activities, num_legs, _, _ = self._counts
         return {
-            'num_households': num_households,
+            'num_households': len(self.households),
             'num_people': num_people,
             'num_activities': num_activities,
             'num_legs': num_legs,
         }
 
-    def fix_plans(self, crop=True, times=True, locations=True):
+    def validate(self, report=True, workers=1, columnar=None):
+        """
+        Validate plan sequences, times and locations of all people.
+        :param report: bool, return a report of all failures (see pam.validation), otherwise raise
+        on the first failure
+        :param workers: int, number of processes used to build the report
+        :param columnar: optional columnar.ColumnarPopulation of this population, or True to build
+        one, used to build the report with array operations (see ColumnarPopulation.validate)
+        :return: dict if report, else True
+        """
+        if report:
+            if columnar is True:
+                from pam.columnar import ColumnarPopulation  # pam.columnar imports pam.core
+                columnar = ColumnarPopulation.from_population(self)
+            if columnar is not None:
+                return columnar.validate()
+            return validation.validate_population(self, workers=workers)
         for _, _, person in self.people():
-            if crop:
-                person.plan.crop()
-            if times:
-                person.plan.fix_time_consistency()
-            if locations:
-                person.plan.fix_location_consistency()
+            person.validate_sequence()
+            person.validate_times()
+            person.validate_locations()
+        return True
+
+    def share(self):
+        """
+        Return a copy-on-write copy of population, holding copy-on-write copies of its households
+        (see Household.share).
+        :return: Population
+        """
+        state = self.__getstate__()
+        state['households'] = {hid: household.share() for hid, household in self.households.items()}
+        population = Population.__new__(Population)
+        population.__setstate__(state)
+        return population
+
+    def fix_plans(self, crop=True, times=True, locations=True, workers=1):
+        """
+        Crop plans and fix their time and location consistency (see activity.Plan.fix). A summary
+        of fixes is logged, rather than a warning for each plan.
+        :param crop: bool
+        :param times: bool
+        :param locations: bool
+        :param workers: int, number of processes, plans are fixed in copies by the processes and
+        the fixes then applied to this population's plans
+        :return: dict, fix summary (see pam.fixing)
+        """
+        summary = fixing.fix_population(self, crop=crop, times=times, locations=locations, workers=workers)
+        fixing.log_summary(self.logger, summary)
+        return summary
 
     def print(self):
         print(self)
         for _, household in self:
             household.print()
 
+    def partition(self, n, key=None):
+        """
+        Split population by household into n populations (shards). Households are assigned to
+        shard key(hid) % n, so that the same household is always assigned to the same shard. The
+        default key (hid_key) is stable between processes and machines, unlike the builtin hash.
+        Shards keep the household order of this population and share its household objects.
+        :param n: int, number of shards
+        :param key: optional function of hid, returning int
+        :return: list of Population
+        """
+        if n < 1:
+            raise UserWarning(f"Cannot partition population into {n} shards.")
+        if key is None:
+            key = hid_key
+        shards = [Population(name=self.name) for _ in range(n)]
+        for hid, household in self.households.items():
+            shards[key(hid) % n].households[hid] = household
+        return shards
+
+    def merge(self, *populations):
+        """
+        Add the households of other populations (eg shards) to this population, in the given
+        order. Household ids must be unique.
+        :param populations: Population
+        :return: Population, this population
+        """
+        for population in populations:
+            for hid, household in population.households.items():
+                if hid in self.households:
+                    raise UserWarning(f"Cannot merge populations, duplicate household id: {hid}")
+                self.households[hid] = household
+        return self
+
     def pickle(self, path):
         with open(path, 'wb') as file:
             pickle.dump(self, file)
@@ -121,22 +307,24 @@ class Population:
         TODO - home location consistency within household
         """
 
-        for _, _, person in self.people():
-            uniques = {}
-            for act in person.activities:
-                if (act.location.area, act.act) in uniques:
-                    loc = uniques[(act.location.area, act.act)]
-                    act.location.loc = loc
-                        
-                else:
-                    loc = sampler.sample(act.location.area, act.act)
-                    uniques[(act.location.area, act.act)] = loc
-                    act.location.loc = loc
-            for idx in range(person.plan.length):
-                component = person.plan[idx]
-                if isinstance(component, activity.Leg):
-                    component.start_location.loc = person.plan[idx-1].location.loc
-                    component.end_location.loc = person.plan[idx+1].location.loc
+        for _, household in self.households.items():
+            for person in household.writable().people.values():
+                uniques = {}  # (area code, act code) to sampled loc
+                for act in person.activities:
+                    key = (act.location.area_code, act.act_code)
+                    if key in uniques:
+                        loc = uniques[key]
+                        act.location.loc = loc
+
+                    else:
+                        loc = sampler.sample(act.location.area, act.act)
+                        uniques[key] = loc
+                        act.location.loc = loc
+                for idx in range(person.plan.length):
+                    component = person.plan[idx]
+                    if isinstance(component, activity.Leg):
+                        component.start_location.xy = person.plan[idx-1].location.xy
+                        component.end_location.xy = person.plan[idx+1].location.xy
 
     def sample_locs(self, sampler):
         """
@@ -161,12 +349,15 @@ class Population:
         TODO - add method to all core classes
         """
         for _, household in self.households.items():
+            household.writable()
+            home = household.location
             home_loc = activity.Location(
-                area=household.location.area,
-                loc=sampler.sample(household.location.area, 'home')
+                area=home.area,
+                loc=sampler.sample(home.area, 'home')
             )
 
-            unique_locations = {(household.location.area, 'home'): home_loc}
+            # (area code, activity type) to sampled location, area codes are canonical area keys
+            unique_locations = {(home.area_code, 'home'): home_loc}
 
             for _, person in household.people.items():
                 
@@ -178,16 +369,17 @@ class Population:
                     else:
                         target_act = act.act
 
-                    if (act.location.area, target_act) in unique_locations:
-                        location = unique_locations[(act.location.area, target_act)]
+                    key = (act.location.area_code, target_act)
+                    if key in unique_locations:
+                        location = unique_locations[key]
                         act.location = location
-                            
+
                     else:
                         location = activity.Location(
                             area=act.location.area,
                             loc=sampler.sample(act.location.area, target_act)
                         )
-                        unique_locations[(act.location.area, target_act)] = location
+                        unique_locations[key] = location
                         act.location = location
 
                 # complete the alotting activity locations to the trip starts and ends.
@@ -198,14 +390,108 @@ class Population:
                         component.end_location = person.plan[idx+1].location
 
 
+def frequencies(freqs):
+    if None in freqs:
+        raise UserWarning("Cannot weight by freq, some frequencies are None.")
+    return np.array(freqs, dtype=np.float64)
+
+
+def sampling_probabilities(weights, n, freqs):
+    """
+    Return probabilities for numpy sampling from weights, None for uniform sampling.
+    :param weights: None, 'freq' or array of n weights
+    :param n: int, number of items
+    :param freqs: function returning array of n frequencies, used if weights is 'freq'
+    :return: np.array or None
+    """
+    if weights is None:
+        return None
+    if isinstance(weights, str):
+        if weights != 'freq':
+            raise UserWarning(f"Unknown weights: {weights}, use 'freq' or an array of weights.")
+        weights = freqs()
+    weights = np.asarray(weights, dtype=np.float64)
+    if weights.shape != (n,):
+        raise UserWarning(f"Expected {n} weights, not {weights.shape}.")
+    total = weights.sum()
+    if not total > 0:
+        raise UserWarning("Cannot sample with weights that do not sum to more than zero.")
+    return weights / total
+
+
+def count_people(delta, people, sign):
+    """
+    Add (sign 1) or subtract (sign -1) the counts of people to population count deltas (see
+    pam.tracking).
+    :param delta: list of people, activities, legs, size and unsized counts
+    :param people: iterable of Person
+    :param sign: int
+    """
+    for person in people:
+        delta[0] += sign
+        plan = person.plan
+        if plan is not None:
+            delta[1] += sign * plan.num_activities
+            delta[2] += sign * plan.num_legs
+        count_freq(delta, person.freq, sign)
+
+
+def count_freq(delta, freq, sign):
+    if isinstance(freq, Number) and freq == freq:  # ie not NaN
+        delta[3] += sign * freq
+    else:
+        delta[4] += sign
+
+
+def hid_key(hid):
+    """
+    Stable integer key of household id, for partitioning (see Population.partition).
+    :param hid: str
+    :return: int
+    """
+    return zlib.crc32(str(hid).encode('utf-8'))
+
+
 class Household:
     logger = logging.getLogger(__name__)
+    TRACKED = ('people',)
+    TRANSIENT = ('_owner',)
+    shared = False
+    _people = {}
 
     def __init__(self, hid, attributes=None):
+        self._owner = None
         self.hid = str(hid)
         self.people = {}
         self.attributes = attributes
 
+    @tracked
+    def people(self, people):
+        old = self._people
+        people = TrackedDict(self, people)
+        self._items_changed(people.values(), old.values())
+        return people
+
+    def _items_changed(self, added, removed):
+        delta = [0, 0, 0, 0, 0]
+        for person in removed:
+            remove_owner(person, self)
+        count_people(delta, removed, -1)
+        for person in added:
+            add_owner(person, self)
+        count_people(delta, added, 1)
+        notify(self, delta)
+
+    def _changed(self, delta=None):
+        notify(self, delta)
+
+    def __getstate__(self):
+        return get_state(self, self.TRACKED, self.TRANSIENT)
+
+    def __setstate__(self, state):
+        self._owner = None
+        set_state(self, state, self.TRANSIENT)
+
     def add(self, person):
         if not isinstance(person, Person):
             raise UserWarning(f"Expected instance of Person, not: {type(person)}")
@@ -216,7 +502,38 @@ class Household:
         return self.people.get(pid, default)
 
     def random_person(self):
-        return self.people[random.choice(list(self.people))]
+        return self.people[random.choice(self.people.key_list())]
+
+    def share(self):
+        """
+        Return a copy-on-write copy of household. The copy has its own people dictionary and (a
+        shallow copy of) attributes, so that adding or removing people does not change this
+        household, but shares Person objects with this household until it is first made
+        writable(). Shared people (and their plans) must only be modified after writable(), which
+        Household and Population methods that modify people (eg fix_plans) call first.
+        :return: Household
+        """
+        state = self.__getstate__()
+        people = state.pop('people')
+        state['attributes'] = copy(state.get('attributes'))
+        household = Household.__new__(Household)
+        household.__setstate__(state)
+        # shared people are not owned by the copy (their changes are not tracked), see writable
+        household._people = TrackedDict(household, people)
+        household.shared = True
+        return household
+
+    def writable(self):
+        """
+        Prepare household for modification of its people and return it. A household made by
+        share() first takes its own (deep) copy of people and attributes, leaving the household it
+        was shared from unchanged.
+        :return: Household
+        """
+        if self.shared:
+            self.people, self.attributes = deepcopy((self.people, self.attributes))
+            self.shared = False
+        return self
 
     def __getitem__(self, pid):
         return self.people[pid]
@@ -259,7 +576,7 @@ class Household:
         return sum(person_frequencies) / len(person_frequencies)
 
     def fix_plans(self, crop=True, times=True, locations=True):
-        for person in self:
+        for person in self.writable().people.values():
             if crop:
                 person.plan.crop()
             if times:
@@ -269,13 +586,14 @@ class Household:
 
     def shared_activities(self):
         shared_activities = []
-        household_activities = []
+        household_activities = {}
         for pid, person in self.people.items():
-            for activity in person.activities:
-                if activity.isin_exact(household_activities):
-                    shared_activities.append(activity)
-                if not activity.isin_exact(household_activities):
-                    household_activities.append(activity)
+            for act in person.activities:
+                matches = household_activities.setdefault(act.exact_key, [])
+                if act.isin_exact(matches):
+                    shared_activities.append(act)
+                else:
+                    matches.append(act)
         return shared_activities
 
     def print(self):
@@ -300,14 +618,54 @@ class Household:
 
 class Person:
     logger = logging.getLogger(__name__)
+    TRACKED = ('plan', 'freq')
+    TRANSIENT = ('_owner',)
+    _plan = None
+    _freq = None
 
     def __init__(self, pid, freq=1, attributes=None, home_area=None):
+        self._owner = None
         self.pid = str(pid)
         self.freq = freq
         self.attributes = attributes
         self.plan = activity.Plan(home_area=home_area)
         self.home_area = home_area
 
+    @tracked
+    def plan(self, plan):
+        old = self._plan
+        if isinstance(old, activity.Plan):
+            remove_owner(old, self)
+        if isinstance(plan, activity.Plan):
+            add_owner(plan, self)
+        if self._owner is not None:
+            delta = [0, 0, 0, 0, 0]
+            for sign, value in ((-1, old), (1, plan)):
+                if value is not None:
+                    delta[1] += sign * value.num_activities
+                    delta[2] += sign * value.num_legs
+            notify(self, delta)
+        return plan
+
+    @tracked
+    def freq(self, freq):
+        if self._owner is not None:
+            delta = [0, 0, 0, 0, 0]
+            count_freq(delta, self._freq, -1)
+            count_freq(delta, freq, 1)
+            notify(self, delta)
+        return freq
+
+    def _changed(self, delta=None):
+        notify(self, delta)
+
+    def __getstate__(self):
+        return get_state(self, self.TRACKED, self.TRANSIENT)
+
+    def __setstate__(self, state):
+        self._owner = None
+        set_state(self, state, self.TRANSIENT)
+
     @property
     def home(self):
         if self.plan:
@@ -322,7 +680,7 @@ class Person:
     @property
     def num_activities(self):
         if self.plan:
-            return len(list(self.activities))
+            return self.plan.num_activities
         return 0
 
     @property
@@ -334,7 +692,7 @@ class Person:
     @property
     def num_legs(self):
         if self.plan:
-            return len(list(self.legs))
+            return self.plan.num_legs
         return 0
 
     @property
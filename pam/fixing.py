@@ -0,0 +1,169 @@
+"""
+Population wide plan fixing (cropping and time and location consistency), summarising what was
+fixed rather than logging each plan.
+
+A fix summary is a dictionary:
+
+    {
+        'num_people': int,
+        'cropped': {'end_of_day': int, 'sequence': int, 'final_leg': int},
+        'times_fixed': int, number of plans with changed times
+        'locations_fixed': int, number of plans with changed leg locations
+    }
+
+Crops are counted by plan, as per activity.Plan.crop.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import pam.activity as activity
+
+
+CROPS = ('end_of_day', 'sequence', 'final_leg')
+
+
+def empty_summary():
+    return {
+        'num_people': 0,
+        'cropped': {crop: 0 for crop in CROPS},
+        'times_fixed': 0,
+        'locations_fixed': 0,
+    }
+
+
+def fix_plan(plan, summary, crop=True, times=True, locations=True):
+    """
+    Fix plan (see activity.Plan.fix) without logging, adding what was fixed to summary.
+    :param plan: activity.Plan
+    :param summary: dict, fix summary
+    """
+    summary['num_people'] += 1
+    if crop:
+        for cropped in plan.crop(log=False):
+            summary['cropped'][cropped] += 1
+    if times and plan.fix_time_consistency():
+        summary['times_fixed'] += 1
+    if locations and plan.fix_location_consistency():
+        summary['locations_fixed'] += 1
+
+
+def fix_households(households, crop=True, times=True, locations=True):
+    """
+    Fix plans of people in households. Copy-on-write households are made writable first (see
+    core.Household.share).
+    :param households: list of (hid, core.Household)
+    :return: tuple, (households, fix summary)
+    """
+    summary = empty_summary()
+    for hid, household in households:
+        for pid, person in household.writable().people.items():
+            fix_plan(person.plan, summary, crop=crop, times=times, locations=locations)
+    return households, summary
+
+
+def plan_fixes(households, crop=True, times=True, locations=True):
+    """
+    Fix plans of people in (copies of) households, returning the fixes made (see apply_fixes)
+    rather than the fixed households. A fix is (hid, pid, length, times, locations) where length is
+    the cropped plan length, times the (start_s, end_s) of each remaining component and locations
+    a list of (index, start_location, end_location) of legs with fixed locations. Only plans that
+    were changed are given fixes.
+    :param households: list of (hid, core.Household)
+    :return: tuple, (list of fixes, fix summary)
+    """
+    summary = empty_summary()
+    fixes = []
+    for hid, household in households:
+        for pid, person in household.people.items():
+            day = person.plan.day
+            before = [(component.start_s, component.end_s) for component in day]
+            legs = [
+                (i, component.start_location, component.end_location)
+                for i, component in enumerate(day) if isinstance(component, activity.Leg)
+            ]
+            fix_plan(person.plan, summary, crop=crop, times=times, locations=locations)
+            after = [(component.start_s, component.end_s) for component in day]
+            moved = [  # crops only remove the end of plans, so remaining legs keep their index
+                (i, day[i].start_location, day[i].end_location) for i, start, end in legs
+                if i < len(day) and (day[i].start_location is not start or day[i].end_location is not end)
+            ]
+            if after != before or moved:
+                fixes.append((hid, pid, len(day), after, moved))
+    return fixes, summary
+
+
+def _plan_fixes(job):
+    households, crop, times, locations = job
+    return plan_fixes(households, crop=crop, times=times, locations=locations)
+
+
+def apply_fixes(population, fixes):
+    """
+    Apply fixes (see plan_fixes) to the plans of people in population. Plans are changed in place,
+    keeping households, people, plans and remaining plan components. Copy-on-write households are
+    made writable first (see core.Household.share).
+    :param population: core.Population
+    :param fixes: list of fixes
+    """
+    for hid, pid, length, times, locations in fixes:
+        day = population.households[hid].writable().people[pid].plan.day
+        del day[length:]  # crops only remove the end of plans
+        for component, (start_s, end_s) in zip(day, times):
+            component.start_s = start_s
+            component.end_s = end_s
+        for i, start_location, end_location in locations:
+            day[i].start_location = start_location
+            day[i].end_location = end_location
+
+
+def fix_population(population, crop=True, times=True, locations=True, workers=1):
+    """
+    Fix plans of all people in population, optionally in a pool of worker processes. Households
+    are split into contiguous chunks, one per worker, workers fix copies of the households and
+    return the fixes made, which are then applied to the population's plans (see apply_fixes).
+    :param population: core.Population
+    :param workers: int, number of processes
+    :return: dict, fix summary
+    """
+    households = list(population.households.items())
+    if workers <= 1 or len(households) < 2:
+        return fix_households(households, crop=crop, times=times, locations=locations)[1]
+    size = -(-len(households) // workers)
+    jobs = [(households[i:i + size], crop, times, locations) for i in range(0, len(households), size)]
+    summaries = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for fixes, summary in executor.map(_plan_fixes, jobs):
+            apply_fixes(population, fixes)
+            summaries.append(summary)
+    return merge_summaries(summaries)
+
+
+def merge_summaries(summaries):
+    """
+    Sum fix summaries.
+    :param summaries: iterable of dict
+    :return: dict
+    """
+    merged = empty_summary()
+    for summary in summaries:
+        merged['num_people'] += summary['num_people']
+        for crop in CROPS:
+            merged['cropped'][crop] += summary['cropped'][crop]
+        merged['times_fixed'] += summary['times_fixed']
+        merged['locations_fixed'] += summary['locations_fixed']
+    return merged
+
+
+def log_summary(logger, summary):
+    """
+    Log a single line summary of fixes.
+    """
+    cropped = sum(summary['cropped'].values())
+    if cropped:
+        logger.warning(
+            f"Made {cropped} plan crops for {summary['num_people']} people ("
+            + ", ".join(f"{crop}: {count}" for crop, count in summary['cropped'].items()) + ")"
+        )
+    logger.info(
+        f"Fixed times of {summary['times_fixed']} and locations of {summary['locations_fixed']} "
+        f"plans of {summary['num_people']} people"
+    )
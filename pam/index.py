@@ -0,0 +1,81 @@
+"""
+Secondary indexes of a population, from activity types, modes and activity areas to the
+households and persons that have them.
+
+Indexes are built by core.Population.index() and cached until the population or its plans are
+next changed, when they are rebuilt on next use. Changes are tracked per population (see
+pam.tracking), so changes to other populations, or to plans that are not held by the population,
+do not cause a rebuild.
+"""
+from pam.vocabulary import VOCABULARY
+import pam.activity as activity
+
+
+class PopulationIndex:
+    """
+    Map activity types (acts), modes and activity areas to households and persons. Households and
+    persons are returned in population order.
+    """
+
+    def __init__(self, population):
+        self.acts = {}
+        self.modes = {}
+        self.areas = {}
+        for hid, household in population.households.items():
+            for pid, person in household.people.items():
+                acts, modes, areas = set(), set(), set()
+                for component in person.plan.day:
+                    if isinstance(component, activity.Leg):
+                        modes.add(component.mode_code)
+                    else:
+                        acts.add(component.act_code)
+                        areas.add(component.location.area_code)
+                add_person(self.acts, acts, hid, pid)
+                add_person(self.modes, modes, hid, pid)
+                add_person(self.areas, areas, hid, pid)
+
+    def households(self, act=None, mode=None, area=None):
+        """
+        Return ids of households with a person who has all of the given activity type, mode and
+        activity area. Note that criteria are applied per person.
+        :param act: optional activity type
+        :param mode: optional mode
+        :param area: optional activity area
+        :return: list of hids
+        """
+        households = []
+        for hid, pid in self.persons(act=act, mode=mode, area=area):
+            if not households or households[-1] != hid:
+                households.append(hid)
+        return households
+
+    def persons(self, act=None, mode=None, area=None):
+        """
+        Return (hid, pid) of persons with all of the given activity type, mode and activity area.
+        :param act: optional activity type
+        :param mode: optional mode
+        :param area: optional activity area
+        :return: list of (hid, pid) tuples
+        """
+        criteria = [
+            (index, value) for index, value in ((self.acts, act), (self.modes, mode), (self.areas, area))
+            if value is not None
+        ]
+        if not criteria:
+            raise UserWarning("Index lookup requires at least one of act, mode or area.")
+        matches = [lookup(index, value) for index, value in criteria]
+        matches.sort(key=len)
+        persons, others = matches[0], [set(match) for match in matches[1:]]
+        return [person for person in persons if all(person in other for other in others)]
+
+
+def add_person(index, codes, hid, pid):
+    for code in codes:
+        index.setdefault(code, []).append((hid, pid))
+
+
+def lookup(index, value):
+    code = VOCABULARY.get(value)  # look up without interning unknown values
+    if code is None:
+        return []
+    return index.get(code, [])
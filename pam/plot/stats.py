@@ -1,38 +1,54 @@
 import pandas as pd
 from matplotlib import pyplot as plt
 
-from pam.utils import dt_to_s, td_to_s
+from pam.variables import END_OF_DAY_SECONDS
+import pam.columnar as columnar
 from datetime import timedelta
 
 
 def extract_activity_log(population):
+    if isinstance(population, columnar.ColumnarPopulation):
+        return columnar_log(population.activity_table(), 'act')
+
     log = []
     for hid, pid, person in population.people():
         for activity in person.activities:
             log.append({
                 'act': activity.act,
-                'start': dt_to_s(activity.start_time),
-                'end': dt_to_s(activity.end_time),
-                'duration': td_to_s(activity.duration)
+                'start': activity.start_s % END_OF_DAY_SECONDS,
+                'end': activity.end_s % END_OF_DAY_SECONDS,
+                'duration': activity.duration_s % END_OF_DAY_SECONDS
             })
 
     return pd.DataFrame(log)
 
 
 def extract_leg_log(population):
+    if isinstance(population, columnar.ColumnarPopulation):
+        return columnar_log(population.leg_table(), 'mode')
+
     log = []
     for hid, pid, person in population.people():
         for leg in person.legs:
             log.append({
                 'mode': leg.mode,
-                'start': dt_to_s(leg.start_time),
-                'end': dt_to_s(leg.end_time),
-                'duration': td_to_s(leg.duration)
+                'start': leg.start_s % END_OF_DAY_SECONDS,
+                'end': leg.end_s % END_OF_DAY_SECONDS,
+                'duration': leg.duration_s % END_OF_DAY_SECONDS
             })
 
     return pd.DataFrame(log)
 
 
+def columnar_log(table, sub_col):
+    return pd.DataFrame({
+        sub_col: table[sub_col],
+        'start': table.start_s % END_OF_DAY_SECONDS,
+        'end': table.end_s % END_OF_DAY_SECONDS,
+        'duration': table.duration_s % END_OF_DAY_SECONDS,
+    })
+
+
 def time_binner(data):
     """
     Bin start and end times and durations, return freq table for 24 hour period, 15min intervals.
@@ -89,27 +105,35 @@ def plot_leg_times(population):
     return fig
 
 def calculate_leg_duration_by_mode(population):
-    all_legs = []
-    for hid, pid, person in population.people():
-            for seq, leg in enumerate(person.legs):
-                all_legs.append({
-                    'leg mode': leg.mode,
-                    'duration_hours': leg.duration.days*24 + leg.duration.seconds/3600
-                })
-    all_legs_df = pd.DataFrame(all_legs)
+    if isinstance(population, columnar.ColumnarPopulation):
+        legs = population.leg_table()
+        all_legs_df = pd.DataFrame({'leg mode': legs['mode'], 'duration_hours': legs.duration_s / 3600})
+    else:
+        all_legs = []
+        for hid, pid, person in population.people():
+                for seq, leg in enumerate(person.legs):
+                    all_legs.append({
+                        'leg mode': leg.mode,
+                        'duration_hours': leg.duration.days*24 + leg.duration.seconds/3600
+                    })
+        all_legs_df = pd.DataFrame(all_legs)
     outputs_df = all_legs_df.groupby('leg mode', as_index = False).agg({'duration_hours': 'sum'})
     outputs_df.insert(0, 'scenario', population.name, True)
     return outputs_df
 
 def calculate_activity_duration_by_act(population, exclude = None):
-    all_activities = []
-    for hid, pid, person in population.people():
-            for seq, activity in enumerate(person.activities):
-                all_activities.append({
-                    'act': activity.act,
-                    'duration_hours': activity.duration.days*24 + activity.duration.seconds/3600
-                })
-    all_activities_df = pd.DataFrame(all_activities)
+    if isinstance(population, columnar.ColumnarPopulation):
+        acts = population.activity_table()
+        all_activities_df = pd.DataFrame({'act': acts.act, 'duration_hours': acts.duration_s / 3600})
+    else:
+        all_activities = []
+        for hid, pid, person in population.people():
+                for seq, activity in enumerate(person.activities):
+                    all_activities.append({
+                        'act': activity.act,
+                        'duration_hours': activity.duration.days*24 + activity.duration.seconds/3600
+                    })
+        all_activities_df = pd.DataFrame(all_activities)
     outputs_df = all_activities_df.groupby('act', as_index = False).agg({'duration_hours': 'sum'})
     outputs_df.insert(0, 'scenario', population.name, True)
     if(exclude != None):
@@ -117,6 +141,10 @@ def calculate_activity_duration_by_act(population, exclude = None):
     return outputs_df
 
 def calculate_total_activity_duration(population, exclude = None):
+    if isinstance(population, columnar.ColumnarPopulation):
+        acts = population.activity_table()
+        return acts.duration_s[acts.act != exclude].sum() / 3600
+
     total_activity_duration = timedelta(minutes=0)
     for hid, pid, person in population.people():
             for seq, activity in enumerate(person.activities):
@@ -126,6 +154,9 @@ def calculate_total_activity_duration(population, exclude = None):
     return total_activity_duration_hours
 
 def calculate_total_leg_duration(population):
+    if isinstance(population, columnar.ColumnarPopulation):
+        return population.leg_table().duration_s.sum() / 3600
+
     total_leg_duration = timedelta(minutes=0)
     for hid, pid, person in population.people():
             for seq, leg in enumerate(person.legs):
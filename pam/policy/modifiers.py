@@ -1,5 +1,6 @@
 import pam.core
 import pam.activity
+from pam.vocabulary import VOCABULARY
 import random
 from typing import List
 
@@ -98,7 +99,7 @@ class RemoveActivity(Modifier):
             self.remove_person_activities(person)
 
     def is_activity_for_removal(self, p):
-        return p.act.lower() in self.activities
+        return VOCABULARY.lower_value(p.act_code) in self.activities
 
 
 class AddActivity(Modifier):
@@ -170,26 +171,28 @@ class ReduceSharedActivity(Modifier):
         acts_for_removal = self.shared_activities_for_removal(household)
         if acts_for_removal:
             # pick the person that retains activities
-            ppl_sharing_activities = self.people_who_share_activities_for_removal(household)
+            ppl_sharing_activities = self.people_who_share_activities_for_removal(household, acts_for_removal)
             if ppl_sharing_activities:
-                person_retaining_activities = random.choice(self.people_who_share_activities_for_removal(household))
+                person_retaining_activities = random.choice(ppl_sharing_activities)
                 for pid, person in household.people.items():
                     if person != person_retaining_activities:
                         self.remove_activities(person, acts_for_removal)
 
     def is_activity_for_removal(self, p):
-        return p.act.lower() in self.activities
+        return VOCABULARY.lower_value(p.act_code) in self.activities
 
     def shared_activities_for_removal(self, household):
         shared_activities = household.shared_activities()
         return [act for act in shared_activities if self.is_activity_for_removal(act)]
 
-    def people_who_share_activities_for_removal(self, household):
-        shared_activities_for_removal = self.shared_activities_for_removal(household)
+    def people_who_share_activities_for_removal(self, household, shared_activities_for_removal=None):
+        if shared_activities_for_removal is None:
+            shared_activities_for_removal = self.shared_activities_for_removal(household)
+        shared_index = pam.activity.index_exact(shared_activities_for_removal)
         people_with_shared_acts_for_removal = []
         for pid, person in household.people.items():
             for activity in person.activities:
-                if activity.isin_exact(shared_activities_for_removal):
+                if activity.isin_exact(shared_index.get(activity.exact_key, ())):
                     people_with_shared_acts_for_removal.append(person)
         return people_with_shared_acts_for_removal
 
@@ -6,9 +6,33 @@ import pam.policy.probability_samplers as probability_samplers
 import pam.policy.filters as filters
 
 
+def writable(household, person=None, activities=None):
+    """
+    Prepare a household for modification by a policy (see Household.writable), returning the
+    household, person and activities to modify. Where a copy-on-write household has been copied,
+    the copies of the given person and activities are returned.
+    :param household: pam.core.Household
+    :param person: pam.core.Person, optional
+    :param activities: list of pam.activity.Activity, optional
+    :return: tuple
+    """
+    household.writable()
+    if person is None or household.people.get(person.pid) is person:
+        return household, person, activities
+    shared_person = person
+    person = household.people[person.pid]
+    if activities is not None:
+        activities = [
+            person.plan[i] for i, component in enumerate(shared_person.plan)
+            if any(component is activity for activity in activities)
+        ]
+    return household, person, activities
+
+
 class Policy:
     """
-    Base class for policies
+    Base class for policies. Policies modifying households should do so through writable(), so
+    that copy-on-write households (see apply_policies) are copied first.
     """
     def __init__(self):
         pass
@@ -93,9 +117,9 @@ class HouseholdPolicy(PolicyLevel):
                 for prob in self.probability:
                     p *= prob.p(household)
                 if random.random() < p:
-                    self.modifier.apply_to(household)
+                    self.modifier.apply_to(household.writable())
             elif self.probability.sample(household):
-                self.modifier.apply_to(household)
+                self.modifier.apply_to(household.writable())
 
 
 class PersonPolicy(PolicyLevel):
@@ -137,9 +161,9 @@ class PersonPolicy(PolicyLevel):
                     for prob in self.probability:
                         p *= prob.p(person)
                     if random.random() < p:
-                        self.modifier.apply_to(household, person)
+                        self.modifier.apply_to(*writable(household, person))
                 elif self.probability.sample(person):
-                    self.modifier.apply_to(household, person)
+                    self.modifier.apply_to(*writable(household, person))
 
 
 class ActivityPolicy(PolicyLevel):
@@ -187,7 +211,7 @@ class ActivityPolicy(PolicyLevel):
                     elif self.probability.sample(activity):
                         activities_to_purge.append(activity)
                 if activities_to_purge:
-                    self.modifier.apply_to(household, person, activities_to_purge)
+                    self.modifier.apply_to(*writable(household, person, activities_to_purge))
 
 
 class HouseholdQuarantined(Policy):
@@ -210,7 +234,7 @@ class HouseholdQuarantined(Policy):
     def apply_to(self, household, person=None, activity=None):
         p = self.probability.p(household)
         if random.random() < p:
-            for pid, person in household.people.items():
+            for pid, person in household.writable().people.items():
                 person.stay_at_home()
 
 
@@ -237,7 +261,7 @@ class PersonStayAtHome(Policy):
     def apply_to(self, household, person=None, activity=None):
         for pid, person in household.people.items():
             if random.random() < self.probability.p(person):
-                person.stay_at_home()
+                writable(household, person)[1].stay_at_home()
 
 
 class RemoveHouseholdActivities(HouseholdPolicy):
@@ -388,7 +412,9 @@ class ReduceSharedHouseholdActivities(HouseholdPolicy):
         super().__init__(modifiers.ReduceSharedActivity(activities), probability, attribute_filter)
 
 
-def apply_policies(population, policies: Union[List[Policy], Policy], in_place=False):
+def apply_policies(
+        population, policies: Union[List[Policy], Policy], in_place=False, households=None, copy_on_write=False
+):
     """
     Method which applies policies to population.
 
@@ -406,11 +432,22 @@ def apply_policies(population, policies: Union[List[Policy], Policy], in_place=F
     or return a copy.
 
     * True: applies policies to current Population object
-    * False: applies policies to a copy of the passed Population object
+    * False: applies policies to a (deep) copy of the passed Population object
+
+    :param households: default 'None'
+    Optional iterable of household ids, policies are only applied to these households. For example
+    households with an education activity, found without a scan of the population using
+    population.index().households(act='education').
+
+    :param copy_on_write: {'True', 'False'}, default 'False'
+    Only used if in_place is False. If True the copy shares people with the passed population
+    until a policy first modifies their household (see Population.share), so that only modified
+    households are copied. People of unmodified households must then not be changed (other than
+    through Household.writable), as changes would also apply to the passed population.
     :return: pam.core.Population if in_place=='False'
     """
     if not in_place:
-        pop = deepcopy(population)
+        pop = population.share() if copy_on_write else deepcopy(population)
     else:
         pop = population
 
@@ -421,7 +458,10 @@ def apply_policies(population, policies: Union[List[Policy], Policy], in_place=F
         assert isinstance(policy, Policy), \
             'Policies need to be of type {}, not {}. Failed for policy {} at list index {}'.format(
                 type(Policy), type(policy), policy, i)
-    for hid, household in pop.households.items():
+    if households is None:
+        households = pop.households
+    for hid in households:
+        household = pop.households[hid]
         for policy in policies:
             policy.apply_to(household)
     if not in_place:
@@ -1,5 +1,6 @@
 import pam.core
 import pam.activity
+from pam.vocabulary import VOCABULARY
 import random
 from typing import Union, Callable
 
@@ -191,7 +192,7 @@ class ActivityProbability(SamplingProbability):
             return self.probability(activity, **self.kwargs)
 
     def is_relevant_activity(self, act):
-        return act.act.lower() in self.activities
+        return VOCABULARY.lower_value(act.act_code) in self.activities
 
 
 def verify_probability(probability, unacceptable_types=None):
@@ -1,16 +1,20 @@
 import pandas as pd
-from shapely.geometry import Point
-from datetime import datetime, timedelta
+import numpy as np
 from lxml import etree as et
 import os
 import gzip
+import mmap
 import logging
 import pickle
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from typing import Union
 
 import pam.core as core
 import pam.activity as activity
 import pam.utils as utils
+import pam.shards
 
 
 def load_travel_diary(
@@ -20,6 +24,8 @@ def load_travel_diary(
     sample_perc:Union[float,None]=None,
     complex:bool=True,
     include_loc:bool=False,
+    vectorised:bool=False,
+    workers:int=1,
     ):
     """
     Turn standard tabular data inputs (travel survey and attributes) into core population
@@ -30,6 +36,10 @@ def load_travel_diary(
     :param sample_perc: Float. If different to None, it samples the travel population by the corresponding percentage.
     :param complex: bool
     :param include_loc: bool 
+    :param vectorised: bool, build plans from sorted column arrays rather than nested groupbys
+    :param workers: int, number of processes to build households with, households are sharded by hid.
+        Only used by the groupby reader, the vectorised reader is faster in a single process than
+        pickling households back from workers
     :return: core.Population
     """
     # TODO check for required col headers and give useful error?
@@ -50,6 +60,29 @@ def load_travel_diary(
             weight_col='freq'
             )  # sample the travel population
 
+    if workers > 1 and not vectorised:
+        return parallel_travel_diary_read(
+            trips,
+            person_attributes,
+            hh_attributes,
+            complex=complex,
+            include_loc=include_loc,
+            workers=workers
+            )
+
+    if vectorised:
+        if complex:
+            return vectorised_complex_travel_diary_read(
+                trips,
+                person_attributes,
+                hh_attributes,
+                include_loc
+                )
+        return vectorised_basic_travel_diary_read(
+            trips,
+            person_attributes
+            )
+
     if complex:
         return complex_travel_diary_read(
             trips,
@@ -65,6 +98,7 @@ def load_travel_diary(
 
 def basic_travel_diary_read(trips_df, attributes_df):
     population = core.Population()
+    attributes_map = attributes_lookup(attributes_df)
 
     for hid, household_data in trips_df.groupby('hid'):
 
@@ -81,7 +115,7 @@ def basic_travel_diary_read(trips_df, attributes_df):
             person = core.Person(
                 pid,
                 freq=person_data.freq.iloc[0],
-                attributes=attributes_df.loc[pid].to_dict(),
+                attributes=get_attributes(attributes_map, pid),
                 home_area=home_area
             )
 
@@ -153,13 +187,12 @@ def complex_travel_diary_read(
     include_loc=False
     ):
     population = core.Population()
+    person_attributes_map = attributes_lookup(all_person_attributes)
+    hh_attributes_map = attributes_lookup(all_hh_attributes)
 
     for hid, household_data in trips.groupby('hid'):
 
-        if all_hh_attributes is not None:
-            hh_attributes = all_hh_attributes.loc[hid].to_dict()
-        else:
-            hh_attributes = None
+        hh_attributes = get_attributes(hh_attributes_map, hid)
 
         household = core.Household(hid, attributes=hh_attributes)
 
@@ -167,10 +200,7 @@ def complex_travel_diary_read(
 
             trips = person_data.sort_values('seq')
 
-            if all_person_attributes is not None:
-                person_attributes = all_person_attributes.loc[pid].to_dict()
-            else:
-                person_attributes = None
+            person_attributes = get_attributes(person_attributes_map, pid)
 
             person = core.Person(
                 pid,
@@ -240,6 +270,7 @@ def load_activity_plan(
     person_attributes:Union[pd.DataFrame,None]=None,
     hh_attributes:Union[pd.DataFrame,None]=None,
     sample_perc:Union[float,None]=None,
+    vectorised:bool=False,
     ):
     """
     Turn Activity Plan tabular data inputs (derived from travel survey and attributes) into core population
@@ -250,6 +281,7 @@ def load_activity_plan(
     :param person_attributes: DataFrame
     :param hh_attributes: DataFrame
     :param sample_perc: Float. If different to None, it samples the travel population by the corresponding percentage.
+    :param vectorised: bool, build plans from sorted column arrays rather than nested groupbys
     :return: core.Population
     """
     # TODO check for required col headers and give useful error?
@@ -272,14 +304,16 @@ def load_activity_plan(
             weight_col='freq'
             )  # sample the travel population
 
+    if vectorised:
+        return vectorised_activity_plan_read(trips, person_attributes, hh_attributes)
+
     population = core.Population()
+    person_attributes_map = attributes_lookup(person_attributes)
+    hh_attributes_map = attributes_lookup(hh_attributes)
 
     for hid, household_data in trips.groupby('hid'):
 
-        if hh_attributes is not None:
-            hh_attribute_dict = hh_attributes.loc[hid].to_dict()
-        else:
-            hh_attribute_dict = None
+        hh_attribute_dict = get_attributes(hh_attributes_map, hid)
 
         household = core.Household(hid, attributes=hh_attribute_dict)
 
@@ -292,10 +326,7 @@ def load_activity_plan(
             if not origin_area == home_area:
                 logger.warning(f" Person pid:{pid} plan does not start with 'home' activity")
 
-            if person_attributes is not None:
-                person_attribute_dict = person_attributes.loc[pid].to_dict()
-            else:
-                person_attribute_dict = None
+            person_attribute_dict = get_attributes(person_attributes_map, pid)
 
             person = core.Person(
                 pid,
@@ -344,6 +375,671 @@ def load_activity_plan(
     return population
 
 
+def attributes_lookup(attributes):
+    """
+    Convert an attributes DataFrame (indexed by pid or hid) into a dictionary of records, so that
+    readers look up attributes without a pandas indexing round trip per person or household.
+    :param attributes: {DataFrame, None}
+    :return: {dict, None}
+    """
+    if attributes is None:
+        return None
+    return attributes.to_dict('index')
+
+
+def get_attributes(lookup, key):
+    """
+    Return a copy of the attribute record for the given key, or None if there is no lookup.
+    Records are copied as person and household attributes may be modified later (eg by writers).
+    :param lookup: {dict, None}
+    :param key: pid or hid
+    :return: {dict, None}
+    """
+    if lookup is None:
+        return None
+    return dict(lookup[key])
+
+
+def sort_trips(trips, columns, sort_households=True):
+    """
+    Sort trips once by household, person and sequence and extract the given columns as lists. The
+    freq column is kept as an array, so that person freqs keep their numpy type, as given by the
+    non-vectorised readers. Person boundaries are returned as offsets, such that the trips of the nth person are found
+    between offsets[n] and offsets[n+1].
+    :param trips: DataFrame
+    :param columns: list of column names to extract
+    :param sort_households: bool, if False households are kept in order of first appearance
+    :return: tuple(dict of lists, list of offsets)
+    """
+    if sort_households:
+        trips = trips.sort_values(['hid', 'pid', 'seq'], kind='mergesort')
+    else:
+        trips = trips.assign(_hh_order=pd.factorize(trips.hid)[0]).sort_values(
+            ['_hh_order', 'pid', 'seq'], kind='mergesort'
+            )
+
+    hids = trips.hid.to_numpy()
+    pids = trips.pid.to_numpy()
+    changes = (hids[1:] != hids[:-1]) | (pids[1:] != pids[:-1])
+    offsets = np.concatenate(([0], np.flatnonzero(changes) + 1, [len(trips)])) if len(trips) else np.array([0])
+
+    return {
+        c: trips[c].to_numpy() if c == 'freq' else trips[c].to_numpy().tolist() for c in columns
+        }, offsets.tolist()
+
+
+def build_households(
+    columns,
+    offsets,
+    build_person,
+    person_attributes=None,
+    hh_attributes=None,
+    **kwargs
+    ):
+    """
+    Yield core.Household objects from sorted trip columns (as given by sort_trips).
+    :param columns: dict of lists
+    :param offsets: list of person offsets
+    :param build_person: function returning a core.Person from (pid, columns, start, stop, attributes)
+    :param person_attributes: {dict, None}, person attribute records keyed by pid (see attributes_lookup)
+    :param hh_attributes: {dict, None}, household attribute records keyed by hid (see attributes_lookup)
+    :return: Generator of core.Household
+    """
+    hids = columns['hid']
+    pids = columns['pid']
+    household = None
+    current_hid = None
+
+    for start, stop in zip(offsets[:-1], offsets[1:]):
+        hid = hids[start]
+
+        if household is None or hid != current_hid:
+            if household is not None:
+                yield household
+            household = core.Household(hid, attributes=get_attributes(hh_attributes, hid))
+            current_hid = hid
+
+        pid = pids[start]
+        attributes = get_attributes(person_attributes, pid)
+        household.add(build_person(pid, columns, start, stop, attributes, **kwargs))
+
+    if household is not None:
+        yield household
+
+
+def basic_person_from_columns(pid, columns, start, stop, attributes):
+    """
+    Build a core.Person from sorted trip columns, as per basic_travel_diary_read.
+    """
+    hzone, ozone, dzone = columns['hzone'], columns['ozone'], columns['dzone']
+    purps, modes, tsts, tets = columns['purp'], columns['mode'], columns['tst'], columns['tet']
+
+    home_area = hzone[start]
+    origin_area = ozone[start]
+    activity_map = {home_area: 'home'}
+    activities = ['home', 'work']
+
+    person = core.Person(
+        pid,
+        freq=columns['freq'][start],
+        attributes=attributes,
+        home_area=home_area
+    )
+
+    person.add(
+        activity.Activity(
+            seq=0,
+            act='home' if home_area == origin_area else 'work',
+            area=origin_area,
+            start_time=0,
+        )
+    )
+
+    for n, i in enumerate(range(start, stop)):
+        destination_activity = purps[i]
+        purp = destination_activity.lower()
+        dzone_i = dzone[i]
+
+        person.add(
+            activity.Leg(
+                seq=n,
+                mode=modes[i].lower(),
+                purp=purp,
+                start_area=ozone[i],
+                end_area=dzone_i,
+                start_time=tsts[i] * 60,
+                end_time=tets[i] * 60
+            )
+        )
+
+        if destination_activity in activities and activity_map.get(dzone_i):  # assume return trip
+            person.add(
+                activity.Activity(
+                    seq=n + 1,
+                    act=activity_map[dzone_i],
+                    area=dzone_i,
+                    start_time=tets[i] * 60,
+                )
+            )
+
+        else:
+            person.add(
+                activity.Activity(
+                    seq=n + 1,
+                    act=purp,
+                    area=dzone_i,
+                    start_time=tets[i] * 60,
+                )
+            )
+
+            if dzone_i not in activity_map:  # update history
+                # only keeping first activity at each location to ensure returns home
+                activity_map[dzone_i] = purp
+
+            activities.append(destination_activity)
+
+    person.plan.finalise()
+    return person
+
+
+def complex_person_from_columns(pid, columns, start, stop, attributes, include_loc=False):
+    """
+    Build a core.Person from sorted trip columns, as per complex_travel_diary_read.
+    """
+    ozone, dzone = columns['ozone'], columns['dzone']
+    purps, modes, tsts, tets = columns['purp'], columns['mode'], columns['tst'], columns['tet']
+    if include_loc:
+        start_locs, end_locs = columns['start_loc'], columns['end_loc']
+
+    person = core.Person(
+        pid,
+        freq=columns['freq'][start],
+        attributes=attributes,
+        home_area=columns['hzone'][start]
+        )
+
+    person.add(
+        activity.Activity(
+            seq=0,
+            act=None,
+            area=ozone[start],
+            loc=start_locs[start] if include_loc else None,
+            start_time=0,
+        )
+    )
+
+    for n, i in enumerate(range(start, stop)):
+        start_loc = None
+        end_loc = None
+
+        if include_loc:
+            start_loc = start_locs[i]
+            end_loc = end_locs[i]
+
+        person.add(
+            activity.Leg(
+                seq=n,
+                purp=purps[i].lower(),
+                mode=modes[i].lower(),
+                start_area=ozone[i],
+                end_area=dzone[i],
+                start_loc=start_loc,
+                end_loc=end_loc,
+                start_time=tsts[i] * 60,
+                end_time=tets[i] * 60,
+            )
+        )
+
+        person.add(
+            activity.Activity(
+                seq=n + 1,
+                act=None,
+                area=dzone[i],
+                loc=end_loc,
+                start_time=tets[i] * 60,
+            )
+        )
+
+    person.plan.finalise()
+    person.plan.infer_activities_from_leg_purpose()
+    return person
+
+
+def activity_plan_person_from_columns(pid, columns, start, stop, attributes):
+    """
+    Build a core.Person from sorted trip columns, as per load_activity_plan.
+    """
+    logger = logging.getLogger(__name__)
+
+    ozone, dzone = columns['ozone'], columns['dzone']
+    acts, modes, tsts, tets = columns['activity'], columns['mode'], columns['tst'], columns['tet']
+    origin_area = ozone[start]
+
+    if not origin_area == columns['hzone'][start]:
+        logger.warning(f" Person pid:{pid} plan does not start with 'home' activity")
+
+    person = core.Person(
+        pid,
+        freq=columns['freq'][start],
+        attributes=attributes,
+    )
+
+    person.add(
+        activity.Activity(
+            seq=0,
+            act='home',
+            area=origin_area,
+            start_time=0,
+        )
+    )
+
+    for n, i in enumerate(range(start, stop)):
+        person.add(
+            activity.Leg(
+                seq=n,
+                mode=modes[i].lower(),
+                start_area=ozone[i],
+                end_area=dzone[i],
+                start_time=tsts[i] * 60,
+                end_time=tets[i] * 60
+            )
+        )
+
+        person.add(
+            activity.Activity(
+                seq=n + 1,
+                act=acts[i].lower(),
+                area=dzone[i],
+                start_time=tets[i] * 60,
+            )
+        )
+
+    person.plan.finalise()
+    return person
+
+
+BASIC_COLUMNS = ['hid', 'pid', 'hzone', 'ozone', 'dzone', 'purp', 'mode', 'tst', 'tet', 'freq']
+ACTIVITY_PLAN_COLUMNS = ['hid', 'pid', 'hzone', 'ozone', 'dzone', 'activity', 'mode', 'tst', 'tet', 'freq']
+LOC_COLUMNS = ['start_loc', 'end_loc']
+
+
+def vectorised_basic_travel_diary_read(trips_df, attributes_df):
+    """
+    Equivalent of basic_travel_diary_read that sorts the trips once and builds plans
+    from column arrays, rather than grouping and indexing row by row.
+    """
+    columns, offsets = sort_trips(trips_df, BASIC_COLUMNS)
+    population = core.Population()
+    for household in build_households(
+        columns, offsets, basic_person_from_columns, person_attributes=attributes_lookup(attributes_df)
+    ):
+        population.add(household)
+    return population
+
+
+def vectorised_complex_travel_diary_read(
+    trips,
+    all_person_attributes,
+    all_hh_attributes,
+    include_loc=False
+    ):
+    """
+    Equivalent of complex_travel_diary_read that sorts the trips once and builds plans
+    from column arrays, rather than grouping and indexing row by row.
+    """
+    required = BASIC_COLUMNS + LOC_COLUMNS if include_loc else BASIC_COLUMNS
+    columns, offsets = sort_trips(trips, required)
+    population = core.Population()
+    for household in build_households(
+        columns,
+        offsets,
+        complex_person_from_columns,
+        person_attributes=attributes_lookup(all_person_attributes),
+        hh_attributes=attributes_lookup(all_hh_attributes),
+        include_loc=include_loc
+    ):
+        population.add(household)
+    return population
+
+
+def vectorised_activity_plan_read(trips, person_attributes, hh_attributes):
+    """
+    Equivalent of load_activity_plan that sorts the trips once and builds plans
+    from column arrays, rather than grouping and indexing row by row.
+    """
+    columns, offsets = sort_trips(trips, ACTIVITY_PLAN_COLUMNS)
+    population = core.Population()
+    for household in build_households(
+        columns,
+        offsets,
+        activity_plan_person_from_columns,
+        person_attributes=attributes_lookup(person_attributes),
+        hh_attributes=attributes_lookup(hh_attributes)
+    ):
+        population.add(household)
+    return population
+
+
+TRIP_COLUMNS = ['hid', 'pid', 'seq', 'hzone', 'ozone', 'dzone', 'purp', 'mode', 'tst', 'tet', 'freq']
+ACTIVITY_PLAN_TRIP_COLUMNS = ['hid', 'pid', 'seq', 'hzone', 'ozone', 'dzone', 'activity', 'mode', 'tst', 'tet', 'freq']
+DICTIONARY_COLUMNS = ['hzone', 'ozone', 'dzone', 'purp', 'activity', 'mode']
+
+
+def load_travel_diary_parquet(
+    trips_path:str,
+    person_attributes_path:Union[str,None]=None,
+    hh_attributes_path:Union[str,None]=None,
+    sample_perc:Union[float,None]=None,
+    complex:bool=True,
+    include_loc:bool=False,
+    ):
+    """
+    Load travel diaries and attributes from Parquet (or Arrow dataset) paths into core population
+    format, using the vectorised readers. Only the columns used by the readers are read and string
+    columns are kept dictionary encoded.
+    :param trips_path: str
+    :param person_attributes_path: {str, None}, attributes indexed by (or with a column) pid
+    :param hh_attributes_path: {str, None}, attributes indexed by (or with a column) hid
+    :param sample_perc: Float. If different to None, it samples the travel population by the corresponding percentage.
+    :param complex: bool
+    :param include_loc: bool
+    :return: core.Population
+    """
+    columns = TRIP_COLUMNS + LOC_COLUMNS if include_loc else TRIP_COLUMNS
+    return load_travel_diary(
+        read_parquet_trips(trips_path, columns),
+        person_attributes=read_parquet_attributes(person_attributes_path, 'pid'),
+        hh_attributes=read_parquet_attributes(hh_attributes_path, 'hid'),
+        sample_perc=sample_perc,
+        complex=complex,
+        include_loc=include_loc,
+        vectorised=True,
+    )
+
+
+def load_activity_plan_parquet(
+    trips_path:str,
+    person_attributes_path:Union[str,None]=None,
+    hh_attributes_path:Union[str,None]=None,
+    sample_perc:Union[float,None]=None,
+    ):
+    """
+    Load activity plans and attributes from Parquet (or Arrow dataset) paths into core population
+    format, using the vectorised reader. Only the columns used by the reader are read.
+    :param trips_path: str
+    :param person_attributes_path: {str, None}, attributes indexed by (or with a column) pid
+    :param hh_attributes_path: {str, None}, attributes indexed by (or with a column) hid
+    :param sample_perc: Float. If different to None, it samples the travel population by the corresponding percentage.
+    :return: core.Population
+    """
+    return load_activity_plan(
+        read_parquet_trips(trips_path, ACTIVITY_PLAN_TRIP_COLUMNS),
+        person_attributes=read_parquet_attributes(person_attributes_path, 'pid'),
+        hh_attributes=read_parquet_attributes(hh_attributes_path, 'hid'),
+        sample_perc=sample_perc,
+        vectorised=True
+    )
+
+
+def stream_travel_diary_parquet(
+    trips_path:str,
+    person_attributes:Union[pd.DataFrame,None]=None,
+    hh_attributes:Union[pd.DataFrame,None]=None,
+    complex:bool=True,
+    include_loc:bool=False,
+    ):
+    """
+    Read travel diaries from a Parquet file one row group at a time, yielding each household as
+    soon as all its trips have been read. Trips must be grouped (eg sorted) by hid.
+    :param trips_path: str
+    :param person_attributes: DataFrame
+    :param hh_attributes: DataFrame
+    :param complex: bool
+    :param include_loc: bool
+    :return: Generator of core.Household
+    """
+    if complex:
+        columns = BASIC_COLUMNS + LOC_COLUMNS if include_loc else BASIC_COLUMNS
+        build_person = complex_person_from_columns
+        kwargs = {'include_loc': include_loc}
+    else:
+        columns = BASIC_COLUMNS
+        build_person = basic_person_from_columns
+        kwargs = {}
+        hh_attributes = None
+
+    person_attributes_map = attributes_lookup(person_attributes)
+    hh_attributes_map = attributes_lookup(hh_attributes)
+
+    chunks = iter_parquet_row_groups(trips_path, TRIP_COLUMNS + LOC_COLUMNS if include_loc else TRIP_COLUMNS)
+    for trips in complete_household_chunks(chunks):
+        sorted_columns, offsets = sort_trips(trips, columns, sort_households=False)
+        yield from build_households(
+            sorted_columns,
+            offsets,
+            build_person,
+            person_attributes=person_attributes_map,
+            hh_attributes=hh_attributes_map,
+            **kwargs
+        )
+
+
+def read_parquet_trips(path, columns):
+    """
+    Read the given trip columns from a Parquet file or dataset, string columns are read as
+    (dictionary encoded) categoricals.
+    :param path: str
+    :param columns: list
+    :return: DataFrame
+    """
+    pq = _import_parquet()
+    dictionary = [c for c in columns if c in DICTIONARY_COLUMNS]
+    return pq.read_table(path, columns=columns, read_dictionary=dictionary).to_pandas()
+
+
+def iter_parquet_row_groups(path, columns):
+    """
+    Yield the given trip columns from a Parquet file, one row group at a time.
+    :param path: str
+    :param columns: list
+    :return: Generator of DataFrames
+    """
+    pq = _import_parquet()
+    dictionary = [c for c in columns if c in DICTIONARY_COLUMNS]
+    parquet_file = pq.ParquetFile(path, read_dictionary=dictionary)
+    for i in range(parquet_file.num_row_groups):
+        yield parquet_file.read_row_group(i, columns=columns).to_pandas()
+
+
+def read_parquet_attributes(path, key):
+    """
+    Read attributes from a Parquet file, indexed by the given key (pid or hid). If the key is
+    not already the index, the key column is used (and retained).
+    :param path: {str, None}
+    :param key: str
+    :return: {DataFrame, None}
+    """
+    if path is None:
+        return None
+    _import_parquet()
+    attributes = pd.read_parquet(path)
+    if attributes.index.name != key and key in attributes.columns:
+        attributes = attributes.set_index(key, drop=False)
+    return attributes
+
+
+def _import_parquet():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading parquet requires pyarrow, eg: pip install pyarrow")
+    return pq
+
+
+def shard_by_household(trips, person_attributes, hh_attributes, n):
+    """
+    Split trips and attributes into n shards of whole households. Shards hold contiguous ranges of
+    sorted hids so that concatenating their populations preserves the single process ordering.
+    :param trips: DataFrame
+    :param person_attributes: {DataFrame, None}, indexed by pid
+    :param hh_attributes: {DataFrame, None}, indexed by hid
+    :param n: int
+    :return: list of (trips, person_attributes, hh_attributes) tuples
+    """
+    hids = np.sort(trips.hid.unique())
+    shard_idx = np.searchsorted(hids, trips.hid.to_numpy()) * n // max(len(hids), 1)
+
+    shards = []
+    for _, shard_trips in trips.groupby(shard_idx, sort=True):
+        shard_persons = None
+        if person_attributes is not None:
+            shard_persons = person_attributes[person_attributes.index.isin(shard_trips.pid.unique())]
+        shard_households = None
+        if hh_attributes is not None:
+            shard_households = hh_attributes[hh_attributes.index.isin(shard_trips.hid.unique())]
+        shards.append((shard_trips, shard_persons, shard_households))
+
+    return shards
+
+
+def parallel_travel_diary_read(
+    trips,
+    person_attributes,
+    hh_attributes,
+    complex=True,
+    include_loc=False,
+    workers=2
+    ):
+    """
+    Build a population from travel diaries with the groupby reader in a pool of worker processes.
+    Every household is built independently (including activity inference), so trips and attributes
+    are sharded by hid and the shard populations merged in hid order. Households are pickled back
+    from the workers, which costs more than building them with the vectorised reader, so the
+    vectorised reader is not parallelised.
+    :return: core.Population
+    """
+    shards = shard_by_household(trips, person_attributes, hh_attributes, workers)
+    jobs = [(shard_trips, shard_persons, shard_households, complex, include_loc)
+            for shard_trips, shard_persons, shard_households in shards]
+
+    population = core.Population()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for shard_population in executor.map(_read_travel_diary_shard, jobs):
+            for _, household in shard_population:
+                population.add(household)
+
+    return population
+
+
+def _read_travel_diary_shard(job):
+    trips, person_attributes, hh_attributes, complex, include_loc = job
+    return load_travel_diary(
+        trips,
+        person_attributes,
+        hh_attributes,
+        complex=complex,
+        include_loc=include_loc,
+        )
+
+
+def stream_travel_diary(
+    trips_path:str,
+    person_attributes:Union[pd.DataFrame,None]=None,
+    hh_attributes:Union[pd.DataFrame,None]=None,
+    complex:bool=True,
+    include_loc:bool=False,
+    chunksize:int=100000,
+    ):
+    """
+    Read travel diaries from a csv in chunks, yielding each household as soon as all its trips
+    have been read. Trips must be grouped (eg sorted) by hid. Memory use is bounded by the chunk
+    size rather than the size of the diary.
+    :param trips_path: str, path to trips csv
+    :param person_attributes: DataFrame
+    :param hh_attributes: DataFrame
+    :param complex: bool
+    :param include_loc: bool
+    :param chunksize: int, number of trips read at a time
+    :return: Generator of core.Household
+    """
+    if complex:
+        columns = BASIC_COLUMNS + LOC_COLUMNS if include_loc else BASIC_COLUMNS
+        build_person = complex_person_from_columns
+        kwargs = {'include_loc': include_loc}
+    else:
+        columns = BASIC_COLUMNS
+        build_person = basic_person_from_columns
+        kwargs = {}
+        hh_attributes = None
+
+    person_attributes_map = attributes_lookup(person_attributes)
+    hh_attributes_map = attributes_lookup(hh_attributes)
+
+    chunks = pd.read_csv(trips_path, chunksize=chunksize)
+    for trips in complete_household_chunks(chunks):
+        sorted_columns, offsets = sort_trips(trips, columns, sort_households=False)
+        yield from build_households(
+            sorted_columns,
+            offsets,
+            build_person,
+            person_attributes=person_attributes_map,
+            hh_attributes=hh_attributes_map,
+            **kwargs
+        )
+
+
+def stream_activity_plan(
+    trips_path:str,
+    person_attributes:Union[pd.DataFrame,None]=None,
+    hh_attributes:Union[pd.DataFrame,None]=None,
+    chunksize:int=100000,
+    ):
+    """
+    Read activity plans from a csv in chunks, yielding each household as soon as all its trips
+    have been read. Trips must be grouped (eg sorted) by hid.
+    :param trips_path: str, path to activity plan trips csv
+    :param person_attributes: DataFrame
+    :param hh_attributes: DataFrame
+    :param chunksize: int, number of trips read at a time
+    :return: Generator of core.Household
+    """
+    person_attributes_map = attributes_lookup(person_attributes)
+    hh_attributes_map = attributes_lookup(hh_attributes)
+
+    chunks = pd.read_csv(trips_path, chunksize=chunksize)
+    for trips in complete_household_chunks(chunks):
+        columns, offsets = sort_trips(trips, ACTIVITY_PLAN_COLUMNS, sort_households=False)
+        yield from build_households(
+            columns,
+            offsets,
+            activity_plan_person_from_columns,
+            person_attributes=person_attributes_map,
+            hh_attributes=hh_attributes_map
+        )
+
+
+def complete_household_chunks(chunks):
+    """
+    Re-chunk an iterable of trips DataFrames (grouped by hid) so that no household is split across
+    chunks. Trips of the last household in each chunk are carried over to the next.
+    :param chunks: iterable of DataFrames
+    :return: Generator of DataFrames
+    """
+    carry = None
+    for chunk in chunks:
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if chunk.empty:
+            continue
+        last = chunk.hid.to_numpy() == chunk.hid.iloc[-1]
+        carry = chunk[last]
+        complete = chunk[~last]
+        if not complete.empty:
+            yield complete
+    if carry is not None and not carry.empty:
+        yield carry
+
+
 def read_matsim(
         plans_path,
         attributes_path=None,
@@ -351,7 +1047,11 @@ def read_matsim(
         household_key=None,
         simplify_pt_trips=False,
         autocomplete=True,
-        crop=True
+        crop=True,
+        lockstep=False,
+        workers=1,
+        person_filter=None,
+        plan_filter=None
 ):
     """
     Load a MATSim format population into core population format.
@@ -362,133 +1062,451 @@ def read_matsim(
     :param attributes: path to matsim format xml
     :param weight: int
     :param household_key: {str, None}
+    :param lockstep: bool, read attributes alongside plans (requires the same person order)
+    :param workers: int, number of processes to parse an uncompressed plans file with
+    :param person_filter: {function, None}, only read persons whose attributes (dict) satisfy it
+    :param plan_filter: {function, None}, only read persons whose selected plan (xml element) satisfies it
     :return: Population
     """
     logger = logging.getLogger(__name__)
 
-    population = core.Population()
-
-    if attributes_path:
-        attributes_map = load_attributes_map(attributes_path)
+    if workers > 1 and utils.is_gzipped(plans_path):
+        logger.warning("Parallel reading requires an uncompressed plans file, reading with a single process")
+        workers = 1
+
+    if workers > 1:
+        households = parallel_iter_matsim(
+            plans_path,
+            attributes_path=attributes_path,
+            weight=weight,
+            household_key=household_key,
+            simplify_pt_trips=simplify_pt_trips,
+            autocomplete=autocomplete,
+            crop=crop,
+            workers=workers,
+            person_filter=person_filter,
+            plan_filter=plan_filter
+        )
+    else:
+        households = iter_matsim(
+            plans_path,
+            attributes_path=attributes_path,
+            weight=weight,
+            household_key=household_key,
+            simplify_pt_trips=simplify_pt_trips,
+            autocomplete=autocomplete,
+            crop=crop,
+            lockstep=lockstep,
+            person_filter=person_filter,
+            plan_filter=plan_filter
+        )
 
-    for person_id, plan in selected_plans(plans_path):
+    population = core.Population()
 
-        if attributes_path:
-            attributes = attributes_map[person_id]
+    for household in households:
+        existing = population.get(household.hid)
+        if existing is not None:  # household persons were not contiguous in plans
+            for _, person in household:
+                existing.add(person)
         else:
-            attributes = {}
+            population.add(household)
+
+    return population
 
-        person = core.Person(person_id, attributes=attributes, freq=weight)
 
-        act_seq = 0
-        leg_seq = 0
-        arrival_dt = datetime(1900, 1, 1)
-        departure_dt = None
+def iter_matsim(
+        plans_path,
+        attributes_path=None,
+        weight=1000,
+        household_key=None,
+        simplify_pt_trips=False,
+        autocomplete=True,
+        crop=True,
+        lockstep=False,
+        person_filter=None,
+        plan_filter=None
+):
+    """
+    Parse a MATSim format population, yielding core.Household objects as they are completed,
+    rather than building a Population. If not using a household_key, each person is yielded in
+    their own household. If using a household_key, the persons of each household are expected to
+    be contiguous in the plans, otherwise a household will be yielded in parts.
+    If lockstep, the attributes file is read alongside the plans rather than loaded up front.
+    This requires attributes to be in the same person order as the plans (attributes for persons
+    missing from the plans are skipped).
+    Filters are applied before any plan components are built, so skipped persons only cost a parse.
+    :param plans: path to matsim format xml
+    :param attributes: path to matsim format xml
+    :param weight: int
+    :param household_key: {str, None}
+    :param lockstep: bool
+    :param person_filter: {function, None}, only read persons whose attributes (dict) satisfy it
+    :param plan_filter: {function, None}, only read persons whose selected plan (xml element) satisfies it
+    :return: Generator of core.Household
+    """
+    if not attributes_path:
+        attributes = None
+    elif lockstep:
+        attributes_stream = iter_attributes(attributes_path)
+        attributes = partial(next_attributes, attributes_stream)
+    else:
+        attributes = load_attributes_map(attributes_path).__getitem__
+
+    yield from build_matsim_households(
+        selected_plans(plans_path),
+        attributes=attributes,
+        weight=weight,
+        household_key=household_key,
+        simplify_pt_trips=simplify_pt_trips,
+        autocomplete=autocomplete,
+        crop=crop,
+        person_filter=person_filter,
+        plan_filter=plan_filter
+    )
+
+
+def build_matsim_households(
+        plans,
+        attributes=None,
+        weight=1000,
+        household_key=None,
+        simplify_pt_trips=False,
+        autocomplete=True,
+        crop=True,
+        person_filter=None,
+        plan_filter=None
+):
+    """
+    Yield core.Household objects from (person id, plan element) pairs.
+    :param plans: iterable of (person id, xml plan element)
+    :param attributes: {function, None}, returning attributes dict for a person id
+    :param person_filter: {function, None}, only build persons whose attributes (dict) satisfy it
+    :param plan_filter: {function, None}, only build persons whose plan (xml element) satisfies it
+    :return: Generator of core.Household
+    """
+    household = None
+    current_hid = None
+
+    for person_id, plan in plans:
+
+        person_attributes = attributes(person_id) if attributes else {}
+
+        if person_filter is not None and not person_filter(person_attributes):
+            continue
+        if plan_filter is not None and not plan_filter(plan):
+            continue
+
+        person = parse_matsim_plan(
+            person_id,
+            plan,
+            attributes=person_attributes,
+            weight=weight,
+            simplify_pt_trips=simplify_pt_trips,
+            autocomplete=autocomplete,
+            crop=crop
+        )
 
-        for stage in plan:
-            """
-            Loop through stages incrementing time and extracting attributes.
-            """
-            if stage.tag in ['act', 'activity']:
-                act_seq += 1
-                act_type = stage.get('type')
+        """
+        Check if using households, then update household accordingly.
+        """
+        hid = person_attributes.get(household_key) if household_key else None
+        if hid and hid == current_hid:  # existing household
+            household.add(person)
+            continue
 
-                loc = None
-                x, y = stage.get('x'), stage.get('y')
-                if x and y:
-                    loc = Point(int(float(x)), int(float(y)))
+        if household is not None:
+            yield household
 
-                if act_type == 'pt interaction':
-                    departure_dt = arrival_dt + timedelta(
-                        seconds=0.)  # todo this seems to be the case in matsim for pt interactions
+        if hid:  # new household
+            household = core.Household(hid)
+        else:  # not using households, create dummy household
+            household = core.Household(person_id)
+        household.add(person)
+        current_hid = hid
 
-                else:
-                    departure_dt = utils.safe_strptime(
-                        stage.get('end_time', '23:59:59')
-                    )
+    if household is not None:
+        yield household
 
-                if departure_dt < arrival_dt:
-                    logger.warning(f"Negative duration activity found at pid={person_id}")
 
-                person.add(
-                    activity.Activity(
-                        seq=act_seq,
-                        act=act_type,
-                        loc=loc,
-                        link=stage.get('link'),
-                        area=None,  # todo
-                        start_time=arrival_dt,
-                        end_time=departure_dt
-                    )
-                )
+def parallel_iter_matsim(
+        plans_path,
+        attributes_path=None,
+        weight=1000,
+        household_key=None,
+        simplify_pt_trips=False,
+        autocomplete=True,
+        crop=True,
+        workers=2,
+        person_filter=None,
+        plan_filter=None
+):
+    """
+    Parse an uncompressed MATSim plans file in a pool of worker processes. The file is split into
+    byte ranges on <person> boundaries, each range is parsed by a worker and the resulting
+    households yielded in file order. Attributes are loaded once and shared with the workers
+    (along with any filters, which must be picklable if processes are spawned rather than forked).
+    :return: Generator of core.Household
+    """
+    attributes_map = load_attributes_map(attributes_path) if attributes_path else None
+    options = {
+        'weight': weight,
+        'household_key': household_key,
+        'simplify_pt_trips': simplify_pt_trips,
+        'autocomplete': autocomplete,
+        'crop': crop,
+    }
+    prolog, epilog = root_tags(plans_path)
+    jobs = [
+        (plans_path, start, stop, prolog, epilog, options)
+        for start, stop in person_byte_ranges(plans_path, workers)
+    ]
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_set_worker_state,
+        initargs=(attributes_map, person_filter, plan_filter)
+    ) as executor:
+        for households in executor.map(_read_matsim_range, jobs):
+            yield from households
+
+
+def person_byte_ranges(plans_path, n):
+    """
+    Split an uncompressed MATSim plans file into (up to) n byte ranges of whole <person> elements.
+    Ranges start at a <person tag, the last range stops at the closing tag of the root element.
+    :param plans_path: str
+    :param n: int
+    :return: list of (start, stop) tuples
+    """
+    with open(plans_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        first = _find_person_tag(mm, 0)
+        end = mm.rfind(b'</')
+        if first == -1 or end < first:
+            return []
 
-            if stage.tag == 'leg':
-                leg_seq += 1
+        bounds = [first]
+        for i in range(1, n):
+            offset = _find_person_tag(mm, max(first + (end - first) * i // n, bounds[-1] + 1))
+            if offset == -1 or offset >= end:
+                break
+            bounds.append(offset)
+        bounds.append(end)
 
-                trav_time = stage.get('trav_time')
-                if trav_time:
-                    h, m, s = trav_time.split(":")
-                    leg_duration = timedelta(hours=int(h), minutes=int(m), seconds=int(s))
-                    arrival_dt = departure_dt + leg_duration
-                else:
-                    arrival_dt = departure_dt  # todo this assumes 0 duration unless already known
+    return list(zip(bounds[:-1], bounds[1:]))
 
-                person.add(
-                    activity.Leg(
-                        seq=leg_seq,
-                        mode=stage.get('mode'),
-                        start_loc=None,
-                        end_loc=None,
-                        start_link=stage.get('start_link'),
-                        end_link=stage.get('end_link'),
-                        start_area=None,
-                        end_area=None,
-                        start_time=departure_dt,
-                        end_time=arrival_dt,
-                    )
-                )
 
-        if simplify_pt_trips:
-            person.plan.simplify_pt_trips()
+def root_tags(plans_path):
+    """
+    Return the prolog of an uncompressed MATSim plans file, up to and including the start tag of
+    its root element, and the matching closing tag. Person byte ranges are wrapped in these, so
+    that the root's namespace declarations and the xml declaration (encoding) are kept.
+    :param plans_path: str
+    :return: tuple of bytes, (prolog, closing tag)
+    """
+    with open(plans_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        position = 0
+        while True:
+            start = mm.find(b'<', position)
+            if start == -1:
+                raise UserWarning(f"No root element found in: {plans_path}")
+            if mm[start + 1:start + 2] == b'?':  # xml declaration or processing instruction
+                position = mm.find(b'?>', start) + 2
+            elif mm[start + 1:start + 4] == b'!--':  # comment
+                position = mm.find(b'-->', start) + 3
+            elif mm[start + 1:start + 2] == b'!':  # doctype, possibly with an internal subset
+                close = mm.find(b'>', start)
+                subset = mm.find(b'[', start, close)
+                if subset != -1:
+                    close = mm.find(b'>', mm.find(b']', subset))
+                position = close + 1
+            else:
+                break
+        end = _find_tag_end(mm, start)
+        tag = mm[start:end + 1]
+        prolog = mm[:end + 1]
+    name = tag[1:].split(None, 1)[0].split(b'>', 1)[0].rstrip(b'/')
+    return prolog, b'</' + name + b'>'
+
+
+def _find_tag_end(mm, start):
+    quote = None
+    for i in range(start, len(mm)):
+        char = mm[i:i + 1]
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in (b'"', b"'"):
+            quote = char
+        elif char == b'>':
+            return i
+    return len(mm) - 1
+
+
+def _find_person_tag(mm, start):
+    while True:
+        idx = mm.find(b'<person', start)
+        if idx == -1 or mm[idx + 7:idx + 8] in (b' ', b'>', b'/', b'\t', b'\n', b'\r'):
+            return idx
+        start = idx + 1
+
+
+_worker_state = {}
+
+
+def _set_worker_state(attributes_map, person_filter, plan_filter):
+    _worker_state['attributes'] = attributes_map
+    _worker_state['person_filter'] = person_filter
+    _worker_state['plan_filter'] = plan_filter
+
+
+def _read_matsim_range(job):
+    plans_path, start, stop, prolog, epilog, options = job
+    with open(plans_path, 'rb') as file:
+        file.seek(start)
+        content = file.read(stop - start)
+    target = BytesIO(prolog + content + epilog)
+
+    attributes_map = _worker_state['attributes']
+    attributes = attributes_map.__getitem__ if attributes_map is not None else None
+    plans = (
+        (person.get('id'), plan)
+        for person in utils.parse_elems(target, '{*}person')
+        for plan in person if plan.get('selected') == 'yes'
+    )
+    return list(build_matsim_households(
+        plans,
+        attributes=attributes,
+        person_filter=_worker_state['person_filter'],
+        plan_filter=_worker_state['plan_filter'],
+        **options
+    ))
+
+
+def parse_matsim_plan(
+        person_id,
+        plan,
+        attributes=None,
+        weight=1000,
+        simplify_pt_trips=False,
+        autocomplete=True,
+        crop=True
+):
+    """
+    Build a core.Person from a MATSim plan element.
+    :param person_id: str
+    :param plan: xml plan element
+    :param attributes: dict
+    :param weight: int
+    :return: core.Person
+    """
+    logger = logging.getLogger(__name__)
 
-        if crop:
-            person.plan.crop()
+    person = core.Person(person_id, attributes=attributes, freq=weight)
 
-        if autocomplete:
-            person.plan.autocomplete_matsim()
+    act_seq = 0
+    leg_seq = 0
+    arrival_s = 0
+    departure_s = None
 
+    for stage in plan:
         """
-        Check if using households, then update population accordingly.
+        Loop through stages incrementing time and extracting attributes.
         """
-        if household_key and attributes.get(household_key):  # using households
-            if population.get(attributes.get(household_key)):  # existing household
-                household = population.get(attributes.get(household_key))
-                household.add(person)
-            else:  # new household
-                household = core.Household(attributes.get(household_key))
-                household.add(person)
-                population.add(household)
-        else:  # not using households, create dummy household
-            household = core.Household(person_id)
-            household.add(person)
-            population.add(household)
+        if stage.tag in ['act', 'activity']:
+            act_seq += 1
+            act_type = stage.get('type')
 
-    return population
+            loc = None
+            x, y = stage.get('x'), stage.get('y')
+            if x and y:
+                loc = (int(float(x)), int(float(y)))
+
+            if act_type == 'pt interaction':
+                departure_s = arrival_s  # todo this seems to be the case in matsim for pt interactions
+
+            else:
+                departure_s = utils.matsim_time_to_seconds(
+                    stage.get('end_time', '23:59:59')
+                )
+
+            if departure_s < arrival_s:
+                logger.warning(f"Negative duration activity found at pid={person_id}")
+
+            person.add(
+                activity.Activity(
+                    seq=act_seq,
+                    act=act_type,
+                    loc=loc,
+                    link=stage.get('link'),
+                    area=None,  # todo
+                    start_time=arrival_s,
+                    end_time=departure_s
+                )
+            )
+
+        if stage.tag == 'leg':
+            leg_seq += 1
+
+            trav_time = stage.get('trav_time')
+            if trav_time:
+                arrival_s = departure_s + utils.matsim_time_to_seconds(trav_time)
+            else:
+                arrival_s = departure_s  # todo this assumes 0 duration unless already known
+
+            person.add(
+                activity.Leg(
+                    seq=leg_seq,
+                    mode=stage.get('mode'),
+                    start_loc=None,
+                    end_loc=None,
+                    start_link=stage.get('start_link'),
+                    end_link=stage.get('end_link'),
+                    start_area=None,
+                    end_area=None,
+                    start_time=departure_s,
+                    end_time=arrival_s,
+                )
+            )
+
+    if simplify_pt_trips:
+        person.plan.simplify_pt_trips()
+
+    if crop:
+        person.plan.crop()
+
+    if autocomplete:
+        person.plan.autocomplete_matsim()
+
+    return person
 
 
 def load_attributes_map(attributes_path):
     """
     Given path to MATSim attributes input, return dictionary of attributes (as dict)
     """
-    attributes_map = {}
+    return dict(iter_attributes(attributes_path))
+
+
+def iter_attributes(attributes_path):
+    """
+    Given path to MATSim attributes input, yield person id and attributes (as dict).
+    """
     people = utils.get_elems(attributes_path, "object")
     for person in people:
         att_map = {}
         for attribute in person:
             att_map[attribute.get('name')] = attribute.text
-        attributes_map[person.get('id')] = att_map
+        yield person.get('id'), att_map
+
 
-    return attributes_map
+def next_attributes(attributes_stream, person_id):
+    """
+    Advance a stream of (person id, attributes) to the given person id, return their attributes.
+    """
+    for object_id, attributes in attributes_stream:
+        if object_id == person_id:
+            return attributes
+    raise KeyError(f"Attributes for pid={person_id} not found, attributes must follow plans order")
 
 
 def selected_plans(plans_path):
@@ -530,3 +1548,23 @@ def sample_population(trips_df, sample_perc, attributes_df=None, weight_col='fre
 def load_pickle(path):
     with open(path, 'rb') as file:
         return pickle.load(file)
+
+
+def load_shards(directory, shards=None):
+    """
+    Load a sharded population directory (see pam.shards), merging shards in shard order.
+    :param directory: str, directory written by write.write_shards
+    :param shards: optional iterable of shard indices, defaults to all shards
+    :return: core.Population
+    """
+    return pam.shards.read_shards(directory, shards=shards)
+
+
+def load_shard(directory, i):
+    """
+    Load shard i of a sharded population directory (see pam.shards).
+    :param directory: str
+    :param i: int, shard index
+    :return: core.Population
+    """
+    return pam.shards.read_shard(directory, i)
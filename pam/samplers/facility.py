@@ -55,7 +55,7 @@ class FacilitySampler:
 
     def sample(self, location_idx, activity):
         """
-        Sample a shapely.Point from the given location and for the given activity.
+        Sample (x, y) coordinates from the given location and for the given activity.
         """
 
         idx, loc = self.sample_facility(location_idx, activity)
@@ -103,7 +103,7 @@ class FacilitySampler:
 
     def build_facilities_sampler(self, facilities, zones):
         """
-        Build facility location sampler from osmfs input. The sampler returns a tuple of (uid, Point)
+        Build facility location sampler from osmfs input. The sampler returns a tuple of (uid, (x, y))
         TODO - I do not like having a sjoin and assuming index names here
         TODO - look to move to more carefully defined input data format for facilities
         """
@@ -121,7 +121,7 @@ class FacilitySampler:
                 self.logger.debug(f"Building sampler for zone:{zone} act:{act}.")
                 facs = zone_facs.loc[zone_facs.activity == act]
                 if not facs.empty:
-                    points = [(i, g) for i, g in facs.geometry.items()]
+                    points = [(i, (g.x, g.y)) for i, g in facs.geometry.items()]
                     sampler_dict[str(zone)][act] = inf_yielder(points)
                 else:
                     sampler_dict[str(zone)][act] = None
@@ -141,7 +141,7 @@ class FacilitySampler:
             facility_xml = et.SubElement(
                 facilities_xml,
                 'facility',
-                {'id':str(i), "x" : str(data['loc'].x), "y" : str(data['loc'].y)}
+                {'id':str(i), "x" : str(data['loc'][0]), "y" : str(data['loc'][1])}
                 )
 
             act_xml = et.SubElement(
@@ -1,15 +1,19 @@
 from typing import Union
 import geopandas as gp
-from shapely.geometry import Point
 import random
 import logging
 
+try:
+    from shapely import contains_xy
+except ImportError:  # shapely < 2
+    from shapely.vectorized import contains as contains_xy
+
 
 class RandomPointSampler:
 
     def __init__(self, geoms: Union[gp.GeoSeries, gp.GeoDataFrame], patience=100, fail=True):
         """
-        Returns randomly placed point within given geometries, as defined by geoms. Note that it uses
+        Returns randomly placed (x, y) coordinates within given geometries, as defined by geoms. Note that it uses
         random sampling within the shape's bounding box then checks if point is within given geometry.
         If the method cannot return a valid point within 'patience' attempts then either a RunTimeWarning 
         is raised or returns None.
@@ -36,7 +40,7 @@ class RandomPointSampler:
     def sample(self, idx: Union[int, str]):
         """
         :param idx: index for geom index
-        :return: Point object or None
+        :return: (x, y) tuple of floats or None
         """  
 
         if not idx in self.index:
@@ -54,16 +58,16 @@ class RandomPointSampler:
 
     def sample_point_from_polygon(self, poly):
         """
-        Return random coordinates within polygon, note that will return float coordinates.
+        Return random (x, y) coordinates within polygon, note that will return float coordinates.
         """
         if not poly.is_valid:
             poly.buffer(0)
 
         min_x, min_y, max_x, max_y = poly.bounds
         for _ in range(self.patience):
-            random_point = Point(random.uniform(min_x, max_x), random.uniform(min_y, max_y))
-            if random_point.within(poly):
-                return random_point
+            x, y = random.uniform(min_x, max_x), random.uniform(min_y, max_y)
+            if contains_xy(poly, x, y):
+                return x, y
 
         return None
 
@@ -87,7 +91,7 @@ class GeometryRandomSampler:
         random sampling within the shape's bounding box then checks if point is within given geometry.
         If the method cannot return a valid point within 50 attempts then a RunTimeWarning is raised.
         :param geo_name: name of a geometry in the object's geopandas dataframe
-        :return: Point object
+        :return: (x, y) tuple of floats
         """
 
         try:
@@ -97,14 +101,13 @@ class GeometryRandomSampler:
             print('Unknown region: {}, sampling from {}'.format(geo_region, self.default_region))
             geom = self.default_geom
 
+        if not geom.is_valid:
+            geom = geom.buffer(0)
+
         min_x, min_y, max_x, max_y = geom.bounds
         for attempt in range(patience):
-            random_point = Point(random.uniform(min_x, max_x), random.uniform(min_y, max_y))
-            if geom.is_valid:
-                if random_point.within(geom):
-                    return random_point
-            else:
-                if random_point.within(geom.buffer(0)):
-                    return random_point
+            x, y = random.uniform(min_x, max_x), random.uniform(min_y, max_y)
+            if contains_xy(geom, x, y):
+                return x, y
 
         raise RuntimeWarning(f'unable to sample point from geometry:{geo_region} with {patience} attempts')
@@ -0,0 +1,118 @@
+"""
+On disk population shards.
+
+A sharded population is a directory of binary population files (see pam.binary), one per shard,
+and a JSON manifest (MANIFEST) listing the shard files in shard order:
+
+    shards.json
+    shard-00000.pam
+    shard-00001.pam
+    ...
+
+Shards can be read, processed and written independently (eg by separate processes or machines),
+and merged back in shard order.
+"""
+import json
+import os
+
+import pam.binary as binary
+import pam.columnar as columnar
+import pam.core as core
+from pam.utils import create_local_dir
+
+
+MANIFEST = 'shards.json'
+SHARD_NAME = 'shard-{:05d}.pam'
+
+
+def write_shards(population, directory, n, key=None, compress=False):
+    """
+    Partition population by household (see core.Population.partition) and write it to directory
+    as n shards.
+    :param population: core.Population or columnar.ColumnarPopulation
+    :param directory: str
+    :param n: int, number of shards
+    :param key: optional function of hid, returning int, defaults to core.hid_key
+    :param compress: bool, compress shard files (see binary.write_binary)
+    :return: dict, manifest
+    """
+    population = columnar.as_population(population)
+    create_local_dir(directory)
+    shards = []
+    for i, shard in enumerate(population.partition(n, key=key)):
+        name = SHARD_NAME.format(i)
+        binary.write_binary(shard, os.path.join(directory, name), compress=compress)
+        shards.append({
+            'path': name,
+            'num_households': shard.num_households,
+            'num_people': shard.population,
+        })
+    manifest = {'name': population.name, 'num_shards': n, 'shards': shards}
+    with open(os.path.join(directory, MANIFEST), 'w') as file:
+        json.dump(manifest, file, indent=2)
+    return manifest
+
+
+def write_shard(population, directory, i, compress=False):
+    """
+    (Re)write shard i of a sharded population directory, eg after processing it.
+    :param population: core.Population or columnar.ColumnarPopulation
+    :param directory: str
+    :param i: int, shard index
+    :param compress: bool, compress shard file (see binary.write_binary)
+    """
+    manifest = read_manifest(directory)
+    entry = shard_entry(manifest, i)
+    population = columnar.as_population(population)
+    binary.write_binary(population, os.path.join(directory, entry['path']), compress=compress)
+    entry['num_households'] = population.num_households
+    entry['num_people'] = population.population
+    with open(os.path.join(directory, MANIFEST), 'w') as file:
+        json.dump(manifest, file, indent=2)
+
+
+def read_manifest(directory):
+    """
+    Read the manifest of a sharded population directory.
+    :param directory: str
+    :return: dict
+    """
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        raise UserWarning(f"No shard manifest ({MANIFEST}) found in: {directory}")
+    with open(path) as file:
+        return json.load(file)
+
+
+def read_shard(directory, i):
+    """
+    Read shard i of a sharded population directory.
+    :param directory: str
+    :param i: int, shard index
+    :return: core.Population
+    """
+    entry = shard_entry(read_manifest(directory), i)
+    return binary.read_binary(os.path.join(directory, entry['path']))
+
+
+def read_shards(directory, shards=None):
+    """
+    Read and merge (in shard order) the shards of a sharded population directory.
+    :param directory: str
+    :param shards: optional iterable of shard indices, defaults to all shards
+    :return: core.Population
+    """
+    manifest = read_manifest(directory)
+    if shards is None:
+        shards = range(manifest['num_shards'])
+    population = core.Population(name=manifest['name'])
+    for i in sorted(shards):
+        entry = shard_entry(manifest, i)
+        population.merge(binary.read_binary(os.path.join(directory, entry['path'])))
+    return population
+
+
+def shard_entry(manifest, i):
+    if not 0 <= i < manifest['num_shards']:
+        raise UserWarning(f"Shard {i} not found, population has {manifest['num_shards']} shards.")
+    return manifest['shards'][i]
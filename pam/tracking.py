@@ -0,0 +1,280 @@
+"""
+Change tracking, used to keep population summaries up to date without rescanning populations.
+
+Plan components and their locations, plans, people and households know their owners (the
+activities, plans, people, households and populations that hold them) and report changes to them,
+so that changes reach the populations that hold the changed objects and no others. Populations
+keep counts (of people, activities, legs and frequencies) up to date from reported changes, and
+cache other summaries (see cached) until they next change. Changes to objects that are not held by
+a population, such as newly built plan components, therefore do not affect any population.
+
+Changes are reported as count deltas, (people, activities, legs, size, unsized), where unsized
+counts people whose freq cannot be summed, or None for changes that do not change counts (such as
+changing an activity type).
+
+An owner is held as a single object or, for objects with several owners (eg a location shared by
+activities), as a list of owners. Populations are held by weak reference, so that populations
+sharing households (eg shards, see core.Population.partition) do not keep each other alive.
+"""
+import weakref
+from functools import wraps
+from operator import attrgetter
+
+
+def add_owner(obj, owner):
+    current = obj._owner
+    if current is None:
+        obj._owner = owner
+    elif current.__class__ is list:
+        current.append(owner)
+    else:
+        obj._owner = [current, owner]
+
+
+def remove_owner(obj, owner):
+    """
+    Remove (one occurrence of) owner from the owners of obj, if present.
+    """
+    current = obj._owner
+    if current is owner:
+        obj._owner = None
+    elif current.__class__ is list:
+        for i, other in enumerate(current):
+            if other is owner:
+                del current[i]
+                break
+        if len(current) == 1:
+            obj._owner = current[0]
+        elif not current:
+            obj._owner = None
+
+
+def notify(obj, delta=None):
+    """
+    Report a change of obj to its owners.
+    :param obj: object with an _owner
+    :param delta: optional count deltas (see module docstring)
+    """
+    owner = obj._owner
+    if owner is None:
+        return
+    kind = owner.__class__
+    if kind is list:
+        for other in list(owner):
+            if other.__class__ is weakref.ref:
+                _notify_ref(obj, other, delta)
+            else:
+                other._changed(delta)
+    elif kind is weakref.ref:
+        _notify_ref(obj, owner, delta)
+    else:
+        owner._changed(delta)
+
+
+def _notify_ref(obj, ref, delta):
+    owner = ref()
+    if owner is None:  # population has been garbage collected
+        remove_owner(obj, ref)
+    else:
+        owner._changed(delta)
+
+
+def tracked(setter):
+    """
+    Decorator making a method the setter of a tracked property of the same name. The setter is given
+    the new value and returns the value to be held, which is held as a private attribute (eg _day
+    for day) and read without calling python code. Classes should give the private attribute a
+    class level default, the value before the property is first set.
+    """
+    private = '_' + setter.__name__
+
+    def fset(obj, value):
+        setattr(obj, private, setter(obj, value))
+    return property(attrgetter(private), fset, doc=setter.__doc__)
+
+
+class TrackedList(list):
+    """
+    List that reports added and removed items to its owner (owner._items_changed(added, removed),
+    or owner._item_added(item) when a single item is added). Pickled and copied as a plain list.
+    """
+    __slots__ = ('owner',)
+
+    def __init__(self, owner, items=()):
+        list.__init__(self, items)
+        self.owner = owner
+
+    def __reduce_ex__(self, protocol):
+        return list, (list(self),)
+
+    def append(self, item):
+        list.append(self, item)
+        self.owner._item_added(item)
+
+    def extend(self, items):
+        items = list(items)
+        list.extend(self, items)
+        self.owner._items_changed(items, ())
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def __imul__(self, n):
+        items = list(self)
+        list.__imul__(self, n)
+        if n < 1:
+            self.owner._items_changed((), items)
+        else:
+            self.owner._items_changed(items * (n - 1), ())
+        return self
+
+    def insert(self, index, item):
+        list.insert(self, index, item)
+        self.owner._item_added(item)
+
+    def pop(self, index=-1):
+        item = list.pop(self, index)
+        self.owner._items_changed((), (item,))
+        return item
+
+    def remove(self, item):
+        del self[self.index(item)]
+
+    def clear(self):
+        items = list(self)
+        list.clear(self)
+        self.owner._items_changed((), items)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            removed = list.__getitem__(self, index)
+            value = list(value)
+            list.__setitem__(self, index, value)
+            self.owner._items_changed(value, removed)
+        else:
+            removed = list.__getitem__(self, index)
+            list.__setitem__(self, index, value)
+            self.owner._items_changed((value,), (removed,))
+
+    def __delitem__(self, index):
+        removed = list.__getitem__(self, index)
+        list.__delitem__(self, index)
+        self.owner._items_changed((), removed if isinstance(index, slice) else (removed,))
+
+
+_MISSING = object()
+
+
+class TrackedDict(dict):
+    """
+    Dictionary that reports added and removed values to its owner (owner._items_changed(added,
+    removed)). Also keeps a list of its keys, for random selection by position, that is only
+    rebuilt after keys are added or removed. Pickled and copied as a plain dict.
+    """
+    __slots__ = ('owner', '_keys')
+
+    def __init__(self, owner, items=()):
+        dict.__init__(self, items)
+        self.owner = owner
+        self._keys = None
+
+    def __reduce_ex__(self, protocol):
+        return dict, (dict(self),)
+
+    def key_list(self):
+        """
+        Return (cached) list of keys, in order. Must not be modified.
+        :return: list
+        """
+        if self._keys is None:
+            self._keys = list(self)
+        return self._keys
+
+    def __setitem__(self, key, value):
+        old = dict.get(self, key, _MISSING)
+        dict.__setitem__(self, key, value)
+        if old is _MISSING:
+            self._keys = None
+            self.owner._items_changed((value,), ())
+        elif old is not value:
+            self.owner._items_changed((value,), (old,))
+
+    def __delitem__(self, key):
+        value = dict.__getitem__(self, key)
+        dict.__delitem__(self, key)
+        self._keys = None
+        self.owner._items_changed((), (value,))
+
+    def pop(self, key, *default):
+        if key not in self:
+            return dict.pop(self, key, *default)
+        value = dict.__getitem__(self, key)
+        del self[key]
+        return value
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        self._keys = None
+        self.owner._items_changed((), (value,))
+        return key, value
+
+    def clear(self):
+        values = list(self.values())
+        dict.clear(self)
+        self._keys = None
+        self.owner._items_changed((), values)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+
+def get_state(obj, tracked, transient):
+    """
+    Return pickle state of an object with tracked properties (held under public names, so that
+    they are tracked when set by set_state) and without its transient (tracking) attributes.
+    """
+    state = {name: value for name, value in obj.__dict__.items() if name not in transient}
+    for name in tracked:
+        private = '_' + name
+        if private in state:
+            state[name] = state.pop(private)
+    return state
+
+
+def set_state(obj, state, transient):
+    """
+    Restore pickle state, assigning attributes so that tracked properties are tracked. Transient
+    attributes (and the cache of states pickled before tracking was introduced) are ignored.
+    """
+    for name, value in state.items():
+        if name not in transient and name != '_cache':
+            setattr(obj, name, value)
+
+
+def cached(method):
+    """
+    Decorator caching the result of a method (without arguments) of a population until the
+    population next changes (ie its _version changes).
+    """
+    name = method.__name__
+
+    @wraps(method)
+    def wrapper(self):
+        hit = self._cache.get(name)
+        if hit is not None and hit[0] == self._version:
+            return hit[1]
+        value = method(self)
+        self._cache[name] = (self._version, value)
+        return value
+    return wrapper
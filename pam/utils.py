@@ -1,7 +1,7 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import lru_cache
 import gzip
 from lxml import etree
-from io import BytesIO
 import os
 
 
@@ -16,22 +16,77 @@ def minutes_to_datetime(minutes: int):
     return datetime(1900, 1, 1+days, hours, minutes)
 
 
+# Memo table size for matsim time parsing and formatting, more than the seconds in a day
+TIME_CACHE_SIZE = 2 ** 17
+
+
 def datetime_to_matsim_time(dt):
     """
     Convert datetime to matsim format time (08:27:33)
     """
-    return dt.strftime("%H:%M:%S")
+    return seconds_to_matsim_time(dt_to_s(dt))
 
 
 def timedelta_to_matsim_time(td):
     """
     Convert datetime timedelta object to matsim string format (00:00:00)
     """
-    hours, remainder = divmod(td.total_seconds(), 3600)
+    return seconds_to_matsim_time(td.days * 86400 + td.seconds)
+
+
+@lru_cache(maxsize=TIME_CACHE_SIZE)
+def seconds_to_matsim_time(seconds: int):
+    """
+    Convert integer seconds to matsim string format (00:00:00), hours may exceed 23.
+    """
+    hours, remainder = divmod(seconds, 3600)
     minutes, seconds = divmod(remainder, 60)
-    return f"{int(hours):02}:{int(minutes):02}:{int(seconds):02}"
+    return f"{hours:02}:{minutes:02}:{seconds:02}"
+
+
+@lru_cache(maxsize=TIME_CACHE_SIZE)
+def matsim_time_to_seconds(s: str):
+    """
+    Parse matsim format time string (hh:mm:ss) into integer seconds, hh may exceed 23.
+    """
+    hours, minutes, seconds = s.split(':')
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+# Plan times are anchored to this (arbitrary) date
+PLAN_DAY = datetime(1900, 1, 1)
+
+
+@lru_cache(maxsize=TIME_CACHE_SIZE)
+def seconds_to_datetime(seconds: int):
+    """
+    Convert integer seconds since the start of the plan day to datetime (anchored at 1900-01-01).
+    """
+    return PLAN_DAY + timedelta(seconds=seconds)
+
+
+def datetime_to_seconds(dt):
+    """
+    Convert datetime to integer seconds since the start of the plan day (1900-01-01), unlike
+    dt_to_s this counts whole days, so that times after midnight are larger than the day's times.
+    Sub-second precision is dropped.
+    """
+    td = dt - PLAN_DAY
+    return td.days * 86400 + td.seconds
+
+
+def plan_seconds(value):
+    """
+    Convert a plan time, given as datetime or as integer seconds since the start of the plan day,
+    to integer seconds. None is passed through.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return datetime_to_seconds(value)
+    return int(value)
+
 
-      
 def dt_to_s(dt):
     """
     Convert datetime to seconds since start of day.
@@ -50,21 +105,23 @@ def td_to_s(td):
 
 def get_elems(path, tag):
     """
-    Wrapper for unzipping and dealing with xml namespaces
+    Wrapper for unzipping and dealing with xml namespaces. The file is streamed (and decompressed)
+    in a single pass, namespaces are matched as they are found using a wildcard tag, so memory use
+    does not depend on file size.
     :param path: xml path string
     :param tag: The tag type to extract , e.g. 'link'
     :return: Generator of elements
     """
-    target = try_unzip(path)
-    tag = get_tag(target, tag)
-    target = try_unzip(path)  # need to repeat :(
-    return parse_elems(target, tag)
+    if not tag.startswith('{'):
+        tag = '{*}' + tag
+    with open_xml(path) as target:
+        yield from parse_elems(target, tag)
 
 
 def parse_elems(target, tag):
     """
     Traverse the given XML tree, retrieving the elements of the specified tag.
-    :param target: Target xml, either BytesIO object or string path
+    :param target: Target xml, either file object or string path
     :param tag: The tag type to extract , e.g. 'link'
     :return: Generator of elements
     """
@@ -76,43 +133,23 @@ def parse_elems(target, tag):
     del doc
 
 
-def try_unzip(path):
+def open_xml(path):
     """
-    Attempts to unzip xml at given path, if fails, returns path
+    Open xml at given path for streaming, gzipped files are decompressed on the fly.
     :param path: xml path string
-    :return: either BytesIO object or string path
-    """
-    try:
-        with gzip.open(path) as unzipped:
-            xml = unzipped.read()
-            target = BytesIO(xml)
-            return target
-    except OSError:
-        return path
-
-
-def get_tag(target, tag):
-    """
-    Check for namespace declaration. If they exists return tag string
-    with namespace [''] ie {namespaces['']}tag. If no namespaces declared
-    return original tag
-    TODO Not working with iterparse, generated elem also have ns which is dealt with later
-    """
-    nsmap = {}
-    doc = etree.iterparse(target, events=('end', 'start-ns',))
-    count = 0
-    for event, element in doc:
-        count += 1
-        if event == 'start-ns':
-            nsmap[element[0]] = element[1]
-        if count == 10:  # assume namespace declared at top so can break early
-            del doc
-            break
-    if not nsmap:
-        return tag
-    else:
-        tag = '{' + nsmap[''] + '}' + tag
-        return tag
+    :return: binary file object
+    """
+    if is_gzipped(path):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def is_gzipped(path):
+    """
+    Check for gzip magic bytes at start of file at given path.
+    """
+    with open(path, 'rb') as file:
+        return file.read(2) == b'\x1f\x8b'
 
 
 def strip_namespace(elem):
@@ -179,13 +216,10 @@ def xml_content(content, matsim_DOCTYPE, matsim_filename):
     return xml_version+doc_type+tree
 
 
+@lru_cache(maxsize=TIME_CACHE_SIZE)
 def safe_strptime(s):
     """
     safely parse string into datatime, can cope with time strings in format hh:mm:ss
     if hh > 23 then adds a day
     """
-    if int(s.split(':')[0]) > 23:
-        days, hours = divmod(int(s.split(':')[0]),24)
-        string = f"{days+1}-{hours:02d}" + s[-6:]
-        return datetime.strptime(string, '%d-%H:%M:%S')
-    return datetime.strptime(s, '%H:%M:%S')
+    return datetime(1900, 1, 1) + timedelta(seconds=matsim_time_to_seconds(s))
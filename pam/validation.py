@@ -0,0 +1,105 @@
+"""
+Population wide plan validation, reporting all failures rather than raising on the first.
+
+A validation report is a dictionary:
+
+    {
+        'num_people': int,
+        'num_invalid': int, number of people with any failure
+        'counts': {'sequence': int, 'times': int, 'locations': int},
+        'failures': {'sequence': [(hid, pid), ...], 'times': [...], 'locations': [...]},
+    }
+
+Failures are listed in population order. Checks are as per activity.Plan.valid_sequence,
+valid_times and valid_locations, a check that cannot be completed (eg locations that cannot be
+compared) is reported as a failure. Other errors are raised.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+
+CATEGORIES = ('sequence', 'times', 'locations')
+
+# errors raised by checks that cannot be completed: IndexError for empty plans, AttributeError for
+# locations of components out of sequence and UserWarning for locations that cannot be compared
+CHECK_ERRORS = (IndexError, AttributeError, UserWarning)
+
+
+def plan_failures(plan):
+    """
+    Return the validation categories failed by plan.
+    :param plan: activity.Plan
+    :return: list of str
+    """
+    failures = []
+    for category in CATEGORIES:
+        try:
+            valid = getattr(plan, f'valid_{category}')
+        except CHECK_ERRORS:
+            valid = False
+        if not valid:
+            failures.append(category)
+    return failures
+
+
+def validate_households(households):
+    """
+    Validate plans of people in households.
+    :param households: iterable of (hid, core.Household)
+    :return: dict, validation report
+    """
+    report = empty_report()
+    for hid, household in households:
+        for pid, person in household.people.items():
+            add_person(report, hid, pid, plan_failures(person.plan))
+    return report
+
+
+def validate_population(population, workers=1):
+    """
+    Validate plans of all people in population, optionally in a pool of worker processes.
+    Households are split into contiguous chunks, one per worker, and reports merged in order.
+    :param population: core.Population
+    :param workers: int, number of processes
+    :return: dict, validation report
+    """
+    households = list(population.households.items())
+    if workers <= 1 or len(households) < 2:
+        return validate_households(households)
+    size = -(-len(households) // workers)
+    chunks = [households[i:i + size] for i in range(0, len(households), size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return merge_reports(executor.map(validate_households, chunks))
+
+
+def empty_report():
+    return {
+        'num_people': 0,
+        'num_invalid': 0,
+        'counts': {category: 0 for category in CATEGORIES},
+        'failures': {category: [] for category in CATEGORIES},
+    }
+
+
+def add_person(report, hid, pid, failures):
+    report['num_people'] += 1
+    if failures:
+        report['num_invalid'] += 1
+    for category in failures:
+        report['counts'][category] += 1
+        report['failures'][category].append((hid, pid))
+
+
+def merge_reports(reports):
+    """
+    Merge validation reports, in order.
+    :param reports: iterable of dict
+    :return: dict
+    """
+    merged = empty_report()
+    for report in reports:
+        merged['num_people'] += report['num_people']
+        merged['num_invalid'] += report['num_invalid']
+        for category in CATEGORIES:
+            merged['counts'][category] += report['counts'][category]
+            merged['failures'][category].extend(report['failures'][category])
+    return merged
@@ -4,3 +4,6 @@ from datetime import datetime
 # End Of Day
 # END_OF_DAY = datetime(year=1900, month=1, day=1, hour=23, minute=59, second=59)
 END_OF_DAY = datetime(year=1900, month=1, day=2, hour=0, minute=0, second=0)
+
+# End Of Day as integer seconds since the start of the plan day
+END_OF_DAY_SECONDS = 24 * 60 * 60
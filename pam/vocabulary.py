@@ -0,0 +1,135 @@
+"""
+Interned integer codes for categorical plan values (activity types, modes, purposes and areas).
+
+Plan components store codes from the shared VOCABULARY rather than the values themselves, the
+values remain available through the components' string facing attributes (eg Activity.act). Codes
+are process wide so that components from different populations can be compared without a
+reference back to their population. Codes are never written out, pickled components carry values.
+
+Values are interned by type and value, so that values of different types (eg 1, 1.0 and True)
+are given different codes and each reads back as it was given. Numpy scalars are interned as the
+equivalent python values. Missing values (None and NaN) are coded as NONE. Unhashable values
+cannot be interned and are rejected. The vocabulary therefore only grows with the number of
+distinct values, it is also bounded by its limit (LIMIT values for the shared VOCABULARY).
+"""
+import numpy as np
+
+
+# code of None
+NONE = 0
+
+# maximum number of values held by the shared VOCABULARY
+LIMIT = 2 ** 24
+
+
+class Vocabulary:
+    """
+    Intern hashable values as small integer codes. Values are interned by type and value, so that
+    the value returned for a code is of the type given (eg 1 and 1.0 are given different codes).
+    Missing values (None and NaN) are coded as NONE.
+    :param limit: optional maximum number of values, encoding a new value beyond this raises
+    """
+
+    def __init__(self, limit=None):
+        self.values = [None]
+        self.codes = {}
+        self.lowered = [NONE]
+        self.limit = limit
+
+    def encode(self, value):
+        """
+        Return the code for value, interning it if required.
+        :param value: hashable
+        :return: int
+        """
+        if value is None:
+            return NONE
+        try:
+            code = self.codes.get((value.__class__, value))
+        except TypeError:
+            raise UserWarning(f"Cannot encode unhashable value: {value!r}")
+        if code is None:
+            code = self.intern(value)
+        return code
+
+    def intern(self, value):
+        key = (value.__class__, value)
+        if isinstance(value, np.generic):  # numpy scalar, share the code of the python value
+            code = self.encode(value.item())
+            if code != NONE:
+                self.codes[key] = code
+            return code
+        if isinstance(value, float) and value != value:  # NaN
+            return NONE
+        if self.limit is not None and len(self) >= self.limit:
+            raise UserWarning(
+                f"Cannot encode {value!r}, vocabulary limit of {self.limit} values reached."
+            )
+        code = self.append(value)
+        self.codes[key] = code
+        if isinstance(value, str):
+            lowered = value.lower()
+            self.lowered[code] = code if lowered == value else self.encode(lowered)
+        return code
+
+    def append(self, value):
+        code = len(self.values)
+        self.values.append(value)
+        self.lowered.append(code)
+        return code
+
+    def get(self, value, default=None):
+        """
+        Return the code for value if it has been interned, without interning it.
+        :param value: hashable
+        :param default: returned if value has not been interned
+        :return: int
+        """
+        if isinstance(value, np.generic):
+            value = value.item()
+        if value is None or (isinstance(value, float) and value != value):
+            return NONE
+        try:
+            return self.codes.get((value.__class__, value), default)
+        except TypeError:
+            return default
+
+    def decode(self, code):
+        """
+        Return the value for code.
+        :param code: int
+        :return: hashable
+        """
+        return self.values[code]
+
+    def lower(self, code):
+        """
+        Return the code of the lower case of value with given code. Non-string values are their own
+        lower case. Lower cases are found once, when values are interned, so hot loops may index
+        the lowered list directly.
+        :param code: int
+        :return: int
+        """
+        return self.lowered[code]
+
+    def lower_value(self, code):
+        """
+        Return the lower case of value with given code (without allocating a new string).
+        :param code: int
+        :return: hashable
+        """
+        return self.values[self.lower(code)]
+
+    def encode_all(self, values):
+        """
+        Return set of codes for given values.
+        :param values: iterable
+        :return: set
+        """
+        return {self.encode(value) for value in values}
+
+    def __len__(self):
+        return len(self.values) - 1
+
+
+VOCABULARY = Vocabulary(limit=LIMIT)
@@ -6,19 +6,24 @@ from lxml import etree as et
 from shapely.geometry import Point, LineString
 
 from .activity import Activity, Leg
-from .utils import datetime_to_matsim_time as dttm
-from .utils import timedelta_to_matsim_time as tdtm
+from . import columnar
+from . import shards
+from .utils import seconds_to_matsim_time as stm
 from .utils import minutes_to_datetime as mtdt
 from .utils import write_xml, create_local_dir
+from .variables import END_OF_DAY_SECONDS
 
 
 def write_travel_diary(population, path, attributes_path=None):
     """
 	Write a core population object to the standard population tabular formats.
 	Only write attributes if given attributes_path.
-	:param population: core.Population
+	:param population: {core.Population, columnar.ColumnarPopulation}
 	:return: None
 	"""
+    if isinstance(population, columnar.ColumnarPopulation):
+        return write_columnar_travel_diary(population, path, attributes_path)
+
     record = []
     for hid, pid, person in population.people():
         for seq, leg in enumerate(person.legs):
@@ -49,29 +54,65 @@ def write_travel_diary(population, path, attributes_path=None):
         pd.DataFrame(record).to_csv(attributes_path)
 
 
-def write_od_matrices(
-        population, 
-        path, 
-        leg_filter=None, 
-        person_filter=None, 
-        time_minutes_filter=None):
-
+def write_columnar_travel_diary(population, path, attributes_path=None):
     """
-	Write a core population object to tabular O-D weighted matrices.
-	Optionally segment matrices by leg attributes(mode/ purpose), person attributes or specific time periods.
-    A single filter can be applied each time.
-	:param population: core.Population
-    :param path: directory to write OD matrix files
-    :param leg_filter: select between 'Mode', 'Purpose'
-    :param person_filter: select between given attribute categories (column names) from person attribute data
-    :param time_minutes_filter: a list of tuples to slice times, 
-    e.g. [(start_of_slicer_1, end_of_slicer_1), (start_of_slicer_2, end_of_slicer_2), ... ]
+	Write a columnar population to the standard population tabular formats, as per
+	write_travel_diary.
+	:param population: columnar.ColumnarPopulation
 	:return: None
 	"""
-    create_local_dir(path)
+    is_leg = population.kind == columnar.LEG
+    person = population.component_person()[is_leg]
+    homes = columnar.object_array(population.home_locations())
+    legs = population.leg_table()
+    pd.DataFrame({
+        'pid': legs.pid,
+        'hid': legs.hid,
+        'hzone': homes[person],
+        'ozone': legs.ozone,
+        'dzone': legs.dzone,
+        'seq': legs.groupby(person).cumcount(),
+        'purp': legs.purp,
+        'mode': legs['mode'],
+        'tst': [dt.time() for dt in columnar.to_datetimes(legs.start_s)],
+        'tet': [dt.time() for dt in columnar.to_datetimes(legs.end_s)],
+        'freq': legs.freq,
+    }).to_csv(path)
+
+    if attributes_path:
+        attributes = population.person_attributes.reset_index(drop=True)
+        attributes['hid'] = population.hids[population.person_household()]
+        attributes['pid'] = population.pids
+        attributes.to_csv(attributes_path)
+
+
+def od_legs_table(population, person_filter=None):
+    """
+	Return a table of legs, with columns as required for write_od_matrices.
+	:param population: {core.Population, columnar.ColumnarPopulation}
+	:param person_filter: include person attributes if set
+	:return: pandas.DataFrame
+	"""
+    if isinstance(population, columnar.ColumnarPopulation):
+        legs = population.leg_table()
+        data_legs = pd.DataFrame({
+            'Household ID': legs.hid,
+            'Person ID': legs.pid,
+            'Origin': legs.ozone,
+            'Destination': legs.dzone,
+            'Purpose': legs.purp,
+            'Mode': legs['mode'],
+            'Sequence': legs.seq,
+            'Start time': columnar.to_datetimes(legs.start_s),
+            'End time': columnar.to_datetimes(legs.end_s),
+        })
+        if person_filter:
+            person = population.component_person()[population.kind == columnar.LEG]
+            attributes = population.person_attributes.iloc[person].reset_index(drop=True)
+            data_legs = pd.concat([data_legs, attributes], axis=1)
+        return data_legs
 
     legs = []
-    
     for hid, household in population.households.items():
         for pid, person in household.people.items():
             for leg in person.legs:
@@ -88,12 +129,35 @@ def write_od_matrices(
                     legs.append({**data, **person.attributes})
                 else:
                     legs.append(data)         
-        
-    df_total = pd.DataFrame(data=legs, columns = ['Origin','Destination']).set_index('Origin')              
+    return pd.DataFrame(data=legs)
+
+
+def write_od_matrices(
+        population, 
+        path, 
+        leg_filter=None, 
+        person_filter=None, 
+        time_minutes_filter=None):
+
+    """
+	Write a core (or columnar) population object to tabular O-D weighted matrices.
+	Optionally segment matrices by leg attributes(mode/ purpose), person attributes or specific time periods.
+    A single filter can be applied each time.
+	:param population: {core.Population, columnar.ColumnarPopulation}
+    :param path: directory to write OD matrix files
+    :param leg_filter: select between 'Mode', 'Purpose'
+    :param person_filter: select between given attribute categories (column names) from person attribute data
+    :param time_minutes_filter: a list of tuples to slice times, 
+    e.g. [(start_of_slicer_1, end_of_slicer_1), (start_of_slicer_2, end_of_slicer_2), ... ]
+	:return: None
+	"""
+    create_local_dir(path)
+
+    data_legs = od_legs_table(population, person_filter)
+
+    df_total = pd.DataFrame(data=data_legs, columns = ['Origin','Destination']).set_index('Origin')              
     matrix = df_total.pivot_table(values='Destination', index='Origin', columns='Destination', fill_value=0, aggfunc=len)
     matrix.to_csv(os.path.join(path, 'total_od.csv'))
-
-    data_legs = pd.DataFrame(data=legs)
     
     if leg_filter:
         data_legs_grouped=data_legs.groupby(leg_filter)
@@ -141,13 +205,29 @@ def write_matsim(
 	:param population: core.Population
 	:return: None
 	"""
+    population = columnar.as_population(population)
     # note - these are written sequentially to reduce RAM required...
     write_matsim_plans(population, plans_path, comment)
     write_matsim_attributes(population, attributes_path, comment, household_key=household_key)
 
 
+def write_shards(population, directory, n, key=None, compress=False):
+    """
+    Write population to directory as n shards of whole households (see pam.shards), to be read by
+    read.load_shards.
+    :param population: core.Population or columnar.ColumnarPopulation
+    :param directory: str
+    :param n: int, number of shards
+    :param key: optional function of hid, returning int, defaults to core.hid_key
+    :param compress: bool, compress shard files
+    :return: dict, manifest
+    """
+    return shards.write_shards(population, directory, n, key=key, compress=compress)
+
+
 def write_matsim_plans(population, location, comment=None):
     # todo write this incrementally to save memory: https://lxml.de/api.html#incremental-xml-generation
+    population = columnar.as_population(population)
 
     population_xml = et.Element('population')
 
@@ -162,23 +242,25 @@ def write_matsim_plans(population, location, comment=None):
             plan_xml = et.SubElement(person_xml, 'plan', {'selected': 'yes'})
             for component in person[:-1]:
                 if isinstance(component, Activity):
+                    x, y = matsim_xy(component, pid)
                     et.SubElement(plan_xml, 'act', {
                         'type': component.act,
-                        'x': str(float(component.location.loc.x)),
-                        'y': str(float(component.location.loc.y)),
-                        'end_time': dttm(component.end_time)
+                        'x': x,
+                        'y': y,
+                        'end_time': stm(component.end_s % END_OF_DAY_SECONDS)
                     }
                                   )
                 if isinstance(component, Leg):
                     et.SubElement(plan_xml, 'leg', {
                         'mode': component.mode,
-                        'trav_time': tdtm(component.duration)})
+                        'trav_time': stm(component.duration_s)})
 
             component = person[-1]  # write the last activity without an end time
+            x, y = matsim_xy(component, pid)
             et.SubElement(plan_xml, 'act', {
                 'type': component.act,
-                'x': str(float(component.location.loc.x)),
-                'y': str(float(component.location.loc.y)),
+                'x': x,
+                'y': y,
             }
             )
 
@@ -186,7 +268,23 @@ def write_matsim_plans(population, location, comment=None):
     # todo assuming v5?
 
 
+def matsim_xy(activity, pid):
+    """
+    Return the coordinates of an activity as strings for MATSim plans.
+    :param activity: Activity
+    :param pid: person id, for the error message
+    :return: tuple(str, str)
+    """
+    location = activity.location
+    if location.x is None:
+        raise UserWarning(
+            f"Cannot write activity {activity.act} of person {pid} to MATSim plans without coordinates (loc)."
+        )
+    return str(location.x), str(location.y)
+
+
 def write_matsim_attributes(population, location, comment=None, household_key=None):
+    population = columnar.as_population(population)
     attributes_xml = et.Element('objectAttributes')  # start forming xml
 
     # Add some useful comments
@@ -213,6 +311,7 @@ def write_matsim_attributes(population, location, comment=None, household_key=No
 
 def to_csv(population, dir, crs=None, to_crs="EPSG:4326"):
 
+    population = columnar.as_population(population)
     create_local_dir(dir)
 
     hhs = []
@@ -229,8 +328,8 @@ def to_csv(population, dir, crs=None, to_crs="EPSG:4326"):
             hh_data.update(hh.attributes)
         if hh.location.area is not None:
             hh_data['area'] = hh.location.area
-        if hh.location.loc is not None:
-            hh_data['geometry'] = hh.location.loc
+        if hh.location.x is not None:
+            hh_data['geometry'] = hh.location.xy
 
         hhs.append(hh_data)
 
@@ -244,8 +343,8 @@ def to_csv(population, dir, crs=None, to_crs="EPSG:4326"):
                 people_data.update(person.attributes)
             if hh.location.area is not None:
                 people_data['area'] = hh.location.area
-            if hh.location.loc is not None:
-                people_data['geometry'] = hh.location.loc
+            if hh.location.x is not None:
+                people_data['geometry'] = hh.location.xy
 
             people.append(people_data)
 
@@ -270,8 +369,8 @@ def to_csv(population, dir, crs=None, to_crs="EPSG:4326"):
                         leg_data['start_area'] = component.start_location.area
                     if component.end_location.area is not None:
                         leg_data['end_area'] = component.end_location.area
-                    if component.start_location.loc is not None and component.end_location.loc is not None:
-                        leg_data['geometry'] = LineString((component.start_location.loc, component.end_location.loc))
+                    if component.start_location.x is not None and component.end_location.x is not None:
+                        leg_data['geometry'] = (component.start_location.xy, component.end_location.xy)
 
                     legs.append(leg_data)
                 
@@ -288,8 +387,8 @@ def to_csv(population, dir, crs=None, to_crs="EPSG:4326"):
                     }
                     if component.location.area is not None:
                         act_data['area'] = component.location.area
-                    if component.location.loc is not None:
-                        act_data['geometry'] = component.location.loc
+                    if component.location.x is not None:
+                        act_data['geometry'] = component.location.xy
 
                     acts.append(act_data)
 
@@ -312,6 +411,7 @@ def to_csv(population, dir, crs=None, to_crs="EPSG:4326"):
 
 def save_geojson(df, crs, to_crs, path):
     if 'geometry' in df.columns:
+        df['geometry'] = build_geometries(df['geometry'])
         df = gp.GeoDataFrame(df, geometry='geometry')
         if crs is not None:
             df.crs = crs
@@ -321,6 +421,24 @@ def save_geojson(df, crs, to_crs, path):
     return df
 
 
+def build_geometries(coordinates):
+    """
+    Build geometries from location coordinates, (x, y) tuples as Points and ((x, y), (x, y))
+    tuples as LineStrings. Missing coordinates are left as None.
+    :param coordinates: pandas.Series
+    :return: list
+    """
+    geometries = []
+    for coords in coordinates.tolist():
+        if not isinstance(coords, tuple):
+            geometries.append(None)
+        elif isinstance(coords[0], tuple):
+            geometries.append(LineString(coords))
+        else:
+            geometries.append(Point(coords))
+    return geometries
+
+
 def write_population_csv(list_of_populations, export_path):
     """"
     This function creates csv export files of populations, households, people, legs and actvities. 
@@ -335,6 +453,7 @@ def write_population_csv(list_of_populations, export_path):
     activities = []
 
     for idx, population in enumerate(list_of_populations):
+        population = columnar.as_population(population)
         populations.append(
             {
                 'Scenario ID': idx,
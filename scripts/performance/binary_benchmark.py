@@ -0,0 +1,54 @@
+import argparse
+import os
+import tempfile
+import time
+
+from pam import read
+from pam import binary
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def compare_formats(population, directory):
+    """
+    Write and reload population as a pickle and in the binary format, returning a row of
+    (format, file size, write seconds, read seconds) for each.
+    """
+    rows = []
+    pickle_path = os.path.join(directory, 'population.pkl')
+    _, write_s = timed(population.pickle, pickle_path)
+    _, read_s = timed(read.load_pickle, pickle_path)
+    rows.append(('pickle', os.path.getsize(pickle_path), write_s, read_s))
+
+    for compress in (False, True):
+        path = os.path.join(directory, f'population_{compress}.pam')
+        _, write_s = timed(binary.write_binary, population, path, compress=compress)
+        _, read_s = timed(binary.read_binary, path)
+        _, load_s = timed(binary.load_columnar, path)
+        name = 'binary (zlib)' if compress else 'binary'
+        rows.append((name, os.path.getsize(path), write_s, read_s))
+        rows.append((name + ' columnar', os.path.getsize(path), write_s, load_s))
+    return rows
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(
+        description='Compare pickle and binary population file sizes and load times')
+    arg_parser.add_argument('-p',
+                            '--plans',
+                            help='the path to the MATSim plans file',
+                            required=True)
+    arg_parser.add_argument('-a',
+                            '--attributes',
+                            help='the path to the MATSim attributes file',
+                            required=True)
+    args = vars(arg_parser.parse_args())
+
+    population = read.read_matsim(args['plans'], args['attributes'])
+    with tempfile.TemporaryDirectory() as directory:
+        for name, size, write_s, read_s in compare_formats(population, directory):
+            print("{:<24} {:>10.1f} KiB  write {:.3f}s  read {:.3f}s".format(name, size / 1024, write_s, read_s))
@@ -0,0 +1,95 @@
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tracemalloc
+
+from pam import read
+
+
+def measure_read(plans_path, attributes_path):
+    """
+    Read a MATSim population, returning it with the number of bytes it keeps allocated.
+    """
+    gc.collect()
+    tracemalloc.start()
+    population = read.read_matsim(plans_path, attributes_path)
+    gc.collect()
+    allocated, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return population, allocated, peak
+
+
+def count_components(population):
+    return sum(len(person.plan) for _, _, person in population.people())
+
+
+def measure(plans_path, attributes_path):
+    """
+    Measure the memory retained by a population read from MATSim plans, as a dict of counts.
+    """
+    population, allocated, peak = measure_read(plans_path, attributes_path)
+    return {
+        'people': len(list(population.people())),
+        'components': count_components(population),
+        'allocated': allocated,
+        'peak': peak,
+    }
+
+
+def measure_baseline(plans_path, attributes_path, baseline_path):
+    """
+    Measure the memory retained by a population read with the pam package found in baseline_path
+    (eg a git worktree of an earlier commit), by running this script in a subprocess.
+    """
+    env = dict(os.environ, PYTHONPATH=os.path.abspath(baseline_path))
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '-p', plans_path, '-a', attributes_path, '--json'],
+        env=env, check=True, capture_output=True, text=True
+    )
+    return json.loads(result.stdout)
+
+
+def report(label, result):
+    print("{}: {} people, {} plan components".format(label, result['people'], result['components']))
+    print("retained {:.1f} KiB ({:.0f} bytes per person, {:.0f} bytes per component), peak {:.1f} KiB".format(
+        result['allocated'] / 1024,
+        result['allocated'] / result['people'],
+        result['allocated'] / result['components'],
+        result['peak'] / 1024))
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(
+        description='Measure the memory retained by a population read from MATSim plans')
+    arg_parser.add_argument('-p',
+                            '--plans',
+                            help='the path to the MATSim plans file',
+                            required=True)
+    arg_parser.add_argument('-a',
+                            '--attributes',
+                            help='the path to the MATSim attributes file',
+                            required=True)
+    arg_parser.add_argument('-b',
+                            '--baseline',
+                            help='the path to a pam source tree (eg a git worktree) to compare against')
+    arg_parser.add_argument('--json',
+                            help='print the measurement as json',
+                            action='store_true')
+    args = vars(arg_parser.parse_args())
+
+    result = measure(args['plans'], args['attributes'])
+    if args['json']:
+        print(json.dumps(result))
+        sys.exit()
+
+    if args['baseline'] is not None:
+        baseline = measure_baseline(args['plans'], args['attributes'], args['baseline'])
+        report('baseline', baseline)
+        report('current', result)
+        print("retained memory change: {:+.1f}%".format(
+            100 * (result['allocated'] - baseline['allocated']) / baseline['allocated']))
+    else:
+        report('current', result)
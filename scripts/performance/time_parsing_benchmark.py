@@ -0,0 +1,65 @@
+import argparse
+import random
+import timeit
+from datetime import datetime, timedelta
+
+from pam import utils
+
+
+def legacy_safe_strptime(s):
+    if int(s.split(':')[0]) > 23:
+        days, hours = divmod(int(s.split(':')[0]), 24)
+        string = f"{days+1}-{hours:02d}" + s[-6:]
+        return datetime.strptime(string, '%d-%H:%M:%S')
+    return datetime.strptime(s, '%H:%M:%S')
+
+
+def legacy_trav_time(s):
+    h, m, sec = s.split(":")
+    return timedelta(hours=int(h), minutes=int(m), seconds=int(sec))
+
+
+def legacy_datetime_to_matsim_time(dt):
+    return dt.strftime("%H:%M:%S")
+
+
+def legacy_timedelta_to_matsim_time(td):
+    hours, remainder = divmod(td.total_seconds(), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{int(hours):02}:{int(minutes):02}:{int(seconds):02}"
+
+
+def compare(name, legacy, new, values, number):
+    legacy_time = timeit.timeit(lambda: [legacy(v) for v in values], number=number)
+    new_time = timeit.timeit(lambda: [new(v) for v in values], number=number)
+    print("{:<28} legacy {:.3f}s, new {:.3f}s ({:.1f}x)".format(
+        name, legacy_time, new_time, legacy_time / new_time))
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(
+        description='Microbenchmark matsim time parsing and formatting in pam.utils')
+    arg_parser.add_argument('-n',
+                            '--num-values',
+                            help='number of random times to parse and format per repeat',
+                            type=int,
+                            default=100000)
+    arg_parser.add_argument('-r',
+                            '--repeats',
+                            help='number of repeats',
+                            type=int,
+                            default=5)
+    args = vars(arg_parser.parse_args())
+
+    seconds = [random.randrange(0, 30 * 60 * 60) for _ in range(args['num_values'])]
+    strings = [utils.seconds_to_matsim_time(s) for s in seconds]
+    datetimes = [datetime(1900, 1, 1) + timedelta(seconds=s) for s in seconds]
+    timedeltas = [timedelta(seconds=s) for s in seconds]
+
+    compare('safe_strptime', legacy_safe_strptime, utils.safe_strptime, strings, args['repeats'])
+    compare('trav_time parsing', legacy_trav_time,
+            lambda s: timedelta(seconds=utils.matsim_time_to_seconds(s)), strings, args['repeats'])
+    compare('datetime_to_matsim_time', legacy_datetime_to_matsim_time,
+            utils.datetime_to_matsim_time, datetimes, args['repeats'])
+    compare('timedelta_to_matsim_time', legacy_timedelta_to_matsim_time,
+            utils.timedelta_to_matsim_time, timedeltas, args['repeats'])
@@ -0,0 +1,76 @@
+import argparse
+import time
+
+import pandas as pd
+
+from pam import read
+
+
+def scale_trips(trips, scale_factor):
+    """
+    Replicate seed trips scale_factor times, offsetting pids and hids so that all copies are unique.
+    """
+    pid_offset = trips.pid.max() + 1
+    hid_offset = trips.hid.max() + 1
+    tranches = []
+    for i in range(scale_factor):
+        tranche = trips.copy()
+        tranche['pid'] += i * pid_offset
+        tranche['hid'] += i * hid_offset
+        tranches.append(tranche)
+    return pd.concat(tranches, ignore_index=True)
+
+
+def time_load(trips, repeats, **kwargs):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        population = read.load_travel_diary(trips, **kwargs)
+        timings.append(time.perf_counter() - start)
+    return min(timings), population
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(
+        description='Benchmark the vectorised travel diary reader against the groupby reader')
+    arg_parser.add_argument('-t',
+                            '--travel-diary',
+                            help='the path to the seed CSV travel diaries file',
+                            required=True)
+    arg_parser.add_argument('-sf',
+                            '--scale-factor',
+                            help='the factor by which to scale up the seed trips',
+                            type=int,
+                            default=100)
+    arg_parser.add_argument('-r',
+                            '--repeats',
+                            help='number of timed repeats, the fastest is reported',
+                            type=int,
+                            default=3)
+    arg_parser.add_argument('-w',
+                            '--workers',
+                            help='also benchmark the groupby reader across this many processes',
+                            type=int,
+                            default=1)
+    args = vars(arg_parser.parse_args())
+
+    trips = scale_trips(pd.read_csv(args['travel_diary']), args['scale_factor'])
+    print("Benchmarking {} trips for {} people".format(len(trips), trips.pid.nunique()))
+
+    attributes = pd.DataFrame({'pid': trips.pid.unique()}).set_index('pid', drop=False)
+
+    for complex in (True, False):
+        groupby_time, expected = time_load(trips, args['repeats'], person_attributes=attributes, complex=complex)
+        vectorised_time, population = time_load(
+            trips, args['repeats'], person_attributes=attributes, complex=complex, vectorised=True)
+        assert population.stats == expected.stats
+        print("complex={}: groupby {:.2f}s, vectorised {:.2f}s ({:.1f}x)".format(
+            complex, groupby_time, vectorised_time, groupby_time / vectorised_time))
+
+        if args['workers'] > 1:
+            parallel_time, population = time_load(
+                trips, args['repeats'], person_attributes=attributes, complex=complex, workers=args['workers'])
+            assert population.stats == expected.stats
+            print("complex={}: groupby with {} workers {:.2f}s ({:.1f}x groupby, {:.1f}x vectorised)".format(
+                complex, args['workers'], parallel_time, groupby_time / parallel_time,
+                vectorised_time / parallel_time))
@@ -928,3 +928,27 @@ def person_work_home_work_not_closed():
 
     return person
 
+
+def plan_record(person):
+    record = []
+    for component in person:
+        if isinstance(component, Activity):
+            record.append(('act', component.act, component.location.area))
+        else:
+            record.append(('leg', component.mode, component.purp, component.start_location.area,
+                           component.end_location.area))
+        record.append((component.seq, component.start_time, component.end_time))
+    return record
+
+
+def assert_populations_match(a, b):
+    assert list(a.households) == list(b.households)
+    for hid, household in a:
+        other = b[hid]
+        assert household.attributes == other.attributes
+        assert list(household.people) == list(other.people)
+        for pid, person in household:
+            assert person.freq == other[pid].freq
+            assert type(person.freq) is type(other[pid].freq)
+            assert person.attributes == other[pid].attributes
+            assert plan_record(person) == plan_record(other[pid])
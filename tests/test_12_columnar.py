@@ -0,0 +1,154 @@
+import os
+import pytest
+import numpy as np
+import pandas as pd
+
+from pam.core import Population, Household, Person
+from pam.activity import Activity, Leg
+from pam.columnar import ColumnarPopulation, ACTIVITY, LEG, MISSING, NO_TIME
+from pam.read import read_matsim, load_travel_diary
+from pam.write import write_travel_diary, write_od_matrices
+from pam.plot import stats
+from pam.utils import minutes_to_datetime as mtdt
+from . import fixtures
+from .fixtures import assert_populations_match
+
+population_heh = fixtures.population_heh
+
+
+test_trips_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "test_data/simple_travel_diaries.csv")
+)
+test_plans_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "test_data/test_matsim_plans.xml")
+)
+test_attributes_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "test_data/test_matsim_attributes.xml")
+)
+
+
+@pytest.fixture
+def matsim_population():
+    return read_matsim(test_plans_path, test_attributes_path)
+
+
+@pytest.fixture
+def travel_diary_population():
+    return load_travel_diary(pd.read_csv(test_trips_path))
+
+
+def test_columnar_arrays(population_heh):
+    columnar = ColumnarPopulation.from_population(population_heh)
+    assert list(columnar.hids) == ['0']
+    assert list(columnar.pids) == ['1']
+    assert list(columnar.household_offsets) == [0, 1]
+    assert list(columnar.person_offsets) == [0, 5]
+    assert list(columnar.kind) == [ACTIVITY, LEG, ACTIVITY, LEG, ACTIVITY]
+    assert [columnar.acts[c] for c in columnar.code[columnar.kind == ACTIVITY]] == ['home', 'education', 'home']
+    assert [columnar.modes[c] for c in columnar.code[columnar.kind == LEG]] == ['car', 'car']
+    assert columnar.start_s[0] == 0
+    assert columnar.end_s[0] == 3600
+    assert (columnar.start_x[0], columnar.start_y[0]) == (0, 0)
+    assert columnar.person_attributes.loc['1', 'inc'] == 'high'
+
+
+def test_columnar_stats_match(matsim_population):
+    assert ColumnarPopulation.from_population(matsim_population).stats == matsim_population.stats
+
+
+def test_columnar_round_trip_matsim(matsim_population):
+    columnar = ColumnarPopulation.from_population(matsim_population)
+    population = columnar.to_population()
+    assert_populations_match(matsim_population, population)
+    for _, pid, person in matsim_population.people():
+        other = population[pid][pid]
+        for component, other_component in zip(person, other):
+            if isinstance(component, Activity):
+                assert component.location.loc == other_component.location.loc
+                assert component.location.link == other_component.location.link
+
+
+def test_columnar_round_trip_travel_diary(travel_diary_population):
+    columnar = ColumnarPopulation.from_population(travel_diary_population)
+    assert_populations_match(travel_diary_population, columnar.to_population())
+
+
+def test_columnar_round_trip_missing_values():
+    population = Population()
+    household = Household('1')
+    person = Person('1')
+    person.add(Activity(act='home', area='a'))
+    person.add(Leg(mode='car', start_time=mtdt(10)))
+    person.add(Activity(act=None))
+    household.add(person)
+    population.add(household)
+
+    columnar = ColumnarPopulation.from_population(population)
+    assert columnar.seq[0] == MISSING
+    assert columnar.start_s[0] == NO_TIME
+    assert np.isnan(columnar.start_x[0])
+
+    person = columnar.to_population()['1']['1']
+    assert person.attributes is None
+    assert person[0].seq is None
+    assert person[0].start_time is None
+    assert person[0].location.area == 'a'
+    assert person[1].start_time == mtdt(10)
+    assert person[1].end_time is None
+    assert person[2].act is None
+
+
+def test_leg_table(population_heh):
+    legs = ColumnarPopulation.from_population(population_heh).leg_table()
+    assert list(legs['mode']) == ['car', 'car']
+    assert list(legs.ozone) == ['a', 'b']
+    assert list(legs.dzone) == ['b', 'a']
+    assert list(legs.duration_s) == [1800, 3600]
+
+
+def test_activity_table(population_heh):
+    acts = ColumnarPopulation.from_population(population_heh).activity_table()
+    assert list(acts.act) == ['home', 'education', 'home']
+    assert list(acts.pid) == ['1', '1', '1']
+    assert list(acts.x) == [0, 110, 0]
+
+
+def test_write_travel_diary_matches(tmp_path, travel_diary_population):
+    write_travel_diary(travel_diary_population, str(tmp_path / 'a.csv'))
+    write_travel_diary(ColumnarPopulation.from_population(travel_diary_population), str(tmp_path / 'b.csv'))
+    assert open(tmp_path / 'a.csv').read() == open(tmp_path / 'b.csv').read()
+
+
+def test_write_od_matrices_matches(tmp_path, travel_diary_population):
+    write_od_matrices(travel_diary_population, str(tmp_path / 'a'), leg_filter='Mode')
+    write_od_matrices(ColumnarPopulation.from_population(travel_diary_population), str(tmp_path / 'b'),
+                      leg_filter='Mode')
+    files = sorted(os.listdir(tmp_path / 'a'))
+    assert files == sorted(os.listdir(tmp_path / 'b'))
+    for name in files:
+        assert open(tmp_path / 'a' / name).read() == open(tmp_path / 'b' / name).read()
+
+
+def test_stats_logs_match(matsim_population):
+    columnar = ColumnarPopulation.from_population(matsim_population)
+    pd.testing.assert_frame_equal(
+        stats.extract_activity_log(matsim_population), stats.extract_activity_log(columnar), check_dtype=False
+    )
+    pd.testing.assert_frame_equal(
+        stats.extract_leg_log(matsim_population), stats.extract_leg_log(columnar), check_dtype=False
+    )
+
+
+def test_stats_durations_match(matsim_population):
+    columnar = ColumnarPopulation.from_population(matsim_population)
+    assert stats.calculate_total_leg_duration(columnar) == pytest.approx(
+        stats.calculate_total_leg_duration(matsim_population))
+    assert stats.calculate_total_activity_duration(columnar, exclude='home') == pytest.approx(
+        stats.calculate_total_activity_duration(matsim_population, exclude='home'))
+    pd.testing.assert_frame_equal(
+        stats.calculate_leg_duration_by_mode(columnar), stats.calculate_leg_duration_by_mode(matsim_population)
+    )
+    pd.testing.assert_frame_equal(
+        stats.calculate_activity_duration_by_act(columnar),
+        stats.calculate_activity_duration_by_act(matsim_population)
+    )
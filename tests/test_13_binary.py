@@ -0,0 +1,191 @@
+import os
+import pytest
+import numpy as np
+import pandas as pd
+
+from pam.core import Population, Household, Person
+from pam.activity import Activity, Leg
+from pam.binary import write_binary, read_binary, load_columnar, read_header, MAGIC
+from pam.columnar import ColumnarPopulation
+from pam.read import read_matsim, load_travel_diary
+from pam.utils import minutes_to_datetime as mtdt
+from .fixtures import assert_populations_match
+
+
+test_trips_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "test_data/simple_travel_diaries.csv")
+)
+test_plans_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "test_data/test_matsim_plans.xml")
+)
+test_attributes_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "test_data/test_matsim_attributes.xml")
+)
+
+
+@pytest.fixture
+def matsim_population():
+    return read_matsim(test_plans_path, test_attributes_path)
+
+
+@pytest.fixture
+def travel_diary_population():
+    return load_travel_diary(pd.read_csv(test_trips_path))
+
+
+def assert_locations_match(population_a, population_b):
+    for hid, pid, person in population_a.people():
+        other = population_b[hid][pid]
+        for component, other_component in zip(person, other):
+            if isinstance(component, Activity):
+                assert component.location.loc == other_component.location.loc
+                assert component.location.link == other_component.location.link
+                assert component.location.area == other_component.location.area
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_binary_round_trip_matsim(tmp_path, matsim_population, compress):
+    path = str(tmp_path / 'population.pam')
+    write_binary(matsim_population, path, compress=compress)
+    population = read_binary(path)
+    assert_populations_match(matsim_population, population)
+    assert_locations_match(matsim_population, population)
+    for hid, pid, person in matsim_population.people():
+        assert population[hid][pid].attributes == person.attributes
+
+
+def test_binary_round_trip_travel_diary(tmp_path, travel_diary_population):
+    path = str(tmp_path / 'population.pam')
+    write_binary(travel_diary_population, path)
+    population = read_binary(path)
+    assert_populations_match(travel_diary_population, population)
+    assert population.stats == travel_diary_population.stats
+
+
+def test_binary_round_trip_missing_values(tmp_path):
+    population = Population()
+    household = Household('1', attributes={'cars': np.int64(2)})
+    person = Person('1', freq=None)
+    person.add(Activity(act='home', area='a'))
+    person.add(Leg(mode='car', start_time=mtdt(10)))
+    person.add(Activity(act=None))
+    household.add(person)
+    household.add(Person('2', freq=0.5))
+    population.add(household)
+
+    path = str(tmp_path / 'population.pam')
+    write_binary(population, path)
+    household = read_binary(path)['1']
+    assert household.attributes == {'cars': 2}
+    person = household['1']
+    assert person.freq is None
+    assert person.attributes is None
+    assert person[0].seq is None
+    assert person[0].start_time is None
+    assert person[0].location.area == 'a'
+    assert person[1].start_time == mtdt(10)
+    assert person[1].end_time is None
+    assert person[2].act is None
+    assert household['2'].freq == 0.5
+    assert len(household['2'].plan) == 0
+
+
+def test_binary_round_trip_freq_types(tmp_path):
+    freqs = [1, 1.5, 2.0, np.int64(3), np.float64(4.0), None]
+    population = Population()
+    household = Household('1')
+    for i, freq in enumerate(freqs):
+        household.add(Person(str(i), freq=freq))
+    population.add(household)
+
+    path = str(tmp_path / 'population.pam')
+    write_binary(population, path)
+    household = read_binary(path)['1']
+    for i, freq in enumerate(freqs):
+        assert household[str(i)].freq == freq
+        assert type(household[str(i)].freq) is type(freq)
+
+
+def test_binary_unsupported_freq_type_raises(tmp_path):
+    population = Population()
+    household = Household('1')
+    household.add(Person('1', freq='2'))
+    population.add(household)
+    with pytest.raises(UserWarning):
+        write_binary(population, str(tmp_path / 'population.pam'))
+
+
+def test_binary_nan_attribute_raises(tmp_path):
+    population = Population()
+    household = Household('1')
+    household.add(Person('1', attributes={'income': np.nan}))
+    population.add(household)
+    with pytest.raises(UserWarning):
+        write_binary(population, str(tmp_path / 'population.pam'))
+
+
+def test_binary_writes_columnar_population(tmp_path, matsim_population):
+    path = str(tmp_path / 'population.pam')
+    write_binary(ColumnarPopulation.from_population(matsim_population), path)
+    assert_populations_match(matsim_population, read_binary(path))
+
+
+def test_binary_header(tmp_path, matsim_population):
+    path = str(tmp_path / 'population.pam')
+    write_binary(matsim_population, path)
+    with open(path, 'rb') as file:
+        assert file.read(len(MAGIC)) == MAGIC
+    header = read_header(path)
+    assert header['version'] == 1
+    assert header['num_households'] == matsim_population.num_households
+    assert header['num_people'] == matsim_population.population
+    assert header['data_offset'] % 64 == 0
+    for entry in header['arrays'].values():
+        assert entry['offset'] % 64 == 0
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+@pytest.mark.parametrize('households', [(1, 3), range(1, 3), slice(1, 3)])
+def test_binary_partial_read(tmp_path, travel_diary_population, households, mmap):
+    path = str(tmp_path / 'population.pam')
+    write_binary(travel_diary_population, path)
+    columnar = load_columnar(path, households=households, mmap=mmap)
+    hids = list(travel_diary_population.households)[1:3]
+    assert list(columnar.hids) == hids
+
+    population = columnar.to_population()
+    expected = Population()
+    for hid in hids:
+        expected.add(travel_diary_population[hid])
+    assert_populations_match(expected, population)
+    assert population.stats == expected.stats
+
+
+def test_binary_memory_maps_arrays(tmp_path, matsim_population):
+    path = str(tmp_path / 'population.pam')
+    write_binary(matsim_population, path)
+    assert isinstance(load_columnar(path).start_s, np.memmap)
+    assert not isinstance(load_columnar(path, mmap=False).start_s, np.memmap)
+
+
+def test_binary_empty_range(tmp_path, matsim_population):
+    path = str(tmp_path / 'population.pam')
+    write_binary(matsim_population, path)
+    assert load_columnar(path, households=(2, 2)).stats['num_people'] == 0
+
+
+def test_binary_rejects_other_files(tmp_path):
+    path = tmp_path / 'population.pam'
+    path.write_bytes(b'not a population file at all')
+    with pytest.raises(UserWarning):
+        read_header(str(path))
+
+
+def test_binary_rejects_newer_versions(tmp_path, matsim_population):
+    path = tmp_path / 'population.pam'
+    write_binary(matsim_population, str(path))
+    data = bytearray(path.read_bytes())
+    data[len(MAGIC)] = 2
+    path.write_bytes(bytes(data))
+    with pytest.raises(UserWarning):
+        read_header(str(path))
@@ -0,0 +1,112 @@
+import os
+import pytest
+import pandas as pd
+
+from pam.core import Population, Household, Person, hid_key
+from pam.read import load_travel_diary, load_shards, load_shard
+from pam.write import write_shards as write_population_shards
+from pam.shards import write_shards, write_shard, read_shards, read_shard, read_manifest, MANIFEST
+from .fixtures import assert_populations_match
+
+
+test_trips_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "test_data/simple_travel_diaries.csv")
+)
+
+
+@pytest.fixture
+def population():
+    return load_travel_diary(pd.read_csv(test_trips_path))
+
+
+def sorted_population(population):
+    ordered = Population(name=population.name)
+    for hid in sorted(population.households):
+        ordered.add(population[hid])
+    return ordered
+
+
+def test_hid_key_is_stable():
+    assert hid_key('1') == 2212294583
+    assert hid_key(1) == hid_key('1')
+
+
+def test_partition_splits_households(population):
+    shards = population.partition(3)
+    assert len(shards) == 3
+    assert sum(shard.num_households for shard in shards) == population.num_households
+    for i, shard in enumerate(shards):
+        for hid, household in shard.households.items():
+            assert hid_key(hid) % 3 == i
+            assert household is population[hid]
+
+
+def test_partition_with_key(population):
+    shards = population.partition(2, key=lambda hid: 0)
+    assert shards[0].num_households == population.num_households
+    assert shards[1].num_households == 0
+
+
+def test_partition_requires_shards(population):
+    with pytest.raises(UserWarning):
+        population.partition(0)
+
+
+def test_merge_recombines_partitions(population):
+    merged = Population().merge(*population.partition(3))
+    assert merged.num_households == population.num_households
+    assert_populations_match(sorted_population(population), sorted_population(merged))
+
+
+def test_merge_raises_on_duplicate_households():
+    household = Household('1')
+    household.add(Person('1'))
+    population = Population()
+    population.add(household)
+    other = Population()
+    other.add(household)
+    with pytest.raises(UserWarning):
+        population.merge(other)
+
+
+def test_write_and_read_shards(tmp_path, population):
+    manifest = write_shards(population, str(tmp_path), 3)
+    assert manifest['num_shards'] == 3
+    assert sorted(os.listdir(tmp_path)) == sorted([MANIFEST, 'shard-00000.pam', 'shard-00001.pam', 'shard-00002.pam'])
+    assert read_manifest(str(tmp_path)) == manifest
+    assert sum(shard['num_households'] for shard in manifest['shards']) == population.num_households
+
+    merged = read_shards(str(tmp_path))
+    assert_populations_match(sorted_population(population), sorted_population(merged))
+    assert list(merged.households) == list(Population().merge(*population.partition(3)).households)
+
+
+def test_write_and_load_shards_through_read_and_write(tmp_path, population):
+    manifest = write_population_shards(population, str(tmp_path), 3, compress=True)
+    assert manifest['num_shards'] == 3
+    merged = load_shards(str(tmp_path))
+    assert_populations_match(sorted_population(population), sorted_population(merged))
+    assert list(load_shards(str(tmp_path), shards=[1]).households) == list(load_shard(str(tmp_path), 1).households)
+
+
+def test_read_single_shard(tmp_path, population):
+    write_shards(population, str(tmp_path), 2)
+    shard = read_shard(str(tmp_path), 1)
+    assert list(shard.households) == list(population.partition(2)[1].households)
+    with pytest.raises(UserWarning):
+        read_shard(str(tmp_path), 2)
+
+
+def test_write_processed_shard(tmp_path, population):
+    write_shards(population, str(tmp_path), 2)
+    shard = read_shard(str(tmp_path), 0)
+    hid = next(iter(shard.households))
+    del shard.households[hid]
+    write_shard(shard, str(tmp_path), 0)
+    assert read_manifest(str(tmp_path))['shards'][0]['num_households'] == shard.num_households
+    assert read_shards(str(tmp_path)).num_households == population.num_households - 1
+
+
+def test_read_shards_without_manifest(tmp_path):
+    with pytest.raises(UserWarning):
+        read_shards(str(tmp_path))
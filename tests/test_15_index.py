@@ -0,0 +1,109 @@
+import pytest
+import pickle
+
+from pam.core import Population, Household, Person
+from pam.activity import Activity, Leg, Location
+from pam.policy import policies, modifiers, probability_samplers
+from pam.utils import minutes_to_datetime as mtdt
+
+
+def make_person(pid, act, mode, area):
+    person = Person(pid)
+    person.add(Activity(1, 'home', 'h', start_time=mtdt(0), end_time=mtdt(60)))
+    person.add(Leg(1, mode, 'h', area, start_time=mtdt(60), end_time=mtdt(90)))
+    person.add(Activity(2, act, area, start_time=mtdt(90), end_time=mtdt(120)))
+    person.add(Leg(2, mode, area, 'h', start_time=mtdt(120), end_time=mtdt(150)))
+    person.add(Activity(3, 'home', 'h', start_time=mtdt(150), end_time=mtdt(24 * 60)))
+    return person
+
+
+@pytest.fixture
+def population():
+    population = Population()
+    for hid, people in (
+            ('1', [('1', 'work', 'car', 'a'), ('2', 'education', 'walk', 'b')]),
+            ('2', [('3', 'work', 'bus', 'b')]),
+            ('3', [('4', 'shop', 'car', 'c')]),
+    ):
+        household = Household(hid)
+        for person in people:
+            household.add(make_person(*person))
+        population.add(household)
+    return population
+
+
+def test_index_persons(population):
+    index = population.index()
+    assert index.persons(act='work') == [('1', '1'), ('2', '3')]
+    assert index.persons(mode='car') == [('1', '1'), ('3', '4')]
+    assert index.persons(area='b') == [('1', '2'), ('2', '3')]
+    assert index.persons(act='home') == [('1', '1'), ('1', '2'), ('2', '3'), ('3', '4')]
+
+
+def test_index_combines_criteria_per_person(population):
+    index = population.index()
+    assert index.persons(act='work', mode='car') == [('1', '1')]
+    assert index.persons(act='education', mode='car') == []
+    assert index.households(act='work', area='b') == ['2']
+
+
+def test_index_households(population):
+    index = population.index()
+    assert index.households(act='home') == ['1', '2', '3']
+    assert index.households(mode='walk') == ['1']
+
+
+def test_index_unknown_value(population):
+    assert population.index().persons(act='not an activity type') == []
+
+
+def test_index_requires_criteria(population):
+    with pytest.raises(UserWarning):
+        population.index().persons()
+
+
+def test_index_is_cached(population):
+    assert population.index() is population.index()
+
+
+@pytest.mark.parametrize('change', [
+    lambda population: setattr(population['3']['4'].plan[2], 'act', 'education'),
+    lambda population: setattr(population['3']['4'].plan[2], 'location', Location(area='b')),
+    lambda population: setattr(population['3']['4'].plan[2].location, 'area', 'b'),
+    lambda population: setattr(population['3']['4'].plan[1], 'mode', 'walk'),
+    lambda population: population['3'].add(make_person('5', 'education', 'walk', 'b')),
+])
+def test_index_rebuilt_after_change(population, change):
+    index = population.index()
+    change(population)
+    assert population.index() is not index
+    assert '3' in population.index().households(act='education') + \
+        population.index().households(area='b') + population.index().households(mode='walk')
+
+
+@pytest.mark.parametrize('change', [
+    lambda population, other: setattr(other['3']['4'].plan[2], 'act', 'education'),
+    lambda population, other: setattr(other['3']['4'].plan[2].location, 'area', 'b'),
+    lambda population, other: other['3'].add(make_person('5', 'education', 'walk', 'b')),
+    lambda population, other: other.add(Household('new')),
+    lambda population, other: setattr(make_person('5', 'education', 'walk', 'b').plan[2], 'act', 'shop'),
+])
+def test_index_kept_after_change_to_other_population(population, change):
+    other = pickle.loads(pickle.dumps(population))
+    index = population.index()
+    other.index()
+    change(population, other)
+    assert population.index() is index
+
+
+def test_apply_policies_to_indexed_households(population):
+    policy = policies.PersonPolicy(
+        modifiers.RemoveActivity(['work']),
+        probability_samplers.PersonProbability(1)
+    )
+    scenario = policies.apply_policies(
+        population, policy, households=population.index().households(act='work'), copy_on_write=True
+    )
+    assert scenario.index().persons(act='work') == []
+    assert population.index().persons(act='work') == [('1', '1'), ('2', '3')]
+    assert scenario['3']['4'] is population['3']['4']
@@ -0,0 +1,128 @@
+import os
+import pytest
+import pandas as pd
+
+from pam.core import Population, Household, Person
+from pam.activity import Plan, Activity, Leg
+from pam.columnar import ColumnarPopulation
+from pam.read import read_matsim, load_travel_diary
+from pam.validation import merge_reports, validate_households
+from pam.utils import minutes_to_datetime as mtdt
+from pam.variables import END_OF_DAY
+from pam import PAMTimesValidationError, PAMValidationLocationsError
+
+
+test_trips_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "test_data/simple_travel_diaries.csv")
+)
+test_plans_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "test_data/test_matsim_plans.xml")
+)
+test_attributes_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "test_data/test_matsim_attributes.xml")
+)
+
+
+def valid_person(pid):
+    person = Person(pid)
+    person.add(Activity(1, 'home', 'a', start_time=mtdt(0), end_time=mtdt(60)))
+    person.add(Leg(1, 'car', 'a', 'b', start_time=mtdt(60), end_time=mtdt(90)))
+    person.add(Activity(2, 'work', 'b', start_time=mtdt(90), end_time=mtdt(120)))
+    person.add(Leg(2, 'car', 'b', 'a', start_time=mtdt(120), end_time=mtdt(150)))
+    person.add(Activity(3, 'home', 'a', start_time=mtdt(150), end_time=END_OF_DAY))
+    return person
+
+
+@pytest.fixture
+def population():
+    bad_times = valid_person('bad_times')
+    bad_times.plan[2].end_time = mtdt(100)
+
+    bad_locations = valid_person('bad_locations')
+    bad_locations.plan[2].location.area = 'c'
+
+    bad_sequence = valid_person('bad_sequence')
+    bad_sequence.plan.day.pop()
+
+    no_locations = valid_person('no_locations')
+    no_locations.plan[1].end_location.area = None
+
+    unordered = valid_person('unordered')
+    unordered.plan.day.insert(1, Activity(9, 'shop', 'a', start_time=mtdt(60), end_time=mtdt(60)))
+
+    population = Population()
+    for hid, people in (
+            ('1', [valid_person('valid'), bad_times]),
+            ('2', [bad_locations, bad_sequence]),
+            ('3', [no_locations, Person('empty'), unordered]),
+    ):
+        household = Household(hid)
+        for person in people:
+            household.add(person)
+        population.add(household)
+    return population
+
+
+def test_validation_report(population):
+    report = population.validate()
+    assert report['num_people'] == 7
+    assert report['num_invalid'] == 6
+    assert report['failures'] == {
+        'sequence': [('2', 'bad_sequence'), ('3', 'empty'), ('3', 'unordered')],
+        'times': [('1', 'bad_times'), ('2', 'bad_sequence'), ('3', 'empty')],
+        'locations': [('2', 'bad_locations'), ('3', 'no_locations'), ('3', 'unordered')],
+    }
+    assert report['counts'] == {'sequence': 3, 'times': 3, 'locations': 3}
+
+
+def test_validation_without_report_raises(population):
+    with pytest.raises(PAMTimesValidationError):
+        population.validate(report=False)
+    population['1'].people.pop('bad_times')
+    with pytest.raises(PAMValidationLocationsError):
+        population.validate(report=False)
+
+
+def test_validation_without_report_passes():
+    population = Population()
+    household = Household('1')
+    household.add(valid_person('1'))
+    population.add(household)
+    assert population.validate(report=False)
+    assert population.validate()['num_invalid'] == 0
+
+
+def test_columnar_validation_matches(population):
+    assert ColumnarPopulation.from_population(population).validate() == population.validate()
+
+
+@pytest.mark.parametrize('population', [
+    read_matsim(test_plans_path, test_attributes_path),
+    load_travel_diary(pd.read_csv(test_trips_path)),
+])
+def test_columnar_validation_matches_read_populations(population):
+    assert ColumnarPopulation.from_population(population).validate() == population.validate()
+
+
+def test_validation_dispatches_to_columnar(population):
+    columnar = ColumnarPopulation.from_population(population)
+    assert population.validate(columnar=columnar) == columnar.validate()
+    assert population.validate(columnar=True) == population.validate()
+
+
+def test_validation_raises_unexpected_errors(population, monkeypatch):
+    def fail(plan):
+        raise ValueError("unexpected")
+    monkeypatch.setattr(Plan, 'valid_times', property(fail))
+    with pytest.raises(ValueError):
+        population.validate()
+
+
+def test_merge_reports(population):
+    households = list(population.households.items())
+    merged = merge_reports([validate_households(households[:1]), validate_households(households[1:])])
+    assert merged == population.validate()
+
+
+def test_parallel_validation(population):
+    assert population.validate(workers=2) == population.validate()
@@ -0,0 +1,170 @@
+import pickle
+import pytest
+
+from pam.core import Population, Household, Person
+from pam.activity import Activity, Leg
+from pam.columnar import ColumnarPopulation
+from pam.fixing import merge_summaries
+from pam.utils import minutes_to_datetime as mtdt
+from pam.variables import END_OF_DAY
+
+
+def valid_person(pid):
+    person = Person(pid)
+    person.add(Activity(1, 'home', 'a', start_time=mtdt(0), end_time=mtdt(60)))
+    person.add(Leg(1, 'car', 'a', 'b', start_time=mtdt(60), end_time=mtdt(90)))
+    person.add(Activity(2, 'work', 'b', start_time=mtdt(90), end_time=mtdt(120)))
+    person.add(Leg(2, 'car', 'b', 'a', start_time=mtdt(120), end_time=mtdt(150)))
+    person.add(Activity(3, 'home', 'a', start_time=mtdt(150), end_time=END_OF_DAY))
+    return person
+
+
+@pytest.fixture
+def population():
+    late = valid_person('late')
+    late.plan[3].start_time = mtdt(1500)
+    late.plan[4].start_time = mtdt(1600)
+
+    out_of_order = valid_person('out_of_order')
+    out_of_order.plan[4].start_time = mtdt(100)
+
+    final_leg = valid_person('final_leg')
+    final_leg.plan.day.pop()
+
+    bad_times = valid_person('bad_times')
+    bad_times.plan[2].end_time = mtdt(100)
+
+    bad_locations = valid_person('bad_locations')
+    bad_locations.plan[1].end_location.area = 'c'
+
+    population = Population()
+    for hid, people in (
+            ('1', [valid_person('valid'), late]),
+            ('2', [out_of_order, final_leg]),
+            ('3', [bad_times, bad_locations]),
+    ):
+        household = Household(hid)
+        for person in people:
+            household.add(person)
+        population.add(household)
+    return population
+
+
+def plans(population):
+    return {
+        (hid, pid): [
+            (
+                type(component).__name__,
+                component.start_time,
+                component.end_time,
+                component.start_location.area if isinstance(component, Leg) else component.location.area,
+                component.end_location.area if isinstance(component, Leg) else component.location.area,
+            )
+            for component in person.plan
+        ]
+        for hid, pid, person in population.people()
+    }
+
+
+def test_fix_plans_summary(population):
+    summary = population.fix_plans()
+    assert summary == {
+        'num_people': 6,
+        'cropped': {'end_of_day': 1, 'sequence': 2, 'final_leg': 3},
+        'times_fixed': 1,
+        'locations_fixed': 1,
+    }
+
+
+def test_fix_plans_fixes_plans(population):
+    population.fix_plans()
+    for hid, pid, person in population.people():
+        assert person.plan.is_valid, pid
+    assert population['1']['late'].plan.length == 3
+    assert population['2']['out_of_order'].plan.length == 3
+    assert population['2']['final_leg'].plan.length == 3
+    assert population['3']['bad_times'].plan[3].start_time == mtdt(100)
+
+
+def test_fix_plans_logs_summary_not_plans(population, caplog):
+    population.fix_plans()
+    warnings = [record for record in caplog.records if record.levelname == 'WARNING']
+    assert len(warnings) == 1
+    assert 'Made 6 plan crops for 6 people' in warnings[0].message
+
+
+def test_fix_plans_without_crop(population):
+    summary = population.fix_plans(crop=False, locations=False)
+    assert summary['cropped'] == {'end_of_day': 0, 'sequence': 0, 'final_leg': 0}
+    assert summary['locations_fixed'] == 0
+    assert population['1']['late'].plan.length == 5
+
+
+def test_fixing_valid_plans_changes_nothing():
+    population = Population()
+    household = Household('1')
+    household.add(valid_person('valid'))
+    population.add(household)
+    summary = population.fix_plans()
+    assert summary['times_fixed'] == 0
+    assert summary['locations_fixed'] == 0
+    assert sum(summary['cropped'].values()) == 0
+
+
+def test_parallel_fix_plans_matches_serial(population):
+    expected = pickle.loads(pickle.dumps(population))
+    expected_summary = expected.fix_plans()
+    summary = population.fix_plans(workers=2)
+    assert summary == expected_summary
+    assert plans(population) == plans(expected)
+    assert list(population.households) == ['1', '2', '3']
+
+
+def test_parallel_fix_plans_keeps_objects(population):
+    households = dict(population.households)
+    people = {(hid, pid): person for hid, pid, person in population.people()}
+    plans_before = {key: person.plan for key, person in people.items()}
+    components = {key: list(plan.day) for key, plan in plans_before.items()}
+    expected = pickle.loads(pickle.dumps(population))
+    expected.fix_plans()
+    population.fix_plans(workers=2)
+    assert all(population[hid] is household for hid, household in households.items())
+    for (hid, pid), person in people.items():
+        assert population[hid][pid] is person
+        assert person.plan is plans_before[(hid, pid)]
+        assert all(a is b for a, b in zip(person.plan.day, components[(hid, pid)]))
+    assert population.stats == expected.stats
+    for hid, pid, person in population.people():
+        assert person.plan.is_valid, pid
+
+
+def test_parallel_fix_plans_copy_on_write_leaves_population_unchanged(population):
+    expected = plans(population)
+    scenario = population.share()
+    scenario.fix_plans(workers=2)
+    assert plans(population) == expected
+    assert plans(scenario) != expected
+    assert scenario['1']['late'] is not population['1']['late']
+
+
+def test_columnar_fix_plans_matches_population(population):
+    columnar = ColumnarPopulation.from_population(population)
+    expected = pickle.loads(pickle.dumps(population))
+    expected_summary = expected.fix_plans()
+    summary = columnar.fix_plans()
+    assert summary == expected_summary
+    assert plans(columnar.to_population()) == plans(expected)
+    assert columnar.validate()['num_invalid'] == 0
+
+
+def test_merge_summaries():
+    a = {'num_people': 2, 'cropped': {'end_of_day': 1, 'sequence': 0, 'final_leg': 1}, 'times_fixed': 1,
+         'locations_fixed': 0}
+    b = {'num_people': 3, 'cropped': {'end_of_day': 0, 'sequence': 2, 'final_leg': 0}, 'times_fixed': 0,
+         'locations_fixed': 3}
+    assert merge_summaries([a, b]) == {
+        'num_people': 5,
+        'cropped': {'end_of_day': 1, 'sequence': 2, 'final_leg': 1},
+        'times_fixed': 1,
+        'locations_fixed': 3,
+    }
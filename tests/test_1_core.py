@@ -1,12 +1,19 @@
 import pytest
+import pickle
+import numpy as np
 from datetime import datetime, timedelta
 
 from pam.core import Population, Household, Person
 from pam.activity import Plan, Activity, Leg
 from pam.utils import minutes_to_datetime as mtdt
 from pam.utils import timedelta_to_matsim_time as tdtm
+from pam.utils import datetime_to_matsim_time as dttm
+from pam.utils import safe_strptime, matsim_time_to_seconds
+from pam.utils import datetime_to_seconds, seconds_to_datetime, plan_seconds
 from pam import PAMSequenceValidationError
-from .fixtures import person_heh
+from . import fixtures
+
+person_heh = fixtures.person_heh
 
 
 testdata = [
@@ -34,6 +41,54 @@ def test_td_to_matsim_string(td, expected):
     assert tdtm(td) == expected
 
 
+testdata = [
+    (timedelta(hours=25, minutes=30), "25:30:00"),
+    (timedelta(seconds=-10.5), "-1:59:49"),
+    (timedelta(seconds=59.9), "00:00:59"),
+]
+
+
+@pytest.mark.parametrize("td,expected", testdata)
+def test_td_to_matsim_string_edge_cases(td, expected):
+    assert tdtm(td) == expected
+
+
+testdata = [
+    (datetime(1900, 1, 1, 8, 27, 33), "08:27:33"),
+    (datetime(1900, 1, 2, 0, 0, 0), "00:00:00"),
+]
+
+
+@pytest.mark.parametrize("dt,expected", testdata)
+def test_dt_to_matsim_string(dt, expected):
+    assert dttm(dt) == expected
+
+
+testdata = [
+    ("00:00:00", 0, datetime(1900, 1, 1, 0, 0, 0)),
+    ("08:27:33", 30453, datetime(1900, 1, 1, 8, 27, 33)),
+    ("24:00:00", 86400, datetime(1900, 1, 2, 0, 0, 0)),
+    ("49:01:02", 176462, datetime(1900, 1, 3, 1, 1, 2)),
+]
+
+
+@pytest.mark.parametrize("s,seconds,dt", testdata)
+def test_parse_matsim_time(s, seconds, dt):
+    assert matsim_time_to_seconds(s) == seconds
+    assert safe_strptime(s) == dt
+
+
+@pytest.mark.parametrize("s,seconds,dt", testdata)
+def test_plan_seconds_round_trip(s, seconds, dt):
+    assert datetime_to_seconds(dt) == seconds
+    assert seconds_to_datetime(seconds) == dt
+    assert plan_seconds(dt) == plan_seconds(seconds) == seconds
+
+
+def test_plan_seconds_passes_none():
+    assert plan_seconds(None) is None
+
+
 def test_population_add_household():
     population = Population()
     household = Household('1')
@@ -326,3 +381,177 @@ def test_get_hh_freq_mean():
     hh.add(Person('1', freq=1))
     hh.add(Person('2', freq=3))
     assert hh.freq == 2
+
+
+def cached_summary_population():
+    population = Population()
+    household = Household('1')
+    person = Person('1', freq=2)
+    person.add(Activity(1, 'home', 'a', start_time=0, end_time=mtdt(60)))
+    person.add(Leg(1, 'car', 'a', 'b', start_time=mtdt(60), end_time=mtdt(90)))
+    person.add(Activity(2, 'work', 'b', start_time=mtdt(90), end_time=mtdt(24 * 60)))
+    household.add(person)
+    population.add(household)
+    return population
+
+
+def test_population_summaries_update_on_add():
+    population = cached_summary_population()
+    assert population.population == 1
+    assert population.size == 2
+    assert population.stats['num_legs'] == 1
+    household = Household('2')
+    household.add(Person('2', freq=3))
+    population.add(household)
+    assert population.num_households == 2
+    assert population.population == 2
+    assert population.size == 5
+    population['2'].add(Person('3', freq=1))
+    assert population.population == 3
+    assert population.size == 6
+
+
+def test_population_summaries_update_on_plan_change():
+    population = cached_summary_population()
+    person = population['1']['1']
+    assert population.activity_classes == {'home', 'work'}
+    assert population.mode_classes == {'car'}
+    person[2].act = 'shop'
+    person[1].mode = 'bus'
+    assert population.activity_classes == {'home', 'shop'}
+    assert population.mode_classes == {'bus'}
+    person.plan.day.pop()
+    person.plan.day.pop()
+    assert population.stats['num_activities'] == 1
+    assert population.stats['num_legs'] == 0
+    person.freq = 10
+    assert population.size == 10
+
+
+def test_population_summaries_return_copies():
+    population = cached_summary_population()
+    population.activity_classes.add('shop')
+    population.stats['num_legs'] = 0
+    assert population.activity_classes == {'home', 'work'}
+    assert population.stats['num_legs'] == 1
+
+
+def test_population_summaries_update_after_pickle():
+    population = pickle.loads(pickle.dumps(cached_summary_population()))
+    assert population.population == 1
+    population['1']['1'].plan.day.pop()
+    assert population.stats['num_activities'] == 1
+
+
+def test_population_summaries_update_on_plan_replacement():
+    population = cached_summary_population()
+    person = population['1']['1']
+    person.plan = Plan()
+    assert population.stats['num_activities'] == 0
+    person.plan.day = [Activity(1, 'home', 'a'), Leg(1, 'walk'), Activity(2, 'shop', 'b')]
+    assert population.stats['num_activities'] == 2
+    assert population.mode_classes == {'walk'}
+    del population['1'].people['1']
+    assert population.stats == {'num_households': 1, 'num_people': 0, 'num_activities': 0, 'num_legs': 0}
+    assert population.size == 0
+
+
+def test_population_summaries_update_on_location_change():
+    population = cached_summary_population()
+    index = population.index()
+    population['1']['1'][2].location.area = 'c'
+    assert population.index() is not index
+    assert population.index().persons(area='c') == [('1', '1')]
+
+
+def test_unrelated_changes_do_not_invalidate_summaries():
+    population = cached_summary_population()
+    other = cached_summary_population()
+    index = population.index()
+    activity = Activity(1, 'home', 'a')
+    activity.act = 'work'
+    activity.location.area = 'b'
+    other['1']['1'][0].act = 'shop'
+    other.add(Household('2'))
+    assert population.index() is index
+
+
+def test_population_size_with_unknown_freqs():
+    population = cached_summary_population()
+    population['1']['1'].freq = None
+    with pytest.raises(TypeError):
+        population.size
+    population['1']['1'].freq = 4
+    assert population.size == 4
+
+
+def test_shared_households_update_all_populations():
+    population = cached_summary_population()
+    shards = population.partition(2)
+    shard = shards[0] if shards[0].population else shards[1]
+    population['1']['1'].plan.day.pop()
+    assert population.stats['num_activities'] == 1
+    assert shard.stats['num_activities'] == 1
+
+
+def sampling_population():
+    population = Population()
+    for hid, freqs in (('1', [1, 1]), ('2', [0, 0]), ('3', [3])):
+        household = Household(hid)
+        for i, freq in enumerate(freqs):
+            household.add(Person(f"{hid}_{i}", freq=freq))
+        population.add(household)
+    return population
+
+
+def test_population_random_household_after_add():
+    population = sampling_population()
+    population.random_household()
+    population.add(Household('4'))
+    assert {population.random_household().hid for _ in range(200)} == {'1', '2', '3', '4'}
+
+
+def test_population_sample_households():
+    population = sampling_population()
+    households = population.sample_households(50, rng=np.random.default_rng(0))
+    assert len(households) == 50
+    assert all(isinstance(household, Household) for household in households)
+    assert {household.hid for household in households} == {'1', '2', '3'}
+
+
+def test_population_sample_households_by_freq():
+    population = sampling_population()
+    households = population.sample_households(50, weights='freq', rng=np.random.default_rng(0))
+    assert {household.hid for household in households} == {'1', '3'}
+
+
+def test_population_sample_households_without_replacement():
+    population = sampling_population()
+    households = population.sample_households(3, replace=False)
+    assert sorted(household.hid for household in households) == ['1', '2', '3']
+
+
+def test_population_sample_households_by_weights():
+    population = sampling_population()
+    households = population.sample_households(20, weights=[0, 0, 1])
+    assert {household.hid for household in households} == {'3'}
+    with pytest.raises(UserWarning):
+        population.sample_households(1, weights=[1, 1])
+
+
+def test_population_sample_people_by_freq():
+    population = sampling_population()
+    people = population.sample_people(50, weights='freq', rng=np.random.default_rng(0))
+    assert {person.pid for person in people} == {'1_0', '1_1', '3_0'}
+    population['3']['3_0'].freq = 0
+    people = population.sample_people(50, weights='freq')
+    assert {person.pid for person in people} == {'1_0', '1_1'}
+
+
+def test_population_sample_by_freq_requires_freqs():
+    population = sampling_population()
+    population['1'].add(Person('1_2', freq=None))
+    with pytest.raises(UserWarning):
+        population.sample_households(1, weights='freq')
+    with pytest.raises(UserWarning):
+        population.sample_people(1, weights='freq')
@@ -1,5 +1,6 @@
 import pytest
 from random import random
+from shapely.geometry import Point
 
 from pam.core import Population, Household, Person
 from pam.activity import Plan, Activity, Leg
@@ -12,7 +13,7 @@ def test_assign_same_locs_to_household(SmithHousehold):
 
     class FakeSampler:
         def sample(self, location_idx, activity):
-            return random()
+            return Point(random(), random())
     
     population.sample_locs(FakeSampler())
 
@@ -28,7 +29,7 @@ def test_assign_same_locs_to_person_activity_in_same_area(SmithHousehold):
 
     class FakeSampler:
         def sample(self, location_idx, activity):
-            return random()
+            return Point(random(), random())
     
     population.sample_locs(FakeSampler())
     SmithHousehold['3'].plan[2].location == SmithHousehold['3'].plan[6].location
@@ -40,7 +41,7 @@ def test_assign_same_locs_to_household_activity_in_same_area(SmithHousehold):
 
     class FakeSampler:
         def sample(self, location_idx, activity):
-            return random()
+            return Point(random(), random())
     
     population.sample_locs(FakeSampler())
     SmithHousehold['3'].plan[2].location == SmithHousehold['4'].plan[2].location
@@ -52,7 +53,7 @@ def test_assign_same_locs_to_household_escort_activity_in_same_area(SmithHouseho
 
     class FakeSampler:
         def sample(self, location_idx, activity):
-            return random()
+            return Point(random(), random())
     
     population.sample_locs(FakeSampler())
     SmithHousehold['2'].plan[2].location == SmithHousehold['2'].plan[8].location
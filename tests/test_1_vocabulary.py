@@ -0,0 +1,118 @@
+import pytest
+import numpy as np
+
+from pam.vocabulary import Vocabulary, VOCABULARY, NONE
+from pam.activity import Activity, Leg, Location, Plan
+
+
+def test_encode_none():
+    assert Vocabulary().encode(None) == NONE
+    assert Vocabulary().decode(NONE) is None
+
+
+def test_equal_values_share_code():
+    vocabulary = Vocabulary()
+    code = vocabulary.encode('work')
+    assert vocabulary.encode('wo' + 'rk') == code
+    assert vocabulary.encode('home') != code
+    assert vocabulary.decode(code) == 'work'
+    assert len(vocabulary) == 2
+
+
+def test_lower_case_computed_once():
+    vocabulary = Vocabulary()
+    code = vocabulary.encode('Work')
+    lowered = vocabulary.lower(code)
+    assert vocabulary.decode(lowered) == 'work'
+    assert vocabulary.lower_value(code) is vocabulary.lower_value(code)
+    assert vocabulary.lower(lowered) == lowered
+
+
+def test_non_string_values_are_own_lower_case():
+    vocabulary = Vocabulary()
+    code = vocabulary.encode(1)
+    assert vocabulary.lower(code) == code
+
+
+def test_unhashable_values_are_rejected():
+    vocabulary = Vocabulary()
+    with pytest.raises(UserWarning):
+        vocabulary.encode(['a'])
+    assert len(vocabulary) == 0
+
+
+def test_missing_values_are_none():
+    vocabulary = Vocabulary()
+    for _ in range(1000):
+        assert vocabulary.encode(float('nan')) == NONE
+    assert vocabulary.encode(np.nan) == NONE
+    assert vocabulary.encode(np.float64('nan')) == NONE
+    assert len(vocabulary) == 0
+    assert Location(area=float('nan')).area is None
+
+
+def test_values_are_interned_by_type():
+    vocabulary = Vocabulary()
+    codes = [vocabulary.encode(value) for value in (1.0, 1, True)]
+    assert len(set(codes)) == 3
+    assert [type(vocabulary.decode(code)) for code in codes] == [float, int, bool]
+    assert type(Location(area=1).area) is int
+
+
+def test_numpy_scalars_share_codes_of_python_values():
+    vocabulary = Vocabulary()
+    assert vocabulary.encode(np.int64(3)) == vocabulary.encode(3)
+    assert vocabulary.encode(np.str_('a')) == vocabulary.encode('a')
+    assert type(vocabulary.decode(vocabulary.encode(np.int64(4)))) is int
+    assert len(vocabulary) == 3
+
+
+def test_get_does_not_intern():
+    vocabulary = Vocabulary()
+    code = vocabulary.encode('work')
+    assert vocabulary.get('work') == code
+    assert vocabulary.get('shop') is None
+    assert vocabulary.get(['a']) is None
+    assert len(vocabulary) == 1
+
+
+def test_vocabulary_limit():
+    vocabulary = Vocabulary(limit=2)
+    vocabulary.encode('a')
+    vocabulary.encode('b')
+    assert vocabulary.encode('a') == 1
+    with pytest.raises(UserWarning):
+        vocabulary.encode('c')
+
+
+def test_components_share_codes():
+    act = Activity(1, 'work', 'a')
+    leg = Leg(1, 'car', start_area='a', end_area='work', purp='work')
+    assert act.act_code == leg.purp_code == leg.end_location.area_code
+    assert act.location.area_code == leg.start_location.area_code
+    assert leg.act_code == VOCABULARY.encode('travel')
+
+
+def test_string_facing_api():
+    act = Activity(1, 'work', 'a')
+    act.act = 'shop'
+    act.location.area = 'b'
+    assert act.act == 'shop'
+    assert act.location.area == 'b'
+    assert act == Activity(2, 'shop', 'b')
+
+
+def test_pickled_state_holds_values():
+    leg = Leg(1, 'car', start_area='a', end_area='b', purp='work')
+    state = leg.__getstate__()
+    assert state['mode'] == 'car'
+    assert state['purp'] == 'work'
+    assert state['start_location'].__getstate__()['area'] == 'a'
+
+
+def test_position_of_ignores_case():
+    plan = Plan()
+    plan.day = [Activity(1, 'Home', 'a'), Leg(1, 'car'), Activity(2, 'HOME', 'a')]
+    assert plan.position_of('home', search='first') == 0
+    assert plan.position_of('home', search='last') == 2
+    assert plan.position_of('travel', search='first') == 1
@@ -1,4 +1,4 @@
-from pam.activity import Plan, Activity, Leg, Location
+from pam.activity import Plan, Activity, Leg, Location, index_exact
 from pam.utils import minutes_to_datetime as mtdt
 from pam.variables import END_OF_DAY
 import pytest
@@ -64,6 +64,23 @@ def test_activity_with_different_times_not_in_list_exact(list_of_acts):
     assert not different_times_act.isin_exact(list_of_acts)
 
 
+def test_exact_activities_share_exact_key():
+    a_1 = Activity(1, 'act', 'loc', start_time=mtdt(18 * 60), end_time=mtdt(19 * 60))
+    a_2 = Activity(2, 'act', 'other_loc', start_time=mtdt(18 * 60), end_time=mtdt(19 * 60))
+    a_3 = Activity(3, 'act', 'loc', start_time=mtdt(18 * 60 + 1), end_time=mtdt(19 * 60))
+    assert a_1.exact_key == a_2.exact_key
+    assert a_1.exact_key != a_3.exact_key
+    assert hash(a_1.exact_key) == hash(a_2.exact_key)
+
+
+def test_activity_in_index_exact(list_of_acts):
+    index = index_exact(list_of_acts)
+    v_similar_act = Activity(9999999, 'act_2', 'loc', start_time=mtdt(18 * 60), end_time=mtdt(19 * 60))
+    different_times_act = Activity(2, 'act_2', 'loc', start_time=mtdt(18 * 60 + 999), end_time=mtdt(19 * 60 + 999))
+    assert v_similar_act.isin_exact(index.get(v_similar_act.exact_key, ()))
+    assert not different_times_act.isin_exact(index.get(different_times_act.exact_key, ()))
+
+
 def test_activity_with_different_times_not_in_list(list_of_acts):
     different_times_act = Activity(2, 'act_2', 'loc', start_time=mtdt(18 * 60 + 999), end_time=mtdt(19 * 60 + 999))
     assert different_times_act in list_of_acts
@@ -1,5 +1,8 @@
 import pytest
+import pickle
+from copy import deepcopy
 from datetime import timedelta
+from shapely.geometry import Point
 
 from pam.activity import Plan, Activity, Leg, Location
 from pam.utils import minutes_to_datetime as mtdt
@@ -143,3 +146,130 @@ def test_locations_equal_with_no_shared_location_type():
     locationd = Location(loc=None, link=2, area=None)
     with pytest.raises(UserWarning):
         assert not locationb == locationd
+
+
+def test_location_holds_coordinates():
+    location = Location(loc=Point(1, 2))
+    assert (location.x, location.y) == (1.0, 2.0)
+    assert location.xy == (1.0, 2.0)
+    assert location.loc == Point(1, 2)
+    assert Location(loc=(1, 2)).loc == Point(1, 2)
+    assert Location(area='a').loc is None
+    assert Location(area='a').xy is None
+
+
+def test_location_set_loc():
+    location = Location(area='a')
+    location.loc = Point(3, 4)
+    assert location.xy == (3.0, 4.0)
+    location.xy = (5, 6)
+    assert location.loc == Point(5, 6)
+    location.loc = None
+    assert location.x is None and location.y is None
+
+
+def test_locations_equal_by_coordinates():
+    assert Location(loc=Point(1, 2), area='a') == Location(loc=(1, 2), area='b')
+    assert not Location(loc=Point(1, 2), area='a') == Location(loc=(1, 3), area='a')
+
+
+def test_location_keys():
+    assert Location(loc=(1, 2), link='l', area='a').key == ('loc', 1.0, 2.0)
+    assert Location(link='l', area='a').key == Location(link='l').key
+    assert Location(area='a').key == Location(area='a').key
+    assert Location(area='a').key != Location(area='b').key
+    assert Location().key is None
+
+
+def test_locations_grouped_by_key():
+    locations = {Location(area='a').key: 1, Location(loc=Point(1, 2)).key: 2}
+    assert locations[Location(area='a').key] == 1
+    assert locations[Location(loc=(1, 2), area='b').key] == 2
+    assert len({Location(link=1, area='a').key, Location(link=1, area='b').key}) == 1
+    assert len({Location().key, Location().key}) == 1
+
+
+def test_locations_not_hashable():
+    # equal locations can have different keys, so no hash is consistent with equality
+    with pytest.raises(TypeError):
+        hash(Location(area='a'))
+
+
+def test_equal_locations_can_have_different_keys():
+    a, b = Location(area='a'), Location(loc=(0, 0), area='a')
+    assert a == b
+    assert a.key != b.key
+
+
+def test_location_unpickle_legacy_loc_state():
+    location = Location.__new__(Location)
+    location.__setstate__({'loc': Point(1, 2), 'link': None, 'area': 'a'})
+    assert location.xy == (1.0, 2.0)
+
+
+def test_components_do_not_carry_instance_dicts():
+    for component in (Activity(1, 'home', 1), Leg(1, 'car'), Location(area=1)):
+        assert not hasattr(component, '__dict__')
+
+
+def test_components_pickle_round_trip():
+    act = Activity(1, 'work', 'a', loc=Point(1, 1), start_time=mtdt(0), end_time=mtdt(60))
+    leg = Leg(1, 'car', start_area='a', end_area='b', start_time=mtdt(60), end_time=mtdt(90))
+    for component in (act, leg, act.location):
+        clone = pickle.loads(pickle.dumps(component))
+        assert clone == component
+        assert clone is not component
+    assert pickle.loads(pickle.dumps(act)).is_exact(act)
+
+
+def test_components_unpickle_legacy_dict_state():
+    act = Activity.__new__(Activity)
+    act.__setstate__({'seq': 1, 'act': 'work', 'location': Location(area='a'), 'start_time': None,
+                      'end_time': None})
+    assert act == Activity(1, 'work', 'a')
+
+    location = Location.__new__(Location)
+    location.__setstate__({'loc': None, 'link': None, 'area': 'a'})
+    assert location == Location(area='a')
+
+
+def test_components_deepcopy():
+    leg = Leg(1, 'car', start_area='a', end_area='b', start_time=mtdt(60), end_time=mtdt(90))
+    clone = deepcopy(leg)
+    assert clone == leg
+    assert (clone.start_time, clone.end_time) == (leg.start_time, leg.end_time)
+    clone.start_location.area = 'c'
+    assert leg.start_location.area == 'a'
+
+
+def test_component_times_held_as_seconds():
+    act = Activity(1, 'work', 'a', start_time=mtdt(60), end_time=END_OF_DAY)
+    assert act.start_s == 3600
+    assert act.end_s == 24 * 60 * 60
+    assert act.start_time == mtdt(60)
+    assert act.end_time == END_OF_DAY
+    assert act.duration_s == 23 * 60 * 60
+    assert act.duration == timedelta(hours=23)
+
+
+def test_component_times_set_from_seconds():
+    leg = Leg(1, 'car', start_time=3600, end_time=5400)
+    assert leg.start_time == mtdt(60)
+    assert leg.end_time == mtdt(90)
+    leg.end_time = None
+    assert leg.end_s is None
+    assert leg.end_time is None
+
+
+def test_shift_start_s():
+    leg = Leg(1, 'car', start_time=mtdt(60), end_time=mtdt(90))
+    assert leg.shift_start_s(0) == 1800
+    assert leg.start_time == mtdt(0)
+    assert leg.end_time == mtdt(30)
+
+
+def test_shift_end_s():
+    leg = Leg(1, 'car', start_time=mtdt(60), end_time=mtdt(90))
+    assert leg.shift_end_s(7200) == 5400
+    assert leg.start_time == mtdt(90)
+    assert leg.end_time == mtdt(120)
@@ -156,3 +156,24 @@ def test_load_pickle_person(person_crop_last_act, tmpdir):
     loaded = load_pickle(path)
     assert loaded.plan.day
     assert [a.act for a in loaded.plan.activities] == [a.act for a in person_crop_last_act.plan.activities]
+
+
+def test_person_attributes_match_attributes_frame(test_trips, test_attributes):
+    population = load_travel_diary(test_trips, test_attributes)
+    for _, pid, person in population.people():
+        assert person.attributes == test_attributes.loc[int(pid)].to_dict()
+
+
+def test_household_attributes_match_attributes_frame(test_trips):
+    hh_attributes = pd.DataFrame({'hid': sorted(test_trips.hid.unique())}).set_index('hid', drop=False)
+    hh_attributes['tenure'] = 'own'
+    population = load_travel_diary(test_trips, hh_attributes=hh_attributes)
+    for hid, household in population:
+        assert household.attributes == hh_attributes.loc[int(hid)].to_dict()
+
+
+def test_person_attributes_are_not_shared(test_trips, test_attributes):
+    test_trips = pd.concat([test_trips, test_trips.assign(hid=test_trips.hid + 1000)])
+    population = load_travel_diary(test_trips, test_attributes)
+    population['0']['0'].attributes['job'] = 'changed'
+    assert population['1000']['0'].attributes['job'] != 'changed'
@@ -1,7 +1,11 @@
 import os
+import gzip
+import shutil
 import pytest
 
-from pam.read import load_attributes_map, read_matsim
+import pam.read
+from pam.core import Household
+from pam.read import load_attributes_map, read_matsim, iter_matsim, person_byte_ranges, root_tags
 
 
 test_trips_path = os.path.abspath(
@@ -59,3 +63,159 @@ test_bad_attributes_path = os.path.abspath(
 def test_read_plan_with_negative_durations():
     population = read_matsim(test_bad_trips_path, test_bad_attributes_path)
     population['test']['test'].print()
+
+
+def test_iter_matsim_yields_households():
+    households = list(iter_matsim(test_trips_path, test_attributes_path))
+    assert all(isinstance(hh, Household) for hh in households)
+    assert [hh.hid for hh in households] == list(read_matsim(test_trips_path, test_attributes_path).households)
+
+
+def test_iter_matsim_lockstep_attributes():
+    population = read_matsim(test_trips_path, test_attributes_path)
+    for household in iter_matsim(test_trips_path, test_attributes_path, lockstep=True):
+        for pid, person in household:
+            assert person.attributes == population[household.hid][pid].attributes
+            assert person.plan == population[household.hid][pid].plan
+
+
+def test_iter_matsim_lockstep_out_of_order_attributes_fails(tmpdir):
+    path = os.path.join(tmpdir, 'attributes.xml')
+    with open(test_attributes_path) as f:
+        content = f.read()
+    with open(path, 'w') as f:
+        f.write(content.replace('census_0', 'census_x'))
+    with pytest.raises(KeyError):
+        list(iter_matsim(test_trips_path, path, lockstep=True))
+
+
+def test_read_matsim_household_key():
+    population = read_matsim(test_trips_path, test_attributes_path, household_key='source')
+    assert list(population.households) == ['census_2016']
+    assert len(population['census_2016'].people) == len(load_attributes_map(test_attributes_path))
+
+
+def test_read_gzipped_matsim_matches_xml(tmpdir):
+    plans_path = os.path.join(tmpdir, 'plans.xml.gz')
+    attributes_path = os.path.join(tmpdir, 'attributes.xml.gz')
+    for source, target in [(test_trips_path, plans_path), (test_attributes_path, attributes_path)]:
+        with open(source, 'rb') as f_in, gzip.open(target, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+    expected = read_matsim(test_trips_path, test_attributes_path)
+    population = read_matsim(plans_path, attributes_path)
+    assert list(population.households) == list(expected.households)
+    for hid, pid, person in population.people():
+        assert person.attributes == expected[hid][pid].attributes
+        assert person.plan == expected[hid][pid].plan
+
+
+def test_read_namespaced_attributes(tmpdir):
+    path = os.path.join(tmpdir, 'attributes.xml')
+    with open(test_attributes_path) as f:
+        content = f.read()
+    with open(path, 'w') as f:
+        f.write(content.replace('<objectAttributes>', '<objectAttributes xmlns="http://www.matsim.org/files/dtd">'))
+    assert load_attributes_map(path) == load_attributes_map(test_attributes_path)
+
+
+@pytest.fixture
+def large_plans_paths(tmpdir):
+    """
+    Replicate the test plans and attributes, giving each copy new person ids.
+    """
+    with open(test_trips_path) as f:
+        plans = f.read()
+    with open(test_attributes_path) as f:
+        attributes = f.read()
+    body_start, body_end = plans.index('<population>') + 12, plans.rindex('</population>')
+    obj_start, obj_end = attributes.index('<objectAttributes>') + 18, attributes.rindex('</objectAttributes>')
+    plans_body = "".join(plans[body_start:body_end].replace('id="census_', f'id="census_{i}_') for i in range(10))
+    attributes_body = "".join(attributes[obj_start:obj_end].replace('id="census_', f'id="census_{i}_') for i in range(10))
+    plans_path = os.path.join(tmpdir, 'plans.xml')
+    attributes_path = os.path.join(tmpdir, 'attributes.xml')
+    with open(plans_path, 'w') as f:
+        f.write(plans[:body_start] + plans_body + plans[body_end:])
+    with open(attributes_path, 'w') as f:
+        f.write(attributes[:obj_start] + attributes_body + attributes[obj_end:])
+    return plans_path, attributes_path
+
+
+def test_person_byte_ranges_start_at_persons(large_plans_paths):
+    plans_path, _ = large_plans_paths
+    ranges = person_byte_ranges(plans_path, 4)
+    assert len(ranges) == 4
+    with open(plans_path, 'rb') as f:
+        content = f.read()
+    for start, stop in ranges:
+        assert content[start:start + 8] == b'<person '
+    assert content[ranges[-1][1]:].startswith(b'</population>')
+
+
+def test_parallel_read_matsim_keeps_root_namespaces(large_plans_paths):
+    plans_path, attributes_path = large_plans_paths
+    with open(plans_path) as f:
+        plans = f.read()
+    plans = plans.replace('<population>', '<population xmlns:test="urn:test">', 1)
+    plans = plans.replace('<person id=', '<person test:note="x" id=')
+    with open(plans_path, 'w') as f:
+        f.write(plans)
+    assert root_tags(plans_path)[1] == b'</population>'
+    expected = read_matsim(plans_path, attributes_path)
+    population = read_matsim(plans_path, attributes_path, workers=2)
+    assert list(population.households) == list(expected.households)
+
+
+@pytest.mark.parametrize("workers", [2, 3])
+def test_parallel_read_matsim_matches(large_plans_paths, workers):
+    plans_path, attributes_path = large_plans_paths
+    expected = read_matsim(plans_path, attributes_path, simplify_pt_trips=True)
+    population = read_matsim(plans_path, attributes_path, simplify_pt_trips=True, workers=workers)
+    assert list(population.households) == list(expected.households)
+    for hid, pid, person in population.people():
+        assert person.attributes == expected[hid][pid].attributes
+        assert person.plan == expected[hid][pid].plan
+        assert [a.act for a in person.activities] == [a.act for a in expected[hid][pid].activities]
+
+
+def test_parallel_read_matsim_household_key(large_plans_paths):
+    plans_path, attributes_path = large_plans_paths
+    population = read_matsim(plans_path, attributes_path, household_key='source', workers=3)
+    assert list(population.households) == ['census_2016']
+    assert len(population['census_2016'].people) == len(load_attributes_map(attributes_path))
+
+
+def test_read_matsim_person_filter():
+    population = read_matsim(
+        test_trips_path, test_attributes_path, person_filter=lambda attributes: attributes['gender'] == 'male'
+    )
+    expected = {pid for pid, attributes in load_attributes_map(test_attributes_path).items()
+                if attributes['gender'] == 'male'}
+    assert {pid for _, pid, _ in population.people()} == expected
+
+
+def test_read_matsim_plan_filter():
+    def has_pt_interaction(plan):
+        return any(stage.get('type') == 'pt interaction' for stage in plan)
+
+    population = read_matsim(test_trips_path, test_attributes_path, plan_filter=has_pt_interaction)
+    assert list(population.households) == ['census_1']
+
+
+def test_read_matsim_filter_skips_building_plans(mocker):
+    mocker.patch('pam.read.parse_matsim_plan')
+    population = read_matsim(test_trips_path, test_attributes_path, person_filter=lambda attributes: False)
+    assert not population.households
+    pam.read.parse_matsim_plan.assert_not_called()
+
+
+def test_parallel_read_matsim_filters(large_plans_paths):
+    plans_path, attributes_path = large_plans_paths
+    kwargs = {
+        'person_filter': lambda attributes: attributes['gender'] == 'female',
+        'plan_filter': lambda plan: len(plan) > 5,
+    }
+    expected = read_matsim(plans_path, attributes_path, **kwargs)
+    population = read_matsim(plans_path, attributes_path, workers=2, **kwargs)
+    assert expected.households
+    assert all(hid.endswith('_1') for hid in expected.households)
+    assert list(population.households) == list(expected.households)
@@ -0,0 +1,81 @@
+import os
+import pytest
+import pandas as pd
+
+from pam.core import Population
+from pam.read import load_travel_diary, load_activity_plan
+from pam.read import load_travel_diary_parquet, load_activity_plan_parquet, stream_travel_diary_parquet
+from .fixtures import assert_populations_match
+
+pq = pytest.importorskip("pyarrow.parquet")
+pa = pytest.importorskip("pyarrow")
+
+
+test_trips_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "test_data/simple_travel_diaries.csv")
+)
+test_activities_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "test_data/test_activity_plans.csv")
+)
+test_attributes_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "test_data/simple_persons_data.csv")
+)
+
+
+@pytest.fixture
+def test_trips():
+    df = pd.read_csv(test_trips_path)
+    assert not df.empty
+    return df
+
+
+@pytest.fixture
+def test_attributes():
+    df = pd.read_csv(test_attributes_path)
+    assert not df.empty
+    return df
+
+
+def to_parquet(df, path, row_group_size=None):
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path, row_group_size=row_group_size)
+    return path
+
+
+def test_load_travel_diary_parquet_matches_csv(test_trips, test_attributes, tmpdir):
+    trips_path = to_parquet(test_trips, os.path.join(tmpdir, 'trips.parquet'))
+    attributes_path = to_parquet(test_attributes, os.path.join(tmpdir, 'attributes.parquet'))
+    expected = load_travel_diary(test_trips, test_attributes.set_index('pid', drop=False))
+    population = load_travel_diary_parquet(trips_path, attributes_path)
+    assert_populations_match(population, expected)
+
+
+def test_load_basic_travel_diary_parquet_matches_csv(test_trips, test_attributes, tmpdir):
+    trips_path = to_parquet(test_trips, os.path.join(tmpdir, 'trips.parquet'))
+    attributes_path = to_parquet(test_attributes, os.path.join(tmpdir, 'attributes.parquet'))
+    expected = load_travel_diary(test_trips, test_attributes.set_index('pid', drop=False), complex=False)
+    population = load_travel_diary_parquet(trips_path, attributes_path, complex=False)
+    assert_populations_match(population, expected)
+
+
+def test_load_activity_plan_parquet_matches_csv(test_attributes, tmpdir):
+    activities = pd.read_csv(test_activities_path)
+    trips_path = to_parquet(activities, os.path.join(tmpdir, 'activities.parquet'))
+    expected = load_activity_plan(activities)
+    population = load_activity_plan_parquet(trips_path)
+    assert_populations_match(population, expected)
+
+
+def test_parquet_reads_only_required_columns(test_trips, tmpdir):
+    trips_path = to_parquet(test_trips.assign(unused=1), os.path.join(tmpdir, 'trips.parquet'))
+    population = load_travel_diary_parquet(trips_path)
+    assert population.stats == load_travel_diary(test_trips).stats
+
+
+@pytest.mark.parametrize("row_group_size", [1, 4, 1000])
+def test_stream_travel_diary_parquet_matches_csv(test_trips, test_attributes, tmpdir, row_group_size):
+    trips_path = to_parquet(test_trips, os.path.join(tmpdir, 'trips.parquet'), row_group_size=row_group_size)
+    expected = load_travel_diary(test_trips, test_attributes)
+    population = Population()
+    for household in stream_travel_diary_parquet(trips_path, test_attributes):
+        population.add(household)
+    assert_populations_match(population, expected)
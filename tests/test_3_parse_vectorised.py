@@ -0,0 +1,117 @@
+import os
+import pytest
+import pandas as pd
+
+from pam.core import Population, Household
+from pam.read import load_travel_diary, load_activity_plan, stream_travel_diary, stream_activity_plan
+from .fixtures import assert_populations_match
+
+
+test_trips_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "test_data/simple_travel_diaries.csv")
+)
+test_activities_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "test_data/test_activity_plans.csv")
+)
+test_attributes_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "test_data/simple_persons_data.csv")
+)
+
+
+@pytest.fixture
+def test_trips():
+    df = pd.read_csv(test_trips_path)
+    assert not df.empty
+    return df
+
+
+@pytest.fixture
+def test_activities():
+    df = pd.read_csv(test_activities_path)
+    assert not df.empty
+    return df
+
+
+@pytest.fixture
+def test_attributes():
+    df = pd.read_csv(test_attributes_path)
+    assert not df.empty
+    return df
+
+
+def test_vectorised_complex_read_matches(test_trips, test_attributes):
+    expected = load_travel_diary(test_trips, test_attributes)
+    population = load_travel_diary(test_trips, test_attributes, vectorised=True)
+    assert_populations_match(population, expected)
+
+
+def test_vectorised_basic_read_matches(test_trips, test_attributes):
+    expected = load_travel_diary(test_trips, test_attributes, complex=False)
+    population = load_travel_diary(test_trips, test_attributes, complex=False, vectorised=True)
+    assert_populations_match(population, expected)
+
+
+def test_vectorised_read_ignores_input_order(test_trips, test_attributes):
+    expected = load_travel_diary(test_trips, test_attributes)
+    shuffled = test_trips.sample(frac=1, random_state=1)
+    population = load_travel_diary(shuffled, test_attributes, vectorised=True)
+    assert_populations_match(population, expected)
+
+
+def test_vectorised_read_with_household_attributes(test_trips):
+    hh_attributes = pd.DataFrame(
+        {'hid': sorted(test_trips.hid.unique())}
+    ).set_index('hid', drop=False)
+    hh_attributes['size'] = 1
+    expected = load_travel_diary(test_trips, hh_attributes=hh_attributes)
+    population = load_travel_diary(test_trips, hh_attributes=hh_attributes, vectorised=True)
+    assert_populations_match(population, expected)
+
+
+def test_vectorised_activity_plan_read_matches(test_activities, test_attributes):
+    expected = load_activity_plan(test_activities, test_attributes)
+    population = load_activity_plan(test_activities, test_attributes, vectorised=True)
+    assert_populations_match(population, expected)
+
+
+@pytest.mark.parametrize("vectorised", [False, True])
+def test_parallel_read_matches(test_trips, test_attributes, vectorised):
+    expected = load_travel_diary(test_trips, test_attributes)
+    population = load_travel_diary(test_trips, test_attributes, vectorised=vectorised, workers=3)
+    assert_populations_match(population, expected)
+
+
+def test_parallel_basic_read_matches(test_trips, test_attributes):
+    expected = load_travel_diary(test_trips, test_attributes, complex=False)
+    population = load_travel_diary(test_trips, test_attributes, complex=False, workers=2)
+    assert_populations_match(population, expected)
+
+
+@pytest.mark.parametrize("chunksize", [1, 5, 1000])
+def test_stream_travel_diary_matches(test_trips, test_attributes, chunksize):
+    expected = load_travel_diary(test_trips, test_attributes)
+    population = Population()
+    for household in stream_travel_diary(test_trips_path, test_attributes, chunksize=chunksize):
+        population.add(household)
+    assert_populations_match(population, expected)
+
+
+def test_stream_basic_travel_diary_matches(test_trips, test_attributes):
+    expected = load_travel_diary(test_trips, test_attributes, complex=False)
+    population = Population()
+    for household in stream_travel_diary(test_trips_path, test_attributes, complex=False, chunksize=7):
+        population.add(household)
+    assert_populations_match(population, expected)
+
+
+def test_stream_travel_diary_is_lazy(test_attributes):
+    households = stream_travel_diary(test_trips_path, test_attributes, chunksize=2)
+    assert isinstance(next(households), Household)
+
+
+def test_stream_activity_plan_matches(test_activities, test_attributes):
+    expected = load_activity_plan(test_activities, test_attributes)
+    population = Population()
+    for household in stream_activity_plan(test_activities_path, test_attributes, chunksize=3):
+        population.add(household)
+    assert_populations_match(population, expected)
@@ -4,8 +4,10 @@ from pam.utils import minutes_to_datetime as mtdt
 from pam.variables import END_OF_DAY
 from pam.policy import policies
 from pam.policy import probability_samplers
+from pam.policy import modifiers
 
 import pytest
+from shapely.geometry import Point
 
 
 def assert_single_home_activity(person):
@@ -99,3 +101,102 @@ def test_apply_two_policies(population):
         for pid, person in household.people.items():
             counter += len(person.plan) == 1
     assert counter < 60  # super dodgy test with probability
+
+
+def test_apply_policies_copy_shares_unmodified_households(population):
+    def hid_in(household, hids):
+        return float(household.hid in hids)
+
+    policy = policies.HouseholdQuarantined(
+        probability_samplers.HouseholdProbability(hid_in, kwargs={'hids': ['1', '2']})
+    )
+    scenario = policies.apply_policies(population, policy, copy_on_write=True)
+    assert len(scenario.households) == 20
+    for hid, household in scenario.households.items():
+        if hid in ['1', '2']:
+            for pid, person in household.people.items():
+                assert person is not population[hid][pid]
+                assert_single_home_activity(person)
+                assert len(population[hid][pid].plan) == 5
+        else:
+            for pid, person in household.people.items():
+                assert person is population[hid][pid]
+
+
+def test_apply_policies_copy_leaves_population_unchanged(population):
+    policy = policies.PersonPolicy(
+        modifiers.RemoveActivity(['work']),
+        probability_samplers.PersonProbability(1)
+    )
+    scenario = policies.apply_policies(population, policy)
+    for hid, pid, person in population.people():
+        assert len(person.plan) == 5
+    for hid, pid, person in scenario.people():
+        assert 'work' not in person.activity_classes
+    assert scenario['1'].people is not population['1'].people
+    assert scenario['11'].people is not population['11'].people
+
+
+def final_leg_population(population):
+    for hid, pid, person in population.people():
+        for i, component in enumerate(person.plan):
+            component.start_time, component.end_time = mtdt(60 * i), mtdt(60 * (i + 1))
+        person.plan.day.pop()
+    return population
+
+
+@pytest.mark.parametrize('copy_on_write', [False, True])
+def test_apply_policies_copy_then_fix_plans_leaves_population_unchanged(population, copy_on_write):
+    population = final_leg_population(population)
+    scenario = policies.apply_policies(population, [], copy_on_write=copy_on_write)
+    scenario.fix_plans(times=False)
+    for hid, pid, person in scenario.people():
+        assert len(person.plan) == 3
+    for hid, pid, person in population.people():
+        assert len(person.plan) == 4
+    assert population.stats['num_legs'] == 80
+    assert scenario.stats['num_legs'] == 40
+
+
+@pytest.mark.parametrize('copy_on_write', [False, True])
+def test_apply_policies_copy_then_add_leaves_population_unchanged(population, copy_on_write):
+    scenario = policies.apply_policies(population, [], copy_on_write=copy_on_write)
+    scenario['1'].add(Person('new'))
+    scenario['2'].people = {}
+    scenario.add(Household('new'))
+    assert list(population['1'].people) == ['1-0', '1-1']
+    assert list(population['2'].people) == ['2-0', '2-1']
+    assert 'new' not in population.households
+    assert population.population == 40
+    assert scenario.population == 39
+
+
+def test_apply_policies_deep_copy_then_plan_change_leaves_population_unchanged(population):
+    scenario = policies.apply_policies(population, [])
+    scenario['1']['1-0'].plan[0].act = 'shop'
+    scenario['1']['1-0'].plan.day.pop()
+    assert population['1']['1-0'].plan[0].act == 'home'
+    assert len(population['1']['1-0'].plan) == 5
+    assert population.activity_classes == {'home', 'work', 'education'}
+
+
+def test_copy_on_write_household_made_writable_before_fixing(population):
+    population = final_leg_population(population)
+    household = population['1'].share()
+    household.fix_plans(times=False)
+    assert not household.shared
+    assert household['1-0'] is not population['1']['1-0']
+    assert len(household['1-0'].plan) == 3
+    assert len(population['1']['1-0'].plan) == 4
+
+
+class PointSampler:
+    def sample(self, area, act):
+        return Point(1, 1)
+
+
+def test_apply_policies_copy_on_write_then_sample_locs_leaves_population_unchanged(population):
+    scenario = policies.apply_policies(population, [], copy_on_write=True)
+    scenario.sample_locs(PointSampler())
+    assert scenario['1']['1-0'].plan[0].location.loc == Point(1, 1)
+    assert population['1']['1-0'].plan[0].location.loc is None
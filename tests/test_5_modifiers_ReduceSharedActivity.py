@@ -161,7 +161,8 @@ def test_remove_household_activities_delegates_to_several_methods(mocker, SmithH
     policy.remove_household_activities(SmithHousehold)
 
     modifiers.ReduceSharedActivity.shared_activities_for_removal.assert_called_once_with(SmithHousehold)
-    assert modifiers.ReduceSharedActivity.people_who_share_activities_for_removal.call_count == 2
+    modifiers.ReduceSharedActivity.people_who_share_activities_for_removal.assert_called_once_with(
+        SmithHousehold, [''])
     random.choice.assert_called_once_with([''])
     assert modifiers.ReduceSharedActivity.remove_activities.call_count == 4
 
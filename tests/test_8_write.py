@@ -31,6 +31,19 @@ def test_write_plans_gzip(tmp_path, population_heh):
     # TODO make assertions about the content of the created file
 
 
+def test_write_plans_without_locs_raises(tmp_path):
+    population = Population()
+    household = Household('1')
+    person = Person('1')
+    person.add(Activity(act='home', area='a', start_time=mtdt(0), end_time=mtdt(60)))
+    person.add(Leg(mode='car', start_area='a', end_area='a', start_time=mtdt(60), end_time=mtdt(90)))
+    person.add(Activity(act='home', area='a', start_time=mtdt(90), end_time=mtdt(24 * 60)))
+    household.add(person)
+    population.add(household)
+    with pytest.raises(UserWarning):
+        write_matsim_plans(population, location=str(tmp_path / "test.xml"))
+
+
 def test_write_attributes_xml(tmp_path, population_heh):
     location = str(tmp_path / "test.xml")
     write_matsim_attributes(population_heh, location=location, comment="test")
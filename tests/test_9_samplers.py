@@ -115,7 +115,7 @@ def test_sample_point_from_geoseries():
     poly = Polygon(((0,0), (1,0), (1,1), (0,1)))
     gdf = gp.GeoDataFrame(df, geometry=[poly]*3)
     sampler = spatial.RandomPointSampler(gdf.geometry)
-    assert isinstance(sampler.sample_point_from_polygon(gdf.geometry[0]), Point)
+    assert isinstance(sampler.sample_point_from_polygon(gdf.geometry[0]), tuple)
 
 
 def test_sample_point_from_geoseries_invalid():
@@ -123,7 +123,7 @@ def test_sample_point_from_geoseries_invalid():
     poly = Polygon(((0,0), (1,0), (0,1), (1,1)))
     gdf = gp.GeoDataFrame(df, geometry=[poly]*3)
     sampler = spatial.RandomPointSampler(gdf.geometry)
-    assert isinstance(sampler.sample_point_from_polygon(gdf.geometry[0]), Point)
+    assert isinstance(sampler.sample_point_from_polygon(gdf.geometry[0]), tuple)
 
 
 def test_sample_point_from_geoseries_impatient():
@@ -139,7 +139,7 @@ def test_random_point_from_geoseries():
     poly = Polygon(((0,0), (1,0), (1,1), (0,1)))
     gdf = gp.GeoDataFrame(df, geometry=[poly]*3)
     sampler = spatial.RandomPointSampler(gdf.geometry)
-    assert isinstance(sampler.sample(0), Point)
+    assert isinstance(sampler.sample(0), tuple)
 
 
 def test_random_point_from_geodataframe():
@@ -147,7 +147,7 @@ def test_random_point_from_geodataframe():
     poly = Polygon(((0,0), (1,0), (1,1), (0,1)))
     gdf = gp.GeoDataFrame(df, geometry=[poly]*3)
     sampler = spatial.RandomPointSampler(gdf)
-    assert isinstance(sampler.sample(0), Point)
+    assert isinstance(sampler.sample(0), tuple)
 
 
 def test_random_point_from_geoseries_impatient():
@@ -202,7 +202,7 @@ def test_facility_sampler_normal():
     zones_gdf = gp.GeoDataFrame(zones_df, geometry=polys)
 
     sampler = facility.FacilitySampler(facility_gdf, zones_gdf, ['home', 'work', 'education'])
-    assert sampler.sample(0, 'home') == Point((1,1))
+    assert sampler.sample(0, 'home') == (1, 1)
 
 
 def test_facility_sampler_missing_activity_random_sample():
@@ -220,7 +220,7 @@ def test_facility_sampler_missing_activity_random_sample():
     zones_gdf = gp.GeoDataFrame(zones_df, geometry=polys)
 
     sampler = facility.FacilitySampler(facility_gdf, zones_gdf, ['home', 'work', 'education'])
-    assert isinstance(sampler.sample(0, 'education'), Point)
+    assert isinstance(sampler.sample(0, 'education'), tuple)
 
 
 def test_facility_sampler_missing_activity_return_None():